@@ -4,6 +4,10 @@ from tkinter import filedialog, messagebox
 from PIL import Image
 import os
 import numpy as np
+from gs_engine import GSEngine, gs_batched
+from doe_pipeline import print_order, write_tiles
+from phase_lut import PhaseLUT
+from tile_coordinates import coordinate_counts, tile_coordinates
 
 
 class DoeGeneration:
@@ -20,7 +24,47 @@ class DoeGeneration:
         self.filepath_output = os.path.join(os.getcwd(), "output")
         self.image = Image.open(self.filepath_image)
         self.added_RGB_values = []
+        # Phase to gray mapping, replace with PhaseLUT.for_wavelength(...) for a calibrated SLM
+        self.lut = PhaseLUT.linear()
 
+    def iter_tile_phases(self, max_iter=1000, tolerance=None, batch_size=8, backend="scipy", workers=-1):
+        """
+        Run GS for all doe_height x doe_width tiles of the mosaic as one batched job.
+
+        Every tile of the image is resized to the SLM resolution and used as its own target. Only batch_size
+        targets are held in memory at a time, so the memory stays the same for a 2x2 and an 18x18 mosaic.
+        Tiles are yielded in printing order as soon as their batch is done, batch_size=1 yields every tile
+        right after its own GS run.
+
+        Yields:
+        tuple: (row, column, frame) with frame the uint8 phase map of the tile.
+        """
+        image = self.image.convert("L")
+        tile_height = image.height // self.doe_height
+        tile_width = image.width // self.doe_width
+        order = print_order(self.doe_height, self.doe_width)
+
+        for start in range(0, len(order), batch_size):
+            batch_order = order[start:start + batch_size]
+            targets = np.empty((len(batch_order), 1152, 1920), dtype=np.float32)
+            for i, (row, column) in enumerate(batch_order):
+                tile = image.crop((column * tile_width, row * tile_height,
+                                   (column + 1) * tile_width, (row + 1) * tile_height))
+                targets[i] = np.asarray(tile.resize((1920, 1152)), dtype=np.float32)
+
+            phases = gs_batched(targets, max_iter=max_iter, tolerance=tolerance, batch_size=batch_size,
+                                backend=backend, workers=workers)
+
+            for (row, column), phase in zip(batch_order, phases):
+                yield row, column, self.lut.apply(phase)
+
+    def generate_tile_phases(self, max_iter=1000, tolerance=None, batch_size=8, backend="scipy", workers=-1):
+        """
+        Compute the whole mosaic and write frames and csv rows as the tiles come in.
+        """
+        tiles = self.iter_tile_phases(max_iter, tolerance, batch_size, backend, workers)
+        count = write_tiles(tiles, self.filepath_output, self.doe_height, self.doe_width, self.slm_x, self.slm_y)
+        self.added_RGB_values = [765] * count
 
     def create_csv(self):
         """
@@ -42,15 +86,15 @@ class DoeGeneration:
         dataset_path = os.path.join(self.filepath_output, filename_dataset)
 
         # Calculate new coordinates without relying on added_RGB_values.csv
-        coordinates = calculate_coordinates(self.image_height, self.image_width, self.slm_x, self.slm_y)
+        x, z = coordinate_counts(*tile_coordinates(self.image_height, self.image_width, self.slm_x, self.slm_y))
 
         # Create a new list to store the modified data
         modified_data = []
 
         # Ensure that only the second and third columns are extended with the calculated coordinates
-        for i in range(len(coordinates)):
+        for i in range(len(x)):
             # Include exp_times in the first column and update the second and third columns
-            modified_data.append([self.added_RGB_values[i]] + [int(coord) for coord in coordinates[i]])
+            modified_data.append([self.added_RGB_values[i]] + [int(x[i]), int(z[i])])
 
         # Open the CSV file for writing
         with open(dataset_path, 'w', newline='') as output_file:
@@ -63,26 +107,16 @@ class DoeGeneration:
         print("Both CSV-Sheets have been created")
 
 
-def gs(image, max_iter=1000):
+def gs(image, max_iter=1000, tolerance=None, backend="numpy", workers=None, lut=None):
     image_array = np.array(image)
-    height, width = image_array.shape
-    far_field_phase = np.zeros((height, width))
-    far_field = image_array * np.exp(1j * far_field_phase)
-
-    for i in range(max_iter):
-        near_field = np.fft.ifft2(far_field)
-        near_field_phase = np.angle(near_field)
-        new_near_field = np.ones((height, width)) * np.exp(1j * near_field_phase)
-        far_field = np.fft.fft2(new_near_field)
-        far_field_phase = np.angle(far_field)
-        far_field = image_array * np.exp(1j * far_field_phase)
-
-        print(f"Iteration {i}")
+    engine = GSEngine(image_array.shape, backend=backend, workers=workers)
+    near_field = engine.run(image_array, max_iter=max_iter, tolerance=tolerance)
+    print(f"GS finished after {engine.iterations} iterations")
 
-    phase = np.angle(new_near_field)
-    phase_normalized_scaled = (((phase + np.pi) / (2 * np.pi)) * 255).astype(np.uint8)
+    if lut is None:
+        lut = PhaseLUT.linear()
 
-    return Image.fromarray(phase_normalized_scaled)
+    return Image.fromarray(lut.apply(np.angle(near_field)))
 
 def get_file_path():
     root = tk.Tk()
@@ -98,35 +132,4 @@ def get_file_path():
             continue
         else:
             break
-    return str(file_path)
-
-def calculate_coordinates(rows, columns, slm_x, slm_y):
-    """
-    Calculate coordinates in a snake pattern.
-
-    Parameters:
-    rows (int): Number of rows.
-    columns (int): Number of columns.
-    slm (int): Spatial light modulator value.
-
-    Returns:
-    list: A list of coordinate tuples.
-    """
-    points = []
-    # Initialize starting coordinates
-    start_x = ((columns / 2) - 1) * slm_x + slm_x / 2
-    start_y = -(((rows / 2) - 1) * slm_y + slm_y / 2)
-
-    for row in range(rows):
-        for col in range(columns):
-            points.append((start_x, start_y))
-
-            # Update x-coordinate based on row parity and not at the end of the row
-            if col < columns - 1:
-                start_x -= slm_x if (row % 2 == 0) else 0
-                start_x += slm_x if (row % 2 != 0) else 0
-
-        # Update y-coordinate at the end of each row
-        start_y += slm_y
-
-    return points
\ No newline at end of file
+    return str(file_path)
\ No newline at end of file
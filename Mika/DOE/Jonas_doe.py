@@ -3,6 +3,7 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 from PIL import Image
 import csv
+from tile_coordinates import coordinate_counts, tile_coordinates
 
 
 class JonasDOE:
@@ -15,10 +16,13 @@ class JonasDOE:
         self.slm_y = 290
 
         self.added_RGB_values =[]
+        self.frame_ids = []
 
+        # Every tile shows the same image, so it is saved once and referenced by its frame id
+        self.image.save(os.path.join(self.output_path, "pattern_1.png"))
         for i in range(self.side_length*self.side_length):
-            self.image.save(os.path.join(self.output_path, f"pattern_{i+1}.png"))
             self.added_RGB_values.append(765)
+            self.frame_ids.append(1)
 
         self.create_csv()
 
@@ -42,58 +46,28 @@ class JonasDOE:
         dataset_path = os.path.join(self.output_path, filename_dataset)
 
         # Calculate new coordinates without relying on added_RGB_values.csv
-        coordinates = calculate_coordinates(self.side_length, self.side_length, self.slm_x, self.slm_y)
+        x, z = coordinate_counts(*tile_coordinates(self.side_length, self.side_length, self.slm_x, self.slm_y))
 
         # Create a new list to store the modified data
         modified_data = []
 
         # Ensure that only the second and third columns are extended with the calculated coordinates
-        for i in range(len(coordinates)):
+        for i in range(len(x)):
             # Include exp_times in the first column and update the second and third columns
-            modified_data.append([self.added_RGB_values[i]] + [int(coord) for coord in coordinates[i]])
+            modified_data.append([self.added_RGB_values[i]] + [int(x[i]), int(z[i])] +
+                                 [self.frame_ids[i]])
 
         # Open the CSV file for writing
         with open(dataset_path, 'w', newline='') as output_file:
             # Write the header row
             writer = csv.writer(output_file)
-            writer.writerow(["addedRGB", "X", "Z"])
+            writer.writerow(["addedRGB", "X", "Z", "frame"])
             # Write the modified data
             writer.writerows(modified_data)
 
         print("Both CSV-Sheets have been created")
 
 
-def calculate_coordinates(rows, columns, slm_x, slm_y):
-    """
-    Calculate coordinates in a snake pattern.
-
-    Parameters:
-    rows (int): Number of rows.
-    columns (int): Number of columns.
-    slm (int): Spatial light modulator value.
-
-    Returns:
-    list: A list of coordinate tuples.
-    """
-    points = []
-    # Initialize starting coordinates
-    start_x = ((columns / 2) - 1) * slm_x + slm_x / 2
-    start_y = -(((rows / 2) - 1) * slm_y + slm_y / 2)
-
-    for row in range(rows):
-        for col in range(columns):
-            points.append((start_x, start_y))
-
-            # Update x-coordinate based on row parity and not at the end of the row
-            if col < columns - 1:
-                start_x -= slm_x if (row % 2 == 0) else 0
-                start_x += slm_x if (row % 2 != 0) else 0
-
-        # Update y-coordinate at the end of each row
-        start_y += slm_y
-
-    return points
-
 def get_file_path():
     root = tk.Tk()
     root.withdraw()
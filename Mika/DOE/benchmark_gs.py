@@ -0,0 +1,57 @@
+import time
+import numpy as np
+from gs_engine import GSEngine, BACKENDS
+
+"""
+Benchmark of the GS engine against the original per-iteration implementation (gs in DOE_generation.py before the
+shared engine, without the print).
+
+The legacy loop is timed for a few iterations only and extrapolated to max_iter, the engine backends run the
+full count.
+"""
+
+height, width = 1152, 1920
+max_iter = 1000
+legacy_iterations = 5
+workers = -1
+
+
+def legacy_gs(image_array, max_iter):
+    height, width = image_array.shape
+    far_field_phase = np.zeros((height, width))
+    far_field = image_array * np.exp(1j * far_field_phase)
+
+    for i in range(max_iter):
+        near_field = np.fft.ifft2(far_field)
+        near_field_phase = np.angle(near_field)
+        new_near_field = np.ones((height, width)) * np.exp(1j * near_field_phase)
+        far_field = np.fft.fft2(new_near_field)
+        far_field_phase = np.angle(far_field)
+        far_field = image_array * np.exp(1j * far_field_phase)
+
+    return new_near_field
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    target = rng.random((height, width)).astype(np.float32) * 255
+
+    start = time.perf_counter()
+    legacy_gs(target, legacy_iterations)
+    legacy_time = (time.perf_counter() - start) / legacy_iterations * max_iter
+    print(f"{height}x{width}, {max_iter} iterations\n")
+    print(f"{'implementation':>16} {'total [s]':>10} {'per iter [ms]':>14} {'speedup':>8}")
+    print(f"{'legacy':>16} {legacy_time:>10.1f} {legacy_time / max_iter * 1000:>14.1f} {'1.0x':>8}  (extrapolated)")
+
+    for backend in BACKENDS:
+        try:
+            engine = GSEngine(target.shape, backend=backend, workers=workers)
+        except ImportError as e:
+            print(f"{backend:>16} skipped: {e}")
+            continue
+
+        start = time.perf_counter()
+        engine.run(target, max_iter=max_iter)
+        engine_time = time.perf_counter() - start
+        print(f"{backend:>16} {engine_time:>10.1f} {engine_time / max_iter * 1000:>14.1f} "
+              f"{legacy_time / engine_time:>7.1f}x")
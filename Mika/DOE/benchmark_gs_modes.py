@@ -0,0 +1,53 @@
+import os
+import time
+import numpy as np
+from PIL import Image
+from gs_engine import GSEngine, MODES, METRICS
+
+"""
+Compares the GS modes of the shared engine (gs, weighted, feedback, mraf) in a table of iterations, run time and
+final rmse, efficiency and uniformity. Every mode starts from the same random phase and stops at the same
+convergence threshold.
+
+Targets: a random spot array and, if present, einstein.jpg from this folder.
+"""
+
+size = 256
+max_iter = 500
+tolerance = 1e-4
+spot_count = 50
+backend = "numpy"
+
+
+def spot_array(size, count, seed=0):
+    rng = np.random.default_rng(seed)
+    target = np.zeros((size, size), dtype=np.float32)
+    for y, x in rng.integers(size // 8, size - size // 8, (count, 2)):
+        target[y, x] = 1
+    return target
+
+
+def load_targets():
+    targets = {"spot array": spot_array(size, spot_count)}
+    image_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "einstein.jpg")
+    if os.path.exists(image_path):
+        image = Image.open(image_path).convert("L").resize((size, size))
+        targets["einstein.jpg"] = np.asarray(image, dtype=np.float32)
+    return targets
+
+
+if __name__ == "__main__":
+    initial_phase = np.random.default_rng(1).random((size, size)) * 2 * np.pi
+
+    print(f"{size}x{size}, at most {max_iter} iterations, tolerance {tolerance}\n")
+    print(f"{'target':>14} {'mode':>9} {'iterations':>11} {'time [s]':>9} " +
+          " ".join(f"{metric:>11}" for metric in METRICS))
+
+    for name, target in load_targets().items():
+        engine = GSEngine(target.shape, backend=backend)
+        for mode in MODES:
+            start = time.perf_counter()
+            engine.run(target, max_iter=max_iter, tolerance=tolerance, initial_phase=initial_phase, mode=mode)
+            run_time = time.perf_counter() - start
+            print(f"{name:>14} {mode:>9} {engine.iterations:>11} {run_time:>9.2f} " +
+                  " ".join(f"{engine.history[metric][-1]:>11.4f}" for metric in METRICS))
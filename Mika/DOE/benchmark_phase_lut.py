@@ -0,0 +1,47 @@
+import time
+import numpy as np
+from phase_lut import PhaseLUT
+
+"""
+Per-frame cost of the phase-to-gray stage on a full SLM frame, compared with the arithmetic mapping
+(((phase + pi) / (2 * pi)) * 255).astype(np.uint8) used before the LUT, and of mapping a full frame of sawtooth
+gratings in gray values like the grating generators do (apply_gray).
+"""
+
+height, width = 1152, 1920
+repeats = 20
+
+
+def legacy_mapping(phase):
+    return (((phase + np.pi) / (2 * np.pi)) * 255).astype(np.uint8)
+
+
+def time_per_frame(function, repeats):
+    function()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    phase = rng.uniform(-np.pi, np.pi, (height, width)).astype(np.float32)
+    lut = PhaseLUT.linear()
+    fine_lut = PhaseLUT.linear(levels=1024)
+    frame = np.empty((height, width), dtype=np.uint8)
+    grating = (np.mod(np.arange(width) / 20, 1) * 128)[np.newaxis, :].repeat(height, axis=0)
+
+    difference = np.abs(lut.apply(phase).astype(int) - legacy_mapping(phase).astype(int))
+    print(f"Linear LUT vs. arithmetic mapping: max difference {difference.max()} gray levels, "
+          f"{np.mean(difference > 0) * 100:.1f}% of pixels differ")
+
+    print(f"{'stage':<28}{'ms/frame':>10}")
+    print(f"{'arithmetic mapping':<28}{time_per_frame(lambda: legacy_mapping(phase), repeats) * 1e3:>10.1f}")
+    print(f"{'LUT gather':<28}{time_per_frame(lambda: lut.apply(phase, out=frame), repeats) * 1e3:>10.1f}")
+    print(f"{'LUT gather, 1024 levels':<28}"
+          f"{time_per_frame(lambda: fine_lut.apply(phase, out=frame), repeats) * 1e3:>10.1f}")
+    print(f"{'LUT gray gather (gratings)':<28}"
+          f"{time_per_frame(lambda: lut.apply_gray(grating, out=frame), repeats) * 1e3:>10.1f}")
+    print(f"{'LUT + error diffusion':<28}"
+          f"{time_per_frame(lambda: lut.apply(phase, diffuse=True, out=frame), 3) * 1e3:>10.1f}")
@@ -0,0 +1,145 @@
+import csv
+import os
+import numpy as np
+from PIL import Image
+from tile_coordinates import coordinate_counts, tile_coordinates, tile_indices
+
+"""
+Streaming DOE tile pipeline: phase map -> SLM-sized tiles in printing order -> frames and dataset.csv rows.
+
+Tiles are yielded one at a time and every frame and csv row is written (and flushed) as soon as it is available,
+so printing can start on tile 1 while later tiles are still being produced.
+
+Usage:
+    tiles = tiles_from_phase_map(phase_map, rows=4, columns=2)
+    write_tiles(tiles, output_path, rows=4, columns=2, slm_x=484, slm_y=290)
+"""
+
+SLM_WIDTH = 1920
+SLM_HEIGHT = 1152
+
+
+def resample_index_map(tile_height, tile_width, slm_height=SLM_HEIGHT, slm_width=SLM_WIDTH):
+    """
+    Precompute the nearest-neighbour source row and column for every SLM pixel.
+
+    Nearest neighbour keeps the phase values as they are, interpolating a wrapped phase would blur every 2*pi jump.
+
+    Returns:
+    tuple: Row indices of shape (slm_height, 1) and column indices of shape (1, slm_width), ready for
+    tile[row_index, column_index].
+    """
+    row_index = (np.arange(slm_height) * tile_height // slm_height).reshape(-1, 1)
+    column_index = (np.arange(slm_width) * tile_width // slm_width).reshape(1, -1)
+    return row_index, column_index
+
+
+def print_order(rows, columns):
+    """
+    Tiles (row, column) in printing order, counted from the top left of the image.
+
+    Same snake pattern as the pixel list of the subdivision generators and the stage positions of tile_coordinates:
+    starting with the bottom row, printed rows with an even index run right to left and printed rows with an odd
+    index left to right.
+    """
+    printed_row, stage_column = tile_indices(rows, columns)
+    # The first printed row is the bottom one, the first stage column (largest X) the right one
+    return list(zip((rows - 1 - printed_row).tolist(), (columns - 1 - stage_column).tolist()))
+
+
+def tiles_from_phase_map(phase_map, rows, columns):
+    """
+    Cut a phase map into rows x columns tiles and yield them in printing order at SLM resolution.
+
+    Parameters:
+    phase_map (numpy.ndarray): 2D phase map, already mapped to gray values.
+    rows (int): Number of tile rows.
+    columns (int): Number of tile columns.
+
+    Yields:
+    tuple: (row, column, frame) with frame a uint8 array of shape (SLM_HEIGHT, SLM_WIDTH).
+    """
+    phase_map = np.asarray(phase_map)
+    tile_height = phase_map.shape[0] // rows
+    tile_width = phase_map.shape[1] // columns
+    row_index, column_index = resample_index_map(tile_height, tile_width)
+
+    for row, column in print_order(rows, columns):
+        tile = phase_map[row * tile_height:(row + 1) * tile_height, column * tile_width:(column + 1) * tile_width]
+        yield row, column, tile[row_index, column_index].astype(np.uint8)
+
+
+class TileWriter:
+    def __init__(self, output_path, coordinates):
+        """
+        Writes frames, dataset.csv and added_RGB_values.csv one tile at a time.
+
+        Parameters:
+        output_path (str): Folder for the frames and the csv files.
+        coordinates (list): Stage coordinates (X, Z) for each tile in printing order.
+        """
+        self.output_path = output_path
+        self.coordinates = coordinates
+        self.count = 0
+
+        if not os.path.exists(self.output_path):
+            os.makedirs(self.output_path)
+
+        self.dataset_file = open(os.path.join(self.output_path, "dataset.csv"), 'w', newline='')
+        self.added_RGB_file = open(os.path.join(self.output_path, "added_RGB_values.csv"), 'w', newline='')
+        self.dataset_writer = csv.writer(self.dataset_file)
+        self.added_RGB_writer = csv.writer(self.added_RGB_file)
+        self.dataset_writer.writerow(["addedRGB", "X", "Z"])
+        self.added_RGB_writer.writerow(["addedRGB"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, frame, added_RGB=765):
+        """
+        Save the next frame as pattern_{n}.png and append its csv rows.
+        """
+        if self.count >= len(self.coordinates):
+            raise ValueError(f"More tiles than coordinates ({len(self.coordinates)})")
+
+        # The frame is complete on disk before its csv row appears
+        Image.fromarray(frame).save(os.path.join(self.output_path, f"pattern_{self.count + 1}.png"))
+
+        x, z = self.coordinates[self.count]
+        self.dataset_writer.writerow([added_RGB, int(x), int(z)])
+        self.added_RGB_writer.writerow([added_RGB])
+        self.dataset_file.flush()
+        self.added_RGB_file.flush()
+        self.count += 1
+
+    def close(self):
+        self.dataset_file.close()
+        self.added_RGB_file.close()
+
+
+def write_tiles(tiles, output_path, rows, columns, slm_x, slm_y):
+    """
+    Consume a tile stream, writing every tile as soon as it arrives.
+
+    Parameters:
+    tiles (iterable): (row, column, frame) tuples in printing order.
+    output_path (str): Folder for the frames and the csv files.
+    rows (int): Number of tile rows.
+    columns (int): Number of tile columns.
+    slm_x (float): Stage pitch in X.
+    slm_y (float): Stage pitch in Z.
+
+    Returns:
+    int: Number of tiles written.
+    """
+    coordinates = np.column_stack(coordinate_counts(*tile_coordinates(rows, columns, slm_x, slm_y)))
+
+    with TileWriter(output_path, coordinates) as writer:
+        for row, column, frame in tiles:
+            writer.write(frame)
+            print(f"Tile {writer.count} of {rows * columns} written (row {row}, column {column})")
+
+    return writer.count
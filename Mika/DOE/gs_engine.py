@@ -0,0 +1,346 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+"""
+Shared Gerchberg-Saxton engine.
+
+All working buffers are complex64/float32, allocated once per shape and updated in place. Phases are projected by
+normalizing (z / |z|) instead of going through np.angle and np.exp, and the FFTs come from a pluggable backend:
+
+    "numpy"   np.fft (in place with NumPy 2)
+    "scipy"   scipy.fft with workers= and overwrite_x
+    "pyfftw"  planned in-place pyFFTW transforms (optional dependency)
+
+Usage:
+    engine = GSEngine(target.shape, backend="scipy", workers=-1)
+    near_field = engine.run(target, max_iter=1000, tolerance=1e-5)
+    phase = np.angle(near_field)
+
+Stacks of targets of shape (B, H, W) go through the same FFT calls together, see gs_batched and gs_pool.
+
+Besides plain GS the engine runs weighted GS, GS with amplitude feedback and MRAF (see GSEngine.run), and records
+rmse, efficiency and uniformity per iteration in engine.history.
+"""
+
+try:
+    import scipy.fft as scipy_fft
+except ImportError:
+    scipy_fft = None
+
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
+BACKENDS = ["numpy", "scipy", "pyfftw"]
+MODES = ["gs", "weighted", "feedback", "mraf"]
+METRICS = ["rmse", "efficiency", "uniformity"]
+
+# Keeps the projection finite where the field is exactly zero
+EPSILON = np.float32(1e-30)
+
+
+class FFTBackend:
+    def __init__(self, buffer, backend="numpy", workers=None):
+        """
+        In-place 2D FFT pair operating on one preallocated complex64 buffer.
+
+        Parameters:
+        buffer (numpy.ndarray): complex64 array of shape (..., height, width), transformed over the last two axes.
+        backend (str): One of BACKENDS.
+        workers (int): Threads for the scipy and pyfftw backends, -1 uses all cores.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown FFT backend {backend!r}, choose one of {BACKENDS}")
+
+        self.buffer = buffer
+        self.backend = backend
+        self.workers = workers
+
+        # np.fft only accepts out= (and keeps complex64) from NumPy 2 on. fft2 with out aliasing its input gives
+        # wrong results, so the in-place transform is done one axis at a time
+        self.numpy_out = int(np.__version__.split(".")[0]) >= 2
+
+        if backend == "scipy" and scipy_fft is None:
+            raise ImportError("scipy is not installed, scipy backend not available")
+
+        if backend == "pyfftw":
+            if pyfftw is None:
+                raise ImportError("pyfftw is not installed, pyfftw backend not available")
+            threads = workers if workers is not None and workers > 0 else pyfftw.config.NUM_THREADS
+            self.forward_plan = pyfftw.FFTW(buffer, buffer, axes=(-2, -1), direction="FFTW_FORWARD",
+                                            flags=("FFTW_MEASURE",), threads=threads)
+            self.inverse_plan = pyfftw.FFTW(buffer, buffer, axes=(-2, -1), direction="FFTW_BACKWARD",
+                                            flags=("FFTW_MEASURE",), threads=threads,
+                                            normalise_idft=True)
+
+    def fft2(self):
+        if self.backend == "numpy" and self.numpy_out:
+            np.fft.fft(self.buffer, axis=-1, out=self.buffer)
+            np.fft.fft(self.buffer, axis=-2, out=self.buffer)
+        elif self.backend == "numpy":
+            self.buffer[...] = np.fft.fft2(self.buffer)
+        elif self.backend == "scipy":
+            self.buffer[...] = scipy_fft.fft2(self.buffer, workers=self.workers, overwrite_x=True)
+        else:
+            self.forward_plan()
+
+    def ifft2(self):
+        if self.backend == "numpy" and self.numpy_out:
+            np.fft.ifft(self.buffer, axis=-1, out=self.buffer)
+            np.fft.ifft(self.buffer, axis=-2, out=self.buffer)
+        elif self.backend == "numpy":
+            self.buffer[...] = np.fft.ifft2(self.buffer)
+        elif self.backend == "scipy":
+            self.buffer[...] = scipy_fft.ifft2(self.buffer, workers=self.workers, overwrite_x=True)
+        else:
+            self.inverse_plan()
+
+
+class GSEngine:
+    def __init__(self, shape, backend="numpy", workers=None):
+        """
+        Gerchberg-Saxton engine with preallocated buffers for one target shape.
+
+        Parameters:
+        shape (tuple): (height, width) of the target, or (batch, height, width) to run several targets together.
+        backend (str): FFT backend, one of BACKENDS.
+        workers (int): Threads for the FFT backend.
+        """
+        self.shape = tuple(shape)
+        self.field = np.zeros(self.shape, dtype=np.complex64)
+        self.magnitude = np.zeros(self.shape, dtype=np.float32)
+        self.target = np.zeros(self.shape, dtype=np.float32)
+        self.constraint = np.zeros(self.shape, dtype=np.float32)
+        self.signal = np.zeros(self.shape, dtype=bool)
+        self.fft = FFTBackend(self.field, backend, workers)
+
+        self.history = {metric: [] for metric in METRICS}
+        self.errors = self.history["rmse"]
+        self.iterations = 0
+
+    def run(self, target, max_iter=1000, tolerance=None, check_every=1, initial_phase=None, mode="gs",
+            track_metrics=False, feedback=0.5, mixing=0.6, signal_region=None, min_iter=10):
+        """
+        Run GS until max_iter or until the far-field error stops improving by more than tolerance.
+
+        Parameters:
+        target (numpy.ndarray): Far-field amplitude, shape must match the engine.
+        max_iter (int): Maximum number of iterations.
+        tolerance (float): Stop when the RMSE changes by less than this fraction between two checks, None disables
+            it.
+        check_every (int): Iterations between two metric evaluations.
+        initial_phase (numpy.ndarray): Starting far-field phase in radians, zero phase if None.
+        mode (str): Far-field constraint, one of MODES:
+            "gs"        plain GS, amplitude set to the target
+            "weighted"  weighted GS, the weights grow where the far field is too dim relative to the target
+            "feedback"  GSW with amplitude feedback, target + feedback * (target - achieved amplitude)
+            "mraf"      mixed-region amplitude freedom, mixing * target inside the signal region, the noise region
+                        keeps (1 - mixing) of its own amplitude
+        track_metrics (bool): Record rmse, efficiency and uniformity in history even without a tolerance.
+        feedback (float): Gain of the "feedback" mode.
+        mixing (float): Share of the signal region in the "mraf" mode, between 0 and 1.
+        signal_region (numpy.ndarray): Boolean mask of the signal region, target > 0 if None.
+        min_iter (int): Iterations before the tolerance is checked for the first time.
+
+        Returns:
+        numpy.ndarray: complex64 near field with unit amplitude. The array is the engine buffer, copy it if the
+        engine is reused.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown GS mode {mode!r}, choose one of {MODES}")
+
+        target = np.asarray(target, dtype=np.float32)
+        if target.shape != self.shape:
+            raise ValueError(f"Target shape {target.shape} does not match engine shape {self.shape}")
+
+        # The metrics use normalized amplitudes, so the target scale does not matter
+        self.target[...] = target
+        target_norm = np.sqrt(np.sum(self.target ** 2, axis=(-2, -1), keepdims=True))
+        target_norm[target_norm == 0] = 1
+        self.signal[...] = self.target > 0 if signal_region is None else signal_region
+        self.constraint[...] = self.target
+
+        # Starting point: target amplitude with zero (or given) phase
+        if initial_phase is None:
+            self.field[...] = self.target
+        else:
+            self.field[...] = self.target * np.exp(1j * np.asarray(initial_phase, dtype=np.float32))
+
+        for metric in METRICS:
+            self.history[metric].clear()
+        self.iterations = 0
+        record = track_metrics or tolerance is not None
+
+        for i in range(max_iter):
+            # Near field: keep the phase, force unit amplitude
+            self.fft.ifft2()
+            self.project_phase()
+
+            # Far field: keep the phase, enforce the (weighted) target amplitude
+            self.fft.fft2()
+            check = record and (i + 1) % check_every == 0
+            if check:
+                self.record_metrics(target_norm)
+            if mode != "gs":
+                self.update_constraint(mode, target_norm, feedback, mixing)
+            self.project_phase()
+            if mode == "mraf":
+                # The noise region keeps part of its own amplitude instead of being forced to the target
+                np.multiply(self.constraint, np.where(self.signal, 1, self.magnitude), out=self.constraint)
+            np.multiply(self.field, self.constraint, out=self.field)
+
+            self.iterations = i + 1
+            errors = self.history["rmse"]
+            if (check and tolerance is not None and i + 1 >= min_iter and len(errors) > 1
+                    and abs(errors[-2] - errors[-1]) < tolerance * errors[-2]):
+                break
+
+        # Back to the near field of the last far-field estimate
+        self.fft.ifft2()
+        self.project_phase()
+
+        return self.field
+
+    def project_phase(self):
+        """
+        Replace the field by z / |z| in place, |z| is left in self.magnitude.
+        """
+        np.abs(self.field, out=self.magnitude)
+        np.maximum(self.magnitude, EPSILON, out=self.magnitude)
+        np.divide(self.field, self.magnitude, out=self.field)
+
+    def update_constraint(self, mode, target_norm, feedback, mixing):
+        """
+        Far-field amplitude for the next projection, computed from the current far field.
+        """
+        magnitude = np.abs(self.field)
+        signal_magnitude = np.where(self.signal, magnitude, 0)
+        # Far-field amplitude on the scale of the target, measured over the signal region
+        scale = target_norm / np.maximum(np.sqrt(np.sum(signal_magnitude ** 2, axis=(-2, -1), keepdims=True)),
+                                         EPSILON)
+        achieved = magnitude * scale
+
+        if mode == "weighted":
+            # Weights grow where the far field falls short of the target and shrink where it overshoots
+            # The ratio is clipped per iteration, dim target pixels would otherwise make the weights oscillate
+            ratio = np.where(self.signal, np.clip(self.target / np.maximum(achieved, EPSILON), 0.5, 2), 1)
+            np.multiply(self.constraint, ratio, out=self.constraint)
+            # Keep the weights normalized to the target energy so they cannot drift
+            constraint_norm = np.sqrt(np.sum(self.constraint ** 2, axis=(-2, -1), keepdims=True))
+            np.multiply(self.constraint, target_norm / np.maximum(constraint_norm, EPSILON), out=self.constraint)
+        elif mode == "feedback":
+            self.constraint[...] = np.maximum(self.target + feedback * (self.target - achieved), 0)
+        elif mode == "mraf":
+            # Multiplied with the far-field amplitude in the noise region after the projection
+            self.constraint[...] = np.where(self.signal, mixing * self.target, (1 - mixing) * scale)
+
+    def record_metrics(self, target_norm):
+        """
+        Append rmse, efficiency and uniformity of the current far field to history (mean over a batch).
+
+        rmse:       RMS difference between normalized far-field amplitude and normalized target
+        efficiency: share of the far-field intensity inside the signal region
+        uniformity: 1 - RMS deviation of the intensity from the target intensity inside the signal region, relative
+                    to the mean target intensity there (both normalized to the same energy). 1 is perfect, equals
+                    1 - std / mean of the spot intensities for a spot array
+        """
+        np.abs(self.field, out=self.magnitude)
+        intensity = self.magnitude ** 2
+        total = np.sum(intensity, axis=(-2, -1), keepdims=True)
+        total[total == 0] = 1
+
+        difference = self.magnitude / np.sqrt(total) - self.target / target_norm
+        self.history["rmse"].append(float(np.sqrt(np.mean(difference ** 2))))
+
+        signal_intensity = np.where(self.signal, intensity, 0)
+        self.history["efficiency"].append(float(np.mean(np.sum(signal_intensity, axis=(-2, -1)) / total[..., 0, 0])))
+
+        achieved = np.where(self.signal, intensity, 0)
+        wanted = np.where(self.signal, self.target ** 2, 0)
+        achieved /= np.maximum(np.sum(achieved, axis=(-2, -1), keepdims=True), EPSILON)
+        wanted /= np.maximum(np.sum(wanted, axis=(-2, -1), keepdims=True), EPSILON)
+        signal_pixels = np.maximum(np.sum(self.signal, axis=(-2, -1)), 1)
+        deviation = np.sqrt(np.sum((achieved - wanted) ** 2, axis=(-2, -1)) / signal_pixels)
+        mean_wanted = np.sum(wanted, axis=(-2, -1)) / signal_pixels
+        self.history["uniformity"].append(float(np.mean(1 - deviation / np.maximum(mean_wanted, EPSILON))))
+
+
+def gs(target, max_iter=1000, tolerance=None, backend="numpy", workers=None, mode="gs"):
+    """
+    Convenience wrapper: phase of the GS near field for one target, in radians from -pi to pi.
+    """
+    engine = GSEngine(np.shape(target), backend=backend, workers=workers)
+    near_field = engine.run(target, max_iter=max_iter, tolerance=tolerance, mode=mode)
+    return np.angle(near_field)
+
+
+def gs_batched(targets, max_iter=1000, tolerance=None, batch_size=8, backend="scipy", workers=-1, mode="gs"):
+    """
+    Run GS on a stack of targets, batch_size targets at a time through the same FFT calls.
+
+    Memory is bounded by the batch: every target in a batch needs 16 bytes per pixel of working buffers
+    (about 35 MB at 1152x1920), the returned phases another 4 bytes per pixel.
+
+    Parameters:
+    targets (numpy.ndarray): Far-field amplitudes of shape (B, H, W).
+    max_iter (int): Maximum number of iterations per batch.
+    tolerance (float): Early stopping on the mean error of a batch, None disables it.
+    batch_size (int): Number of targets transformed together.
+    backend (str): FFT backend, one of BACKENDS.
+    workers (int): FFT threads, with the scipy backend they split the batch over the cores.
+    mode (str): GS mode, see GSEngine.run.
+
+    Returns:
+    numpy.ndarray: float32 phases of shape (B, H, W) in radians from -pi to pi.
+    """
+    targets = np.asarray(targets)
+    if targets.ndim != 3:
+        raise ValueError(f"Targets must have shape (B, H, W), got {targets.shape}")
+
+    count, height, width = targets.shape
+    phases = np.empty((count, height, width), dtype=np.float32)
+    engine = None
+
+    for start in range(0, count, batch_size):
+        batch = targets[start:start + batch_size]
+        # The last batch can be smaller, it gets its own buffers
+        if engine is None or engine.shape != batch.shape:
+            engine = GSEngine(batch.shape, backend=backend, workers=workers)
+        near_field = engine.run(batch, max_iter=max_iter, tolerance=tolerance, mode=mode)
+        phases[start:start + len(batch)] = np.angle(near_field)
+
+    return phases
+
+
+def gs_pool(targets, max_iter=1000, tolerance=None, batch_size=4, processes=None, backend="numpy", mode="gs"):
+    """
+    Same as gs_batched, but every batch runs in its own process of a process pool.
+
+    Use this when the FFT backend does not parallelize by itself. Peak memory is about processes times the memory
+    of one batch. On Windows it has to be called from under if __name__ == "__main__".
+    """
+    targets = np.asarray(targets)
+    if targets.ndim != 3:
+        raise ValueError(f"Targets must have shape (B, H, W), got {targets.shape}")
+
+    batches = [targets[start:start + batch_size] for start in range(0, len(targets), batch_size)]
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        results = executor.map(gs_batched, batches, [max_iter] * len(batches), [tolerance] * len(batches),
+                               [batch_size] * len(batches), [backend] * len(batches), [1] * len(batches),
+                               [mode] * len(batches))
+        return np.concatenate(list(results), axis=0)
+
+
+def split_into_tiles(image_array, rows, columns):
+    """
+    Split a 2D array into a (rows * columns, H, W) stack of equally sized tiles, row by row from the top left.
+    Remainder pixels at the right and bottom edges are dropped.
+    """
+    tile_height = image_array.shape[0] // rows
+    tile_width = image_array.shape[1] // columns
+    cropped = image_array[:rows * tile_height, :columns * tile_width]
+    return (cropped.reshape(rows, tile_height, columns, tile_width)
+            .swapaxes(1, 2)
+            .reshape(rows * columns, tile_height, tile_width))
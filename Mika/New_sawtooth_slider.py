@@ -13,6 +13,8 @@ import re # Regular Expression (re) is a package to check, if a string contains
 import numpy as np # Scientific computing package (NumPy)
 import os # used to create path to image folder
 
+REFRESH_MS = 16 # SLM refresh interval (60 Hz)
+
 class Adjustment_Frame(Frame):
     def __init__(self, parent, variable, from_limit, to_limit, interval, start_amt, text="", *args, **options):
         Frame.__init__(self, parent, *args, **options)
@@ -75,7 +77,9 @@ class SawTooth_slider:
         array_width = int(np.ceil( np.sqrt(pow(width, 2) + pow(height, 2))))
         array_height = array_width
         
-        self.data = np.zeros((array_height, array_width), dtype = np.uint16)
+        # Column of the unrotated diagonal-sized grating that every SLM pixel shows, cached per degree
+        self.source_columns = {}
+        self.pending_update = False
         self.y_max = IntVar()
         self.y_min = IntVar()
         self.x_max = IntVar()
@@ -103,11 +107,6 @@ class SawTooth_slider:
             os.makedirs(folder_path)
 
 
-        def center_crop(image, array_width, array_height, width, height):
-            x_margin = (array_width - width) //2
-            y_margin = (array_height - height) // 2
-            return image.crop((x_margin, y_margin, x_margin + width, y_margin + height))
-        
         def corner_crop(image, width, height):
             return image.crop((0,0,width, height))
         
@@ -115,19 +114,32 @@ class SawTooth_slider:
             file_name = os.path.join(folder_path, file_name)
             img.save(file_name)
         
+        def rotation_source_columns(degree):
+            # Same geometry as rotating the diagonal-sized image by degree (counterclockwise, nearest neighbour)
+            # and cropping the center, evaluated directly for the SLM pixels
+            if degree not in self.source_columns:
+                theta = np.radians(degree)
+                center = array_width / 2
+                x = np.arange(width) + (array_width - width) // 2 + 0.5 - center
+                y = np.arange(height) + (array_height - height) // 2 + 0.5 - center
+                columns = np.floor(center + np.cos(theta) * x[np.newaxis, :] - np.sin(theta) * y[:, np.newaxis])
+                self.source_columns[degree] = np.clip(columns, 0, array_width - 1).astype(np.intp)
+            return self.source_columns[degree]
+
         def create_grating():
            
             self.slope = (self.y_max.get()-self.y_min.get())/self.x_max.get()
-            
-            for i in range(array_width):
-                color = self.slope * (i % self.x_max.get()) + self.y_min.get()
-                self.data[:, i] = color
-            
-            self.img = Image.fromarray(self.data)
-            self.img = self.img.convert('L')
-            self.img = self.img.rotate(self.degree.get())
-            self.img = center_crop(self.img, array_width, array_height ,width, height)
-            self.photo = ImageTk.PhotoImage(self.img)
+
+            # One sawtooth row, then a single gather through the cached rotation
+            columns = np.arange(array_width)
+            profile = np.clip(self.slope * (columns % self.x_max.get()) + self.y_min.get(), 0, 255).astype(np.uint8)
+            self.img = Image.fromarray(profile[rotation_source_columns(self.degree.get())])
+
+            if hasattr(self, "photo"):
+                # Reuse the PhotoImage on the SLM, only the pixels are replaced
+                self.photo.paste(self.img)
+            else:
+                self.photo = ImageTk.PhotoImage(self.img)
         
         self.pattern_window = Toplevel(self.root, bg="blue")
 
@@ -146,7 +158,8 @@ class SawTooth_slider:
         self.pattern_window.overrideredirect(True)
 
             
-        def display_pattern(*args):
+        def render_pattern():
+            self.pending_update = False
             try:
                 int(self.y_max.get())
                 int(self.y_min.get())
@@ -154,9 +167,14 @@ class SawTooth_slider:
                 int(self.degree.get())
                 
                 create_grating()
-                self.pattern.config(image=self.photo)
             except:
                 print("entry box is not a valid integer")
+
+        def display_pattern(*args):
+            # Slider moves are coalesced, the SLM is redrawn at most once per refresh interval with the newest values
+            if not self.pending_update:
+                self.pending_update = True
+                self.root.after(REFRESH_MS, render_pattern)
             
 
         self.y_max.trace("w", display_pattern)
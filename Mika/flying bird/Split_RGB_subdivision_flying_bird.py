@@ -1,11 +1,17 @@
-import math
 import numpy as np
 from PIL import Image
 import os
-from scipy import signal, ndimage
 import csv
 import tkinter as tk
 from tkinter import filedialog, messagebox
+from grating_bank import GratingBank
+from phase_lut import PhaseLUT
+from tile_coordinates import coordinate_counts, tile_coordinates
+
+
+# Phase calibration of the SLM (csv with a "phase,gray" header, see phase_lut.py) the gratings are mapped through,
+# None writes them as computed
+SLM_LUT_FILE = None
 
 
 class PatternGeneration:
@@ -20,6 +26,8 @@ class PatternGeneration:
         self.x_max = [20, 20, 20, 20, 20, 20]
         self.y_max = [128, 128, 128, 128, 128, 128]
         self.angles = [0, 30, 60, 90, 120, 150]
+        # Phase to gray table of the SLM
+        self.lut = PhaseLUT.from_csv(SLM_LUT_FILE) if SLM_LUT_FILE else None
 
         self.file_path = get_file_path()
 
@@ -48,14 +56,27 @@ class PatternGeneration:
 
         self.added_RGB_values = []
         self.binary_pixel_list = self.generate_binary_pixel_list(self.images)
+        self.unique_pixels, self.frame_ids = self.deduplicate_pixels(self.binary_pixel_list)
         self.create_csv()
 
-        for i, pixel in enumerate(self.binary_pixel_list):
+        # The six rotated subpixels only depend on the settings, so they are built once
+        # and persisted next to the output for the following runs
+        self.grating_bank = GratingBank(cache_dir=os.path.join(self.filepath_output, "grating_bank"))
+        self.subpixels = self.grating_bank.get_many(
+            [(self.angles[i], self.subpixel_width, self.subpixel_height, self.x_max[i], self.y_max[i])
+             for i in range(len(self.angles))])
+        if self.lut is not None:
+            self.subpixels = [self.lut.apply_gray(subpixel) for subpixel in self.subpixels]
+        self.empty_subpixel = np.zeros((self.subpixel_height, self.subpixel_width))
+
+        # Every pixel is one of at most 2^6 combinations, so each unique frame is generated and saved only once
+        for i, pixel in enumerate(self.unique_pixels):
             slm_image = self.assemble_pixel(pixel)
             slm_image_filename = f"pattern_{i+1}.png"
             slm_image_filepath = os.path.join(self.filepath_output, slm_image_filename)
             slm_image.save(slm_image_filepath)
-            print(f"{i+1} of {len(self.binary_pixel_list)} images generated")
+            print(f"{i+1} of {len(self.unique_pixels)} unique images generated "
+                  f"({len(self.binary_pixel_list)} pixels)")
 
     def generate_binary_pixel_list(self, image_list):
         matrices =[]
@@ -95,6 +116,29 @@ class PatternGeneration:
 
         return binary_pixel_list
 
+    def deduplicate_pixels(self, pixel_list):
+        """
+        Assign a frame id to every pixel, pixels with the same binary combination share one frame.
+
+        Parameters:
+        pixel_list (list): Binary subpixel combination for each pixel in printing order.
+
+        Returns:
+        tuple: The list of unique pixels (frame id i + 1 is unique_pixels[i]) and the frame id for each pixel.
+        """
+        frame_lookup = {}
+        unique_pixels = []
+        frame_ids = []
+
+        for pixel in pixel_list:
+            key = tuple(int(binary) for binary in pixel)
+            if key not in frame_lookup:
+                unique_pixels.append(pixel)
+                frame_lookup[key] = len(unique_pixels)
+            frame_ids.append(frame_lookup[key])
+
+        return unique_pixels, frame_ids
+
     def assemble_pixel(self, pixel: list):
             assert len(pixel) == 6, "pixel must be of length 6"
             assert len(self.x_max) == 6, "x_max array must be of length 6"
@@ -102,11 +146,9 @@ class PatternGeneration:
 
             for i, binary in enumerate(pixel):
                 if int(binary) == 0:
-                    self.matrix_pixel_list.append(np.zeros((self.subpixel_height, self.subpixel_width)))
+                    self.matrix_pixel_list.append(self.empty_subpixel)
                 elif int(binary) == 1:
-                    self.matrix_pixel_list.append(
-                        generate_rotated_pixel(self.angles[i], self.subpixel_width, self.subpixel_height, self.x_max[i],
-                                               self.y_max[i]))
+                    self.matrix_pixel_list.append(self.subpixels[i])
                 else:
                     raise ValueError
 
@@ -167,21 +209,23 @@ class PatternGeneration:
         dataset_path = os.path.join(self.filepath_output, filename_dataset)
 
         # Calculate new coordinates without relying on added_RGB_values.csv
-        coordinates = calculate_coordinates(self.image_height, self.image_width, self.slm_x, self.slm_y)
+        x, z = coordinate_counts(*tile_coordinates(self.image_height, self.image_width, self.slm_x, self.slm_y))
 
         # Create a new list to store the modified data
         modified_data = []
 
         # Ensure that only the second and third columns are extended with the calculated coordinates
-        for i in range(len(coordinates)):
+        for i in range(len(x)):
             # Include exp_times in the first column and update the second and third columns
-            modified_data.append([self.added_RGB_values[i]] + [int(coord) for coord in coordinates[i]])
+            # The last column references the frame (pattern_{frame}.png) shown for this pixel
+            modified_data.append([self.added_RGB_values[i]] + [int(x[i]), int(z[i])] +
+                                 [self.frame_ids[i]])
 
         # Open the CSV file for writing
         with open(dataset_path, 'w', newline='') as output_file:
             # Write the header row
             writer = csv.writer(output_file)
-            writer.writerow(["addedRGB", "X", "Z"])
+            writer.writerow(["addedRGB", "X", "Z", "frame"])
             # Write the modified data
             writer.writerows(modified_data)
 
@@ -195,37 +239,6 @@ class PatternGeneration:
 
         return added_RGB_values
 
-def calculate_coordinates(rows, columns, slm_x, slm_y):
-    """
-    Calculate coordinates in a snake pattern.
-
-    Parameters:
-    rows (int): Number of rows.
-    columns (int): Number of columns.
-    slm (int): Spatial light modulator value.
-
-    Returns:
-    list: A list of coordinate tuples.
-    """
-    points = []
-    # Initialize starting coordinates
-    start_x = ((columns / 2) - 1) * slm_x + slm_x / 2
-    start_y = -(((rows / 2) - 1) * slm_y + slm_y / 2)
-
-    for row in range(rows):
-        for col in range(columns):
-            points.append((start_x, start_y))
-
-            # Update x-coordinate based on row parity and not at the end of the row
-            if col < columns - 1:
-                start_x -= slm_x if (row % 2 == 0) else 0
-                start_x += slm_x if (row % 2 != 0) else 0
-
-        # Update y-coordinate at the end of each row
-        start_y += slm_y
-
-    return points
-
 def get_file_path():
     root = tk.Tk()
     root.withdraw()
@@ -242,36 +255,6 @@ def get_file_path():
             break
     return file_path
 
-def center_crop(matrix, target_height, target_width):
-    h, w = matrix.shape  # Get original height and width
-
-    # Compute the starting row and column
-    start_row = (h - target_height) // 2
-    start_col = (w - target_width) // 2
-
-    # Crop using slicing
-    return matrix[start_row: start_row + target_height, start_col: start_col + target_width]
-
-def generate_rotated_pixel(angle, width, height, x_max=20, y_max=128, phi=0):
-    long_side = max(width, height)
-
-    uncropped_width = int(long_side * 1.414213)
-
-    pixel = np.zeros((uncropped_width, uncropped_width))
-
-    t = np.linspace(0, uncropped_width, uncropped_width)
-    omega = 2 * np.pi * 1 / x_max
-
-    waveform = (1 + signal.sawtooth(omega * t + math.radians(phi))) * y_max / 2
-
-    for i in range(pixel.shape[0]):
-        pixel[i, :] = waveform
-
-    pixel_rotated = ndimage.rotate(pixel, angle, reshape=True)
-    pixel_cropped = center_crop(pixel_rotated, height, width)
-
-    return pixel_cropped
-
 if __name__ == "__main__":
     PatternGeneration()
     print("Process completed")
@@ -0,0 +1,68 @@
+import math
+import time
+import numpy as np
+from scipy import ndimage
+from grating_bank import generate_rotated_pixel, synthesize_rotated_pixel
+
+"""
+Compares the rotate-and-crop grating (generate_rotated_pixel) with the analytic synthesis
+(synthesize_rotated_pixel) in speed and accuracy.
+
+generate_rotated_pixel samples its waveform with a linspace, which stretches the period slightly, and measures the
+phase from the corner of its oversized buffer. For the accuracy comparison synthesize_rotated_pixel is called with
+the period and phase that match this geometry (matched_parameters), so the remaining difference in gray levels is
+the interpolation blur of ndimage.rotate, largest next to the jumps of the sawtooth.
+"""
+
+angles = [0, 30, 60, 90, 120, 150]
+sizes = [(640, 576), (1920, 1152)]
+x_max = 20
+y_max = 128
+repeats = 3
+
+
+def matched_parameters(angle, width, height, x_max, phi=0):
+    """
+    Period and phase for synthesize_rotated_pixel that reproduce the grating of generate_rotated_pixel.
+
+    Returns:
+    tuple: x_max and phi in degrees.
+    """
+    uncropped_width = int(max(width, height) * 1.414213)
+    rotated_shape = ndimage.rotate(np.zeros((uncropped_width, uncropped_width)), angle, reshape=True).shape
+
+    # linspace(0, n, n) puts n / (n - 1) between samples
+    period = x_max * (uncropped_width - 1) / uncropped_width
+    # Offset of the pixel center from the center of the rotated buffer, y upwards
+    offset_x = (rotated_shape[1] - width) // 2 + (width - 1) / 2 - (rotated_shape[1] - 1) / 2
+    offset_y = (rotated_shape[0] - 1) / 2 - (rotated_shape[0] - height) // 2 - (height - 1) / 2
+
+    theta = math.radians(angle)
+    center = (uncropped_width - 1) / 2 + offset_x * math.cos(theta) + offset_y * math.sin(theta)
+    return period, (center / period * 360 + phi) % 360
+
+
+def time_function(function, *args):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function(*args)
+    return (time.perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    print(f"x_max = {x_max}, y_max = {y_max}, mean of {repeats} runs, errors in gray levels\n")
+    print(f"{'size':>10} {'angle':>6} {'rotate [ms]':>12} {'synth [ms]':>11} {'speedup':>8} "
+          f"{'max err':>8} {'mean err':>9} {'median err':>11} {'|err|<1':>8}")
+
+    for width, height in sizes:
+        for angle in angles:
+            rotate_time = time_function(generate_rotated_pixel, angle, width, height, x_max, y_max)
+            synth_time = time_function(synthesize_rotated_pixel, angle, width, height, x_max, y_max)
+
+            period, phi = matched_parameters(angle, width, height, x_max)
+            error = np.abs(generate_rotated_pixel(angle, width, height, x_max, y_max) -
+                           synthesize_rotated_pixel(angle, width, height, period, y_max, phi))
+
+            print(f"{width}x{height:<5} {angle:>6} {rotate_time * 1000:>12.1f} {synth_time * 1000:>11.1f} "
+                  f"{rotate_time / synth_time:>7.1f}x {error.max():>8.1f} {error.mean():>9.3f} "
+                  f"{np.median(error):>11.3f} {(error < 1).mean() * 100:>7.1f}%")
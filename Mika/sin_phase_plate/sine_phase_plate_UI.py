@@ -3,7 +3,9 @@ from tkinter import ttk
 from sine_phase_plate_backend import *
 import screeninfo
 from PIL import Image, ImageTk
+import csv
 import queue
+import time
 import logging
 import coloredlogs
 
@@ -24,6 +26,15 @@ coloredlogs.install(
     field_styles=field_styles)
 
 
+# csv file for the timing of every SLM image (scheduled, started, applied, flushed in ms), None is off
+SLM_TRACE_PATH = None
+
+# Milliseconds between refreshes of the process screen from the telemetry
+UI_REFRESH_MS = 500
+# UDP port on localhost the telemetry is also sent to for dashboards (python telemetry.py --port ...), None is off
+TELEMETRY_PORT = None
+
+
 class ImageDisplay(tk.Toplevel):
     def __init__(self, monitor: int):
         assert isinstance(monitor, int) and monitor >= 0, "Monitor must be a non-negative integer!"
@@ -44,32 +55,70 @@ class ImageDisplay(tk.Toplevel):
         
         self.overrideredirect(True)
 
-        # Initialize the label to None
+        # Label and PhotoImage are created with the first image, later images are pasted into the same PhotoImage
         self.label = None
+        self.photo = None
+        self.photo_mode = None
+        self.photo_size = None
+        self.latencies = []
+        self.trace_rows = []
+        self.trace_origin = time.perf_counter()
+
+    def show_image(self, image_object, scheduled=None):
+        assert isinstance(image_object, Image.Image), "Image must be a PIL Image object"
 
-    def show_image(self, image_object):
+        started = time.perf_counter()
+        if self.photo is None or image_object.mode != self.photo_mode or image_object.size != self.photo_size:
+            self.__allocate(image_object.mode, image_object.size)
+        self.photo.paste(image_object)
+        applied = time.perf_counter()
+
+        # Redraw now, so the latency covers the image actually being on the screen
+        self.update_idletasks()
+        flushed = time.perf_counter()
+
+        if scheduled is not None:
+            latency = flushed - scheduled
+            self.latencies.append(latency)
+            logger.debug(f"ImageDisplay: frame-to-screen latency {latency * 1000:.1f} ms")
+        if SLM_TRACE_PATH is not None:
+            times = [None if t is None else round((t - self.trace_origin) * 1000, 3)
+                     for t in (scheduled, started, applied, flushed)]
+            self.trace_rows.append([len(self.trace_rows) + 1] + times)
+
+    def save_trace(self):
+        if SLM_TRACE_PATH is None or not self.trace_rows:
+            return
+        with open(SLM_TRACE_PATH, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["frame", "scheduled_ms", "started_ms", "applied_ms", "flushed_ms"])
+            writer.writerows([["" if value is None else value for value in row] for row in self.trace_rows])
+        logger.info(f"ImageDisplay: timing of {len(self.trace_rows)} images saved at {SLM_TRACE_PATH}")
+        self.trace_rows = []
+
+    def thread_safe_show_image(self, image_object):
         assert isinstance(image_object, Image.Image), "Image must be a PIL Image object"
+        self.after(0, self.show_image, image_object, time.perf_counter())
 
-        photo = ImageTk.PhotoImage(image_object)
+    def latency_report(self):
+        if not self.latencies:
+            return "no images shown"
+        latencies_ms = [latency * 1000 for latency in self.latencies]
+        return (f"{len(latencies_ms)} images, frame-to-screen latency mean "
+                f"{sum(latencies_ms) / len(latencies_ms):.1f} ms, max {max(latencies_ms):.1f} ms")
+
+    def __allocate(self, mode, size):
+        self.photo = ImageTk.PhotoImage(mode, size)
+        self.photo_mode = mode
+        self.photo_size = size
 
         if self.label is None:
             # Create a label to hold the image
-            self.label = tk.Label(self, image=photo)
-            self.label.image = photo  # Keep a reference to avoid garbage collection
+            self.label = tk.Label(self, image=self.photo)
             self.label.pack()
         else:
-            self.__update_image(photo)
-
-    def thread_safe_show_image(self, image_object):
-        assert isinstance(image_object, Image.Image), "Image must be a PIL Image object"
-        self.after(0, self.show_image, image_object)
-
-    def __update_image(self, photo):
-        assert isinstance(photo, ImageTk.PhotoImage), "Image must be a PhotoImage object"
-
-        # Update the image in the existing label
-        self.label.configure(image=photo)
-        self.label.image = photo  # Update the reference to avoid garbage collection
+            self.label.configure(image=self.photo)
+        self.label.image = self.photo  # Keep a reference to avoid garbage collection
 
 
 class NoSecondMonitorError(Exception):
@@ -84,7 +133,7 @@ class App(tk.Tk):
 
         self.command_queue = queue.Queue()
         self.error_queue = queue.Queue()
-        self.motion_control_monitor = MotionControlThreadMonitor()
+        self.motion_control_monitor = MotionControlThreadMonitor(port=TELEMETRY_PORT)
         self.image_display = ImageDisplay(0)
 
         self.grid_columnconfigure(0, weight=1)
@@ -102,6 +151,7 @@ class App(tk.Tk):
 
     def close_application(self):
         self.motion_control_monitor.kill_flag = True
+        self.motion_control_monitor.close()
         self.destroy()
 
     def error_check(self):
@@ -331,8 +381,8 @@ class FocusingScreen(ttk.Frame):
 
     def error_check(self):
         self.master.error_check()
-        if self.master.motion_control_monitor.busy_flag:
-            self.after(500, self.error_check)
+        if self.master.motion_control_monitor.telemetry.snapshot.busy:
+            self.after(UI_REFRESH_MS, self.error_check)
 
 
 class ProcessScreen(ttk.Frame):
@@ -389,23 +439,27 @@ class ProcessScreen(ttk.Frame):
         self.master.close_application()
 
     def update_label(self):
-        if self.master.motion_control_monitor.busy_flag:
+        # One record, all labels show the same moment
+        telemetry = self.master.motion_control_monitor.telemetry.snapshot
+        positions = telemetry.positions or ("---",) * 3
+        speeds = telemetry.speeds or ("---",) * 3
+        if telemetry.busy:
             self.label_status_value.configure(text="running")
         else:
             self.label_status_value.configure(text="not running")
-        self.label_progress_value.configure(text=f"{self.master.motion_control_monitor.ring_counter}"
-                                                 f" / {self.master.motion_control_monitor.rings_total} "
-                                                 f"({self.master.motion_control_monitor.percentage_done:.2f} %)")
-        self.label_angular_velocity_value.configure(text=f"{self.master.motion_control_monitor.speed_axis3} deg/s")
-        self.label_position_value.configure(text=f"X: {self.master.motion_control_monitor.position_axis1} mm "
-                                                 f"Y: {self.master.motion_control_monitor.position_axis2} mm "
-                                                 f"φ: {self.master.motion_control_monitor.position_axis3} deg")
-        self.after(500, self.update_label)
+        self.label_progress_value.configure(text=f"{telemetry.step or 1}"
+                                                 f" / {telemetry.steps or '---'} "
+                                                 f"({telemetry.percentage_done:.2f} %)")
+        self.label_angular_velocity_value.configure(text=f"{speeds[2]} deg/s")
+        self.label_position_value.configure(text=f"X: {positions[0]} mm "
+                                                 f"Y: {positions[1]} mm "
+                                                 f"φ: {positions[2]} deg")
+        self.after(UI_REFRESH_MS, self.update_label)
 
     def error_check(self):
         self.master.error_check()
-        if self.master.motion_control_monitor.busy_flag:
-            self.after(500, self.error_check)
+        if self.master.motion_control_monitor.telemetry.snapshot.busy:
+            self.after(UI_REFRESH_MS, self.error_check)
 
 
 if __name__ == "__main__":
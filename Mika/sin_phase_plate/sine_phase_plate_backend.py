@@ -10,10 +10,16 @@ import threading
 from threading import Thread
 import queue
 import logging
+from telemetry import TELEMETRY_RATE, TelemetryPublisher
 
 
 logger = logging.getLogger(__name__)
 
+# Seconds between the position and speed queries while a ring prints, each query is a serial round trip to the ESP
+POSITION_POLL = 0.5
+# Seconds the idle motion thread waits for a command before checking the kill flag again
+COMMAND_POLL = 0.1
+
 
 class Settings:
     def __init__(self):
@@ -420,16 +426,16 @@ class MotionControlThread(Thread):
     def run(self):
         logger.info("System (MotionControlThread): thread started ")
         while not self.monitor.kill_flag:
-            if self.command_queue.empty():
-                pass
-            else:
-                self.monitor.busy_flag = True
-                command = self.command_queue.get()
-                logger.info(f"System (MotionControlThread): Command received: {command}")
-                self.__handle_command(command)
-                self.command_queue.task_done()
-                self.monitor.busy_flag = False
-                logger.info("System (MotionControlThread): Command done")
+            try:
+                command = self.command_queue.get(timeout=COMMAND_POLL)
+            except queue.Empty:
+                continue
+            self.monitor.telemetry.publish(busy=True, status=command[0])
+            logger.info(f"System (MotionControlThread): Command received: {command}")
+            self.__handle_command(command)
+            self.command_queue.task_done()
+            self.monitor.telemetry.publish(busy=False, status="")
+            logger.info("System (MotionControlThread): Command done")
         self.instruments.close_connection()
         logger.info("System (MotionControlThread): thread terminated")
 
@@ -463,8 +469,7 @@ class MotionControlThread(Thread):
 
         images = generator.generate_images()
 
-        self.monitor.ring_counter = 1
-        self.monitor.rings_total = len(images)
+        self.monitor.telemetry.publish(step=1, steps=len(images), percentage_done=0.0)
 
         grating_width = self.settings.grating_width / 1000
         grating_height = self.settings.grating_height / 1000
@@ -482,11 +487,13 @@ class MotionControlThread(Thread):
                                         self.settings.laser_power)
             self.wait()
             self.instruments.shutter.close_shutter()
-            self.monitor.ring_counter += 1
+            self.monitor.telemetry.publish(step=image_index + 2)
             if self.monitor.kill_flag:
                 break
 
         self.instruments.laser.send_command("L=0")
+        logger.info(f"System (MotionControlThread): SLM {self.image_display.latency_report()}")
+        self.image_display.save_trace()
 
     def wait(self):
         logger.info(f"System (MotionControlThread): printing ring")
@@ -497,156 +504,47 @@ class MotionControlThread(Thread):
                 self.instruments.esp.stop_movement()
             else:
                 position = self.instruments.esp.get_axis_position()
-                self.monitor.position_axis1 = position[0]
-                self.monitor.position_axis2 = position[1]
-                self.monitor.position_axis3 = position[2]
                 speed = self.instruments.esp.get_axis_speed()
-                self.monitor.speed_axis1 = speed[0]
-                self.monitor.speed_axis2 = speed[1]
-                self.monitor.speed_axis3 = speed[2]
-
-                while time.time() < start_time + 0.5:
-                    pass
+                telemetry = self.monitor.telemetry.snapshot
+                percentage_done = telemetry.percentage_done
+                if telemetry.steps:
+                    # A ring is one turn of axis 3
+                    turns = abs(float(position[2])) + (telemetry.step - 1) * 360
+                    percentage_done = turns / (telemetry.steps * 360) * 100
+                self.monitor.telemetry.publish(positions=tuple(position), speeds=tuple(speed),
+                                               percentage_done=percentage_done)
+
+                # Sleeping instead of spinning leaves the GIL to the UI
+                time.sleep(max(0.0, start_time + POSITION_POLL - time.time()))
         if not self.monitor.kill_flag:
             logger.info("System (MotionControlThread): ring done")
 
 
 class MotionControlThreadMonitor:
-    def __init__(self):
-        # Attributes:
-        self.__busy_flag = False
-        self.__kill_flag = False
-        self.__ring_counter = 1
-        self.__rings_total = "---"
-        self.__percentage_done = 0
-        self.__speed_axis1 = "---"
-        self.__speed_axis2 = "---"
-        self.__speed_axis3 = "---"
-        self.__position_axis1 = "---"
-        self.__position_axis2 = "---"
-        self.__position_axis3 = "---"
-
-        # Locks:
-        self.__busy_flag_lock = threading.Lock()
-        self.__kill_flag_lock = threading.Lock()
-        self.__ring_counter_lock = threading.Lock()
-        self.__rings_total_lock = threading.Lock()
-        self.__percentage_done_lock = threading.Lock()
-        self.__speed_axis1_lock = threading.Lock()
-        self.__speed_axis2_lock = threading.Lock()
-        self.__speed_axis3_lock = threading.Lock()
-        self.__position_axis1_lock = threading.Lock()
-        self.__position_axis2_lock = threading.Lock()
-        self.__position_axis3_lock = threading.Lock()
-
-    @property
-    def busy_flag(self):
-        with self.__busy_flag_lock:
-            return self.__busy_flag
-
-    @busy_flag.setter
-    def busy_flag(self, value: bool):
-        with self.__busy_flag_lock:
-            self.__busy_flag = value
+    """
+    Shared by the UI and the MotionControlThread: the kill flag the UI sets and the telemetry the thread publishes
+    (busy, ring and rings, progress, positions and speeds of the axes). Readers take telemetry.snapshot, one complete
+    record, without locking anything the motion thread uses. The kill flag only stops the thread, the telemetry is
+    closed with close() when the application shuts down.
+
+    Parameters:
+    port (int): UDP port on localhost the telemetry is sent to as well, None for none (see telemetry.py).
+    rate (float): Records per second sent to the port at most.
+    """
+    def __init__(self, port=None, rate=TELEMETRY_RATE):
+        self.kill_event = threading.Event()
+        self.telemetry = TelemetryPublisher("phase plate", port, rate)
 
     @property
     def kill_flag(self):
-        with self.__kill_flag_lock:
-            return self.__kill_flag
+        return self.kill_event.is_set()
 
     @kill_flag.setter
     def kill_flag(self, value: bool):
-        with self.__kill_flag_lock:
-            self.__kill_flag = value
-
-    @property
-    def ring_counter(self):
-        with self.__ring_counter_lock:
-            return self.__ring_counter
-
-    @ring_counter.setter
-    def ring_counter(self, value: int):
-        with self.__ring_counter_lock:
-            self.__ring_counter = value
-
-    @property
-    def rings_total(self):
-        with self.__rings_total_lock:
-            return self.__rings_total
-
-    @rings_total.setter
-    def rings_total(self, value: int):
-        with self.__rings_total_lock:
-            self.__rings_total = value
-
-    @property
-    def percentage_done(self):
-        with self.__percentage_done_lock:
-            return self.__percentage_done
-
-    @percentage_done.setter
-    def percentage_done(self, value: int):
-        with self.__percentage_done_lock:
-            self.__percentage_done = value
-
-    @property
-    def speed_axis1(self):
-        with self.__speed_axis1_lock:
-            return self.__speed_axis1
-
-    @speed_axis1.setter
-    def speed_axis1(self, value):
-        with self.__speed_axis1_lock:
-            self.__speed_axis1 = value
-
-    @property
-    def speed_axis2(self):
-        with self.__speed_axis2_lock:
-            return self.__speed_axis2
-
-    @speed_axis2.setter
-    def speed_axis2(self, value):
-        with self.__speed_axis2_lock:
-            self.__speed_axis2 = value
-
-    @property
-    def speed_axis3(self):
-        with self.__speed_axis3_lock:
-            return self.__speed_axis3
-
-    @speed_axis3.setter
-    def speed_axis3(self, value):
-        with self.__speed_axis3_lock:
-            self.__speed_axis3 = value
-
-    @property
-    def position_axis1(self):
-        with self.__position_axis1_lock:
-            return self.__position_axis1
-
-    @position_axis1.setter
-    def position_axis1(self, value):
-        with self.__position_axis1_lock:
-            self.__position_axis1 = value
-
-    @property
-    def position_axis2(self):
-        with self.__position_axis2_lock:
-            return self.__position_axis2
-
-    @position_axis2.setter
-    def position_axis2(self, value):
-        with self.__position_axis2_lock:
-            self.__position_axis2 = value
+        if value:
+            self.kill_event.set()
+        else:
+            self.kill_event.clear()
 
-    @property
-    def position_axis3(self):
-        with self.__position_axis3_lock:
-            return self.__position_axis3
-
-    @position_axis3.setter
-    def position_axis3(self, value):
-        with self.__position_axis3_lock:
-            self.__position_axis3 = value
-            if self.rings_total != "---":
-                self.percentage_done = ((abs(float(value))+((self.ring_counter-1)*360))/(float(self.rings_total) * 360))*100
+    def close(self):
+        self.telemetry.close()
@@ -3,6 +3,13 @@ from PIL import Image
 import os
 from scipy import signal
 import csv
+from phase_lut import PhaseLUT
+from tile_coordinates import coordinate_counts, tile_coordinates
+
+
+# Phase calibration of the SLM (csv with a "phase,gray" header, see phase_lut.py) the waveforms are mapped through,
+# None writes them as computed
+SLM_LUT_FILE = None
 
 
 class PatternGeneration:
@@ -33,6 +40,8 @@ class PatternGeneration:
         self.x_max_green = 32.7
         self.x_max_blue = 30
         self.y_max = 128
+        # Phase to gray table of the SLM
+        self.lut = PhaseLUT.from_csv(SLM_LUT_FILE) if SLM_LUT_FILE else None
 
         # Initialize subpixel list and main pixel grid
         self.subpixel_list = []
@@ -85,6 +94,10 @@ class PatternGeneration:
         waveform_red = (1 + signal.sawtooth(omega_red * t)) * self.y_max / 2
         waveform_green = (1 + signal.sawtooth(omega_green * t)) * self.y_max / 2
         waveform_blue = (1 + signal.sawtooth(omega_blue * t)) * self.y_max / 2
+        if self.lut is not None:
+            waveform_red = self.lut.apply_gray(waveform_red)
+            waveform_green = self.lut.apply_gray(waveform_green)
+            waveform_blue = self.lut.apply_gray(waveform_blue)
 
         # Generate subpixel patterns based on RGB percentages
         for i, rgb in enumerate(rgb_color):
@@ -233,15 +246,15 @@ class PatternGeneration:
         dataset_path = os.path.join(self.filepath_output, filename_dataset)
 
         # Calculate new coordinates without relying on added_RGB_values.csv
-        coordinates = calculate_coordinates(self.image_height, self.image_width, self.slm_x, self.slm_y)
+        x, z = coordinate_counts(*tile_coordinates(self.image_height, self.image_width, self.slm_x, self.slm_y))
 
         # Create a new list to store the modified data
         modified_data = []
 
         # Ensure that only the second and third columns are extended with the calculated coordinates
-        for i in range(len(coordinates)):
+        for i in range(len(x)):
             # Include exp_times in the first column and update the second and third columns
-            modified_data.append([self.added_RGB_values[i]] + [int(coord) for coord in coordinates[i]])
+            modified_data.append([self.added_RGB_values[i]] + [int(x[i]), int(z[i])])
 
         # Open the CSV file for writing
         with open(dataset_path, 'w', newline='') as output_file:
@@ -283,38 +296,6 @@ def image_to_rgb_array(image):
 
     return rgb_array
 
-def calculate_coordinates(rows, columns, slm_x, slm_y):
-    """
-    Calculate coordinates in a snake pattern.
-
-    Parameters:
-    rows (int): Number of rows.
-    columns (int): Number of columns.
-    slm (int): Spatial light modulator value.
-
-    Returns:
-    list: A list of coordinate tuples.
-    """
-    points = []
-    # Initialize starting coordinates
-    start_x = ((columns / 2) - 1) * slm_x + slm_x / 2
-    start_y = -(((rows / 2) - 1) * slm_y + slm_y / 2)
-
-    for row in range(rows):
-        for col in range(columns):
-            points.append((start_x, start_y))
-
-            # Update x-coordinate based on row parity and not at the end of the row
-            if col < columns - 1:
-                start_x -= slm_x if (row % 2 == 0) else 0
-                start_x += slm_x if (row % 2 != 0) else 0
-
-        # Update y-coordinate at the end of each row
-        start_y += slm_y
-
-    return points
-
-
 if __name__ == "__main__":
     PatternGeneration()
     print("Process completed")
@@ -3,18 +3,35 @@ from PIL import Image
 import os
 from scipy import signal
 import csv
+from dose_model import Y_MAX_LIMIT, DoseModel, save_exposures
+from job_manifest import save_manifest
+from tile_coordinates import coordinate_counts, tile_coordinates
+
+# Write every tile with the y_max of the highest brightness and expose it correspondingly shorter
+REBALANCE_Y_MAX = False
 
 
 class PatternGeneration:
-    def __init__(self):
+    def __init__(self, filename_image="test4.png", filepath_input=None, filepath_output=None, dose_model=None,
+                 rebalance=REBALANCE_Y_MAX, y_max_limit=Y_MAX_LIMIT, min_dose=0.0, lut=None):
         """
         Initialize the PatternGeneration class with default parameters,
         load the image, and start the pixel processing and CSV creation.
+
+        Parameters:
+        filename_image (str): Image to print.
+        filepath_input (str): Folder of the image, the working directory if None.
+        filepath_output (str): Folder for the frames and CSV files, the working directory if None.
+        dose_model (DoseModel): Dose model with the color calibration and y_max response, the default one if None.
+        rebalance (bool): Trade exposure for y_max, see DoseModel.rebalance.
+        y_max_limit (int): Largest y_max rebalancing may use.
+        min_dose (float): Shortest exposure as a fraction of the maximum exposure time.
+        lut (PhaseLUT): Phase to gray table of the SLM the waveforms are mapped through, e.g.
+            PhaseLUT.for_wavelength(633, calibration_dir), None writes them as computed.
         """
         # Set the file path and image filename
-        self.filepath_output = os.getcwd()
-        self.filepath_input = os.getcwd()
-        filename_image = "test4.png"
+        self.filepath_output = os.getcwd() if filepath_output is None else filepath_output
+        self.filepath_input = os.getcwd() if filepath_input is None else filepath_input
 
         # Define dimensions for subpixels and SLM (spatial light modulator)
         self.subpixel_width = 640
@@ -34,6 +51,7 @@ class PatternGeneration:
         self.x_max_blue = 30
         self.y_max = 128
         self.y_max_modifier = 80
+        self.lut = lut
 
         # Initialize subpixel list and main pixel grid
         self.subpixel_list = []
@@ -52,9 +70,18 @@ class PatternGeneration:
         self.pixel_list = self.rgb_array_to_pixel_list(self.rgb_array)
         self.added_RGB_values = []
 
+        # Exposure of every tile from its colors, as a fraction of the maximum exposure time
+        self.dose_model = DoseModel() if dose_model is None else dose_model
+        tile_colors = np.array(self.pixel_list, dtype=float).reshape(len(self.pixel_list), 6, 3)
+        self.doses = self.dose_model.tile_doses(tile_colors)
+        self.exposures = self.doses
+        self.tile_y_max = np.full(len(self.pixel_list), self.y_max)
+        if rebalance:
+            self.exposures, self.tile_y_max = self.dose_model.rebalance(self.doses, self.y_max, y_max_limit, min_dose)
+
         # Generate and save subdivided pixel patterns for each pixel
         for i, pixel in enumerate(self.pixel_list):
-            slm_image = self.subdivided_pixel(pixel)
+            slm_image = self.subdivided_pixel(pixel, self.tile_y_max[i])
             slm_image_filename = f"pattern_{i+1}.png"
             slm_image_filepath = os.path.join(self.filepath_output, slm_image_filename)
             slm_image.save(slm_image_filepath)
@@ -62,12 +89,13 @@ class PatternGeneration:
 
         self.create_csv()
 
-    def subdivided_pixel(self, rgb_color: list):
+    def subdivided_pixel(self, rgb_color: list, tile_y_max: float = 128):
         """
         Create subdivided pixels based on the given color list.
 
         Parameters:
         rgb_color (list): A list of 6 RGB colors.
+        tile_y_max (float): y_max of the brightest subpixel, the others are scaled down from it.
 
         Returns:
         Image: A PIL image object representing the generated pixel image.
@@ -82,6 +110,8 @@ class PatternGeneration:
         max_value = max(total_values)
 
         self.added_RGB_values.append(max_value)
+        # Dose of every subpixel relative to the brightest one, weighted per color by the dose model
+        levels = self.dose_model.subpixel_levels(np.array(rgb_color, dtype=float))
 
         # Generate subpixel patterns based on RGB percentages
         for i, rgb in enumerate(rgb_color):
@@ -93,13 +123,19 @@ class PatternGeneration:
                 red_width = int(rgb[0]) / total * self.subpixel_width
                 green_width = int(rgb[1]) / total * self.subpixel_width
 
-                normalized_value = total / max_value
-                if normalized_value == 1:
-                    waveform_red = self.generate_waveform(128, 'red')
-                    waveform_green = self.generate_waveform(128, 'green')
-                    waveform_blue = self.generate_waveform(128, 'blue')
+                normalized_value = levels[i]
+                if self.dose_model.response is not None:
+                    # Measured response: the y_max that gives the subpixel its share of the tile's brightness
+                    y_max = self.dose_model.subpixel_y_max(normalized_value, tile_y_max)
+                    waveform_red = self.generate_waveform(y_max, 'red')
+                    waveform_green = self.generate_waveform(y_max, 'green')
+                    waveform_blue = self.generate_waveform(y_max, 'blue')
+                elif normalized_value == 1:
+                    waveform_red = self.generate_waveform(tile_y_max, 'red')
+                    waveform_green = self.generate_waveform(tile_y_max, 'green')
+                    waveform_blue = self.generate_waveform(tile_y_max, 'blue')
                 else:
-                    y_max = normalized_value * self.y_max_modifier
+                    y_max = normalized_value * self.y_max_modifier * tile_y_max / self.y_max
                     waveform_red = self.generate_waveform(y_max, 'red')
                     waveform_green = self.generate_waveform(y_max, 'green')
                     waveform_blue = self.generate_waveform(y_max, 'blue')
@@ -148,6 +184,8 @@ class PatternGeneration:
         else:
             raise ValueError("color can only be 'red', 'green' or 'blue'")
 
+        if self.lut is not None:
+            return self.lut.apply_gray(waveform)
         return waveform
 
     def place_subpixel(self, i: int):
@@ -239,15 +277,15 @@ class PatternGeneration:
         dataset_path = os.path.join(self.filepath_output, filename_dataset)
 
         # Calculate new coordinates without relying on added_RGB_values.csv
-        coordinates = calculate_coordinates(self.image_height, self.image_width, self.slm_x, self.slm_y)
+        x, z = coordinate_counts(*tile_coordinates(self.image_height, self.image_width, self.slm_x, self.slm_y))
 
         # Create a new list to store the modified data
         modified_data = []
 
         # Ensure that only the second and third columns are extended with the calculated coordinates
-        for i in range(len(coordinates)):
+        for i in range(len(x)):
             # Include exp_times in the first column and update the second and third columns
-            modified_data.append([self.added_RGB_values[i]] + [int(coord) for coord in coordinates[i]])
+            modified_data.append([self.added_RGB_values[i]] + [int(x[i]), int(z[i])])
 
         # Open the CSV file for writing
         with open(dataset_path, 'w', newline='') as output_file:
@@ -257,7 +295,10 @@ class PatternGeneration:
             # Write the modified data
             writer.writerows(modified_data)
 
-        print("Both CSV-Sheets have been created")
+        save_exposures(self.filepath_output, self.exposures)
+        save_manifest(self.filepath_output, x, z, self.added_RGB_values, self.exposures, rows=self.image_height,
+                      columns=self.image_width)
+        print("Both CSV-Sheets, the exposures and the job manifest have been created")
 
 
 def image_to_rgb_array(image):
@@ -291,38 +332,6 @@ def image_to_rgb_array(image):
     return rgb_array
 
 
-def calculate_coordinates(rows, columns, slm_x, slm_y):
-    """
-    Calculate coordinates in a snake pattern.
-
-    Parameters:
-    rows (int): Number of rows.
-    columns (int): Number of columns.
-    slm (int): Spatial light modulator value.
-
-    Returns:
-    list: A list of coordinate tuples.
-    """
-    points = []
-    # Initialize starting coordinates
-    start_x = ((columns / 2) - 1) * slm_x + slm_x / 2
-    start_y = -(((rows / 2) - 1) * slm_y + slm_y / 2)
-
-    for row in range(rows):
-        for col in range(columns):
-            points.append((start_x, start_y))
-
-            # Update x-coordinate based on row parity and not at the end of the row
-            if col < columns - 1:
-                start_x -= slm_x if (row % 2 == 0) else 0
-                start_x += slm_x if (row % 2 != 0) else 0
-
-        # Update y-coordinate at the end of each row
-        start_y += slm_y
-
-    return points
-
-
 if __name__ == "__main__":
     PatternGeneration()
     print("Process completed")
@@ -0,0 +1,91 @@
+import argparse
+import os
+import numpy as np
+from Split_RGB_subdivision_ymax_manipulation import PatternGeneration
+from dose_model import DoseModel, exposure_times, load_calibration, load_response
+from print_time_estimator import format_eta, load_job, stitch_durations
+
+'''
+Stitch job with the y_max and exposure of every tile chosen for the shortest print at the brightness the image asks
+for, calibrated with the y_max study.
+
+The study measured the grating depth for y_max from 2 to 180 at one exposure. With the depth per second of exposure
+as brightness, a tile reaches its brightness with less exposure at the y_max of the deepest gratings than at the
+usual 128, and its dimmer subpixels get the y_max that gives them their share of it. Tiles whose exposure would
+drop below the shortest the shutter can do keep that and get a lower y_max instead. All tiles are optimized at once
+(see DoseModel.rebalance), then the frames, dataset.csv, added_RGB_values.csv, exposures.npy and job.npz are written
+like Split_RGB_subdivision_ymax_manipulation.py writes them, and the print time is compared with the plain job.
+
+    python optimize_exposure.py test4.png --output job1 --max-exp 4
+'''
+
+STUDY_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'plots', 'y_max_study', 'data')
+
+# Shortest exposure in s the shutter opens and closes reliably for
+MIN_EXPOSURE = 0.05
+# Largest y_max measured in the study
+Y_MAX_STUDIED = 180
+
+
+def optimize(filename_image, filepath_output, max_exp_time=4, min_exposure=MIN_EXPOSURE, y_max_limit=Y_MAX_STUDIED,
+             calibration=None, study_data=STUDY_DATA):
+    """
+    Write the optimized job and estimate how long it prints against the job without the optimization.
+
+    Parameters:
+    filename_image (str): Image to print.
+    filepath_output (str): Folder for the job.
+    max_exp_time (float): Maximum exposure time in s set when stitching.
+    min_exposure (float): Shortest exposure in s.
+    y_max_limit (int): Largest y_max a tile may get.
+    calibration (dict): Relative dose per color, the default of dose_model.py if None.
+    study_data (str): Measurements of the y_max study.
+
+    Returns:
+    dict: Estimated print time in s without and with the optimization, exposure time of both and the tile y_max.
+    """
+    model = DoseModel(calibration, response=load_response(study_data))
+    filepath_input, filename_image = os.path.split(os.path.abspath(filename_image))
+    generation = PatternGeneration(filename_image, filepath_input, filepath_output, dose_model=model, rebalance=True,
+                                   y_max_limit=y_max_limit, min_dose=min_exposure / max_exp_time)
+
+    _, positions_x, positions_z = load_job(filepath_output)
+    plain = exposure_times(generation.doses, max_exp_time)
+    optimized = exposure_times(generation.exposures, max_exp_time)
+    return {
+        'plain': stitch_durations(plain, positions_x, positions_z).sum(),
+        'optimized': stitch_durations(optimized, positions_x, positions_z).sum(),
+        'plain_exposure': plain.sum(),
+        'optimized_exposure': optimized.sum(),
+        'tile_y_max': generation.tile_y_max,
+    }
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Write a stitch job with y_max and exposure optimized per tile.")
+    parser.add_argument('image', help="image to print, at most 270x270")
+    parser.add_argument('--output', default=os.getcwd(), help="folder for the job (default: working directory)")
+    parser.add_argument('--max-exp', type=float, default=4, help="maximum exposure time in s (default 4)")
+    parser.add_argument('--min-exposure', type=float, default=MIN_EXPOSURE,
+                        help=f"shortest exposure in s (default {MIN_EXPOSURE})")
+    parser.add_argument('--y-max-limit', type=int, default=Y_MAX_STUDIED,
+                        help=f"largest y_max (default {Y_MAX_STUDIED})")
+    parser.add_argument('--calibration', help="csv file with the relative dose per color")
+    arguments = parser.parse_args(arguments)
+
+    if not os.path.exists(arguments.output):
+        os.makedirs(arguments.output)
+    calibration = load_calibration(arguments.calibration) if arguments.calibration else None
+    result = optimize(arguments.image, arguments.output, arguments.max_exp, arguments.min_exposure,
+                      arguments.y_max_limit, calibration)
+
+    saved = result['plain'] - result['optimized']
+    values, counts = np.unique(result['tile_y_max'], return_counts=True)
+    print(f"Exposure {format_eta(result['plain_exposure'])} -> {format_eta(result['optimized_exposure'])}, "
+          f"print time {format_eta(result['plain'])} -> {format_eta(result['optimized'])}, "
+          f"{format_eta(saved)} ({saved / result['plain'] * 100:.1f} %) saved")
+    print("Tiles per y_max: " + ", ".join(f"{value:g}: {count}" for value, count in zip(values, counts)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,5 @@
 import csv
-
-
-def calculate_coordinates(rows, columns, slm):
-    """
-    Calculate the coordinates in a snake pattern for the SLM.
-
-    Args:
-    rows (int): The number of rows in the image.
-    columns (int): The number of columns in the image.
-    slm (int): The SLM pixel pitch in micrometers.
-
-    Returns:
-    list: A list of coordinates for the snake pattern.
-    """
-    points = []
-    # Start coordinates for the snake pattern
-    start_x = ((columns / 2) - 1) * slm + slm / 2
-    start_y = -(((rows / 2) - 1) * slm + slm / 2)
-
-    for row in range(rows):
-        for col in range(columns):
-            points.append((start_x, start_y))
-
-            # Update x-coordinate based on row parity and not at the end of the row
-            if col < columns - 1:
-                start_x -= slm if (row % 2 == 0) else 0
-                start_x += slm if (row % 2 != 0) else 0
-
-        # Update y-coordinate at the end of each row
-        start_y += slm
-
-    return points
+from tile_coordinates import coordinate_counts, tile_coordinates
 
 
 def create_csv(added_RGB_values):
@@ -51,15 +20,15 @@ def create_csv(added_RGB_values):
     dataset_path = './y_max_study/dataset.csv'
 
     # Calculate new coordinates without relying on added_RGB_values.csv
-    coordinates = calculate_coordinates(1, 90, 484)
+    x, z = coordinate_counts(*tile_coordinates(1, 90, 484))
 
     # Create a new list to store the modified data
     modified_data = []
 
     # Ensure that only the second and third columns are extended with the calculated coordinates
-    for i in range(len(coordinates)):
+    for i in range(len(x)):
         # Include exp_times in the first column and update the second and third columns
-        modified_data.append([added_RGB_values[i]] + [int(coord) for coord in coordinates[i]])
+        modified_data.append([added_RGB_values[i]] + [int(x[i]), int(z[i])])
 
     # Open the CSV file for writing
     with open(dataset_path, 'w', newline='') as output_file:
@@ -34,9 +34,23 @@ integrate get_command after stuff to see result actually?
 """
 import serial
 import time
+from tile_coordinates import tile_coordinates
 
 
 class MotorController:
+    # Stage distances in counts and motion settings of the jobs, print_time_estimator.py models the jobs with them
+    SLM_STITCHING_PIXEL = 484
+    SLM_PRINTING_PIXEL = 480
+    SLM_PRINTING_HEIGHT = 290
+    # WHatever we override from the other Pixel for example 4
+    SLM_PRINTING_OFFSET = 4
+    # Velocity, acceleration and deceleration of the moves while stitching and between printed lines
+    STITCH_MOTION = {'velocity': 1000, 'acceleration': 1000, 'deceleration': 1000}
+    # Z velocity when returning to the start of the next printed line
+    PRINT_RETURN_VELOCITY = 2000
+    # wait_for_motion_completion: seconds before the first status poll and between polls
+    FIRST_POLL = 1
+    POLL_INTERVAL = 0.5
 
     def __init__(self, port='COM7', baudrate=9600, timeout=1):
         # Create a serial connection to the motor
@@ -48,6 +62,8 @@ class MotorController:
         self.motor_timeout = timeout
         self.serial_motor = serial.Serial(self.motor_port, self.motor_baudrate, timeout=self.motor_timeout)
         self.motor_connection_is_open = True
+        # Bytes sent and received so far, for the tile trace
+        self.serial_bytes = 0
 
         # Some baudrates we want to save
         self.initial_baudrate = 9600
@@ -242,15 +258,14 @@ class MotorController:
         self.length_movement = 0
 
         # Stuff for Stitching:
-        self.SLM_stitching_pixel = 484
+        self.SLM_stitching_pixel = self.SLM_STITCHING_PIXEL
         self.SLM_stitching_half_pixel = (self.SLM_stitching_pixel / 2)
 
         # Stuff needed explicitly for Printing:
-        self.SLM_printing_pixel = 480
-        self.SLM_printing_height = 290
-        self.SLM_printing_width = 480
-        # WHatever we override from the other Pixel for example 4
-        self.SLM_printing_offset = 4
+        self.SLM_printing_pixel = self.SLM_PRINTING_PIXEL
+        self.SLM_printing_height = self.SLM_PRINTING_HEIGHT
+        self.SLM_printing_width = self.SLM_PRINTING_PIXEL
+        self.SLM_printing_offset = self.SLM_PRINTING_OFFSET
         self.SLM_printing_half_pixel = (self.SLM_printing_pixel / 2)
         self.SLM_printing_height_difference = (self.SLM_printing_pixel - self.SLM_printing_height)
         self.SLM_printing_half_height = (self.SLM_printing_height / 2)
@@ -261,6 +276,10 @@ class MotorController:
 
         self.absolute_position_X = []
         self.absolute_position_Z = []
+        # 'absolute' or 'relative' while stitching
+        self.stitch = None
+        # Tiles (lines when printing) finished before the job was interrupted, the next job continues after them
+        self.resume_from = 0
         
         self.start_pos_X = 0
         self.start_pos_Z = 0
@@ -328,11 +347,13 @@ class MotorController:
 
             # ser.write(bytes('{0}\r'.format(full_set_command), 'utf-8'))  # Send the command
             self.serial_motor.write(bytes(f'{full_set_command}\r', 'utf-8'))
+            self.serial_bytes += len(full_set_command) + 1
             time.sleep(0.03)
 
             response = b''
             if self.serial_motor.in_waiting:
                 response += self.serial_motor.read(self.serial_motor.in_waiting)
+                self.serial_bytes += len(response)
                 decoded = response.decode('utf-8', errors='ignore').strip()
                 # print('{}: {}'.format(full_set_command, decoded))
                 if decoded.lower().endswith("ok"):
@@ -360,11 +381,13 @@ class MotorController:
 
             # ser.write(bytes('{0}\r'.format(full_get_command), 'utf-8'))  # Send the command
             self.serial_motor.write(bytes(f'{full_get_command}\r', 'utf-8'))
+            self.serial_bytes += len(full_get_command) + 1
             time.sleep(0.03)
 
             response = b''
             if self.serial_motor.in_waiting:
                 response += self.serial_motor.read(self.serial_motor.in_waiting)
+                self.serial_bytes += len(response)
                 decoded = response.decode('utf-8', errors='ignore').strip()
                 if decoded.startswith('v'):
                     # Assuming the value is always after 'v '
@@ -394,12 +417,14 @@ class MotorController:
                 full_copy_command = f'c {copy_register}'
 
             self.serial_motor.write(bytes(f'{full_copy_command}\r', 'utf-8'))  # Corrected format string usage
+            self.serial_bytes += len(full_copy_command) + 1
             # ser.write(bytes('{0}\r'.format(full_copy_command), 'utf-8'))
             time.sleep(0.03)  # Short delay to allow the device to process the command
 
             response = b''
             if self.serial_motor.in_waiting:
                 response += self.serial_motor.read(self.serial_motor.in_waiting)
+                self.serial_bytes += len(response)
                 decoded = response.decode('utf-8', errors='ignore').strip()
                 if decoded.lower().endswith("ok"):
                     print(f'Copy command "{full_copy_command.strip()}" successful: {decoded}')
@@ -426,6 +451,7 @@ class MotorController:
                 full_reset_command = 'r'
             # self.serial_motor.write(bytes('{0}\r'.format(full_reset_command), 'utf-8'))
             self.serial_motor.write(bytes(f'{full_reset_command}\r', 'utf-8'))
+            self.serial_bytes += len(full_reset_command) + 1
             # self.serial_motor.write(bytes(f'{full_reset_command}\r', 'utf-8'))
             time.sleep(1)
 
@@ -471,11 +497,13 @@ class MotorController:
                 full_trajectory_command = f't {trajectory_mode}'
             # ser.write(bytes('{0}\r'.format(full_trajectory_command), 'utf-8'))
             self.serial_motor.write(bytes(f'{full_trajectory_command}\r', 'utf-8'))
+            self.serial_bytes += len(full_trajectory_command) + 1
             time.sleep(0.1)
 
             response = b''
             if self.serial_motor.in_waiting:
                 response += self.serial_motor.read(self.serial_motor.in_waiting)
+                self.serial_bytes += len(response)
                 decoded = response.decode('utf-8', errors='ignore').strip()
                 if decoded.lower().endswith("ok"):
                     print(f'Trajectory command "{full_trajectory_command.strip()}" successful: {decoded}')
@@ -923,7 +951,7 @@ class MotorController:
     def wait_for_motion_completion(self, axis=None):
         """Wait until the motion on the specified axis is completed."""
         # Give the drives time to start moving
-        time.sleep(1)
+        time.sleep(self.FIRST_POLL)
         while True:
             # Construct the command to read the Trajectory Status Register
             status_value_str = self.get_command(self.trajectory_register, axis)
@@ -944,7 +972,7 @@ class MotorController:
                     break
                 else:
                     print("Motion in progress...")
-                    time.sleep(0.5)  # Wait a bit before retrying
+                    time.sleep(self.POLL_INTERVAL)  # Wait a bit before retrying
             except ValueError:
                 # Log the ValueError and continue with the next iteration
                 print("Error: ValueError encountered while converting status_value_str to int. This might indicate an invalid response. Continuing...")
@@ -1323,6 +1351,7 @@ class MotorController:
         self.initialized = 0
         self.start = 0
         self.focus_init = 0
+        self.resume_from = 0
 
         self.rows = 0
         self.columns = 0
@@ -1333,6 +1362,7 @@ class MotorController:
 
         self.absolute_position_X = []
         self.absolute_position_Z = []
+        self.stitch = None
 
         self.start_pos_X = 0
         self.start_pos_Z = 0
@@ -1390,8 +1420,14 @@ class MotorController:
         else:
             raise ValueError(f'No Calculation of Time possible, because {mode} is not a available mode!')
 
-    def check_borders(self, mode, start_x, start_z, offset_x, offset_z):
-        if mode == 'stitching':
+    def check_borders(self, mode, start_x, start_z, offset_x, offset_z, positions=None):
+        if mode == 'stitching' and positions is not None:
+            # Absolute stitch, every tile is checked wherever the job put it
+            max_x = max(positions[0]) + offset_x
+            min_x = min(positions[0]) + offset_x
+            max_z = max(positions[1]) + offset_z
+            min_z = min(positions[1]) + offset_z
+        elif mode == 'stitching':
             max_x = start_x + offset_x
             min_x = (start_x + offset_x) - ((self.columns * self.SLM_stitching_pixel) - self.SLM_stitching_pixel)
             min_z = start_z + offset_z
@@ -1417,13 +1453,14 @@ class MotorController:
             self.rows = rows
 
             if mode == 'stitching':
-                self.current_index = 0
+                self.current_index = self.resume_from
                 self.max_exp_time = time_or_speed
+                self.stitch = stitch
 
                 if stitch == 'absolute':
                     self.absolute_position_X = x_value[:]
                     self.absolute_position_Z = z_value[:]
-                    self.OutOfBoundaries = self.check_borders(mode=mode, start_x=self.absolute_position_X[0], start_z=self.absolute_position_Z[0], offset_x=start_offset_x, offset_z=start_offset_z)
+                    self.OutOfBoundaries = self.check_borders(mode=mode, start_x=self.absolute_position_X[0], start_z=self.absolute_position_Z[0], offset_x=start_offset_x, offset_z=start_offset_z, positions=(self.absolute_position_X, self.absolute_position_Z))
                 elif stitch == 'relative':
                     if x_value is None or z_value is None:
                         # Calculate new Start so fully in middle
@@ -1442,7 +1479,7 @@ class MotorController:
                 print("Preparation before Stitching are DONE, moving to center!")
 
             elif mode == 'printing':
-                self.current_line = 0
+                self.current_line = self.resume_from
                 self.speed_printing = time_or_speed
 
                 if x_value is None or z_value is None:
@@ -1459,13 +1496,26 @@ class MotorController:
                 print("Preparation before Printing are DONE, moving to center!")
             else:
                 raise ValueError("Error while initializing!")
+            self.resume_from = 0
 
             self.enable_axis(axis='all')
             self.set_mode(mode='servo', axis='all')
-            self.set_motion_parameters(axis='X', velocity=1000, acceleration=1000, deceleration=1000)
-            self.set_motion_parameters(axis='Z', velocity=1000, acceleration=1000, deceleration=1000)
+            self.set_motion_parameters(axis='X', **self.STITCH_MOTION)
+            self.set_motion_parameters(axis='Z', **self.STITCH_MOTION)
             self.go_to_zero_home()
 
+    def stitch_positions(self):
+        """
+            Absolute positions of the tiles of the current stitch in the order they are stitched.
+            A relative stitch runs the serpentine from its start, one SLM_stitching_pixel per tile.
+            Returns:
+                Lists with the X and Z of every tile
+        """
+        if self.stitch == 'absolute':
+            return list(self.absolute_position_X), list(self.absolute_position_Z)
+        x, z = tile_coordinates(self.rows, self.columns, self.SLM_stitching_pixel, start_x=self.start_pos_X, start_z=self.start_pos_Z)
+        return x.tolist(), z.tolist()
+
     def end_operation(self, mode):
         if mode == 'printing' and self.current_line == self.columns + 1:
             self.go_to_zero_home()
@@ -1589,8 +1639,10 @@ class MotorController:
                 print("Stitching complete.")
                 
             elif self.start == 1:
-                self.movement(axis='X', position=self.start_pos_X, mode='absolute', shape='trapezoidal')
-                self.movement(axis='Z', position=self.start_pos_Z, mode='absolute', shape='trapezoidal')
+                # Straight to the first tile left to do when resuming
+                positions_x, positions_z = self.stitch_positions()
+                self.movement(axis='X', position=int(positions_x[self.current_index]), mode='absolute', shape='trapezoidal')
+                self.movement(axis='Z', position=int(positions_z[self.current_index]), mode='absolute', shape='trapezoidal')
                 self.start = 2
                 
             elif self.start == 2:
@@ -1646,8 +1698,8 @@ class MotorController:
                 # Complete the stitching process
                 print("Stitching complete.")            
             elif self.start == 1:
-                # Move to starting location
-                self.movement(axis='X', position=self.start_pos_X, mode='absolute', shape='trapezoidal')
+                # Move to starting location, of the first line left to do when resuming
+                self.movement(axis='X', position=self.start_pos_X - self.current_line * self.SLM_printing_pixel, mode='absolute', shape='trapezoidal')
                 self.movement(axis='Z', position=self.start_pos_Z, mode='absolute', shape='trapezoidal')
                 self.start = 2
             elif self.start == 2:
@@ -1656,7 +1708,7 @@ class MotorController:
                 self.movement(axis='Z', position=self.length_movement, mode='relative', shape='trapezoidal')
                 # Moving over to the next line
                 self.movement(axis='X', position=(-1 * self.SLM_printing_pixel), mode='relative', shape='trapezoidal')
-                self.set_motion_parameters(axis='Z', velocity=2000)
+                self.set_motion_parameters(axis='Z', velocity=self.PRINT_RETURN_VELOCITY)
                 self.movement(axis='Z', position=(-1 * self.length_movement), mode='relative', shape='trapezoidal')
             else:
                 raise ValueError("Error inside Logic for Printing!")
@@ -0,0 +1,229 @@
+import csv
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+
+'''
+Chirped sawtooth gratings for chirped_printer.py
+
+The period (xmax, in SLM pixels) can follow any profile over the full print width. The phase is integrated once
+over the whole width with np.cumsum, quantized once, and every column image is a slice of that single row
+broadcast over the SLM height, so no per-pixel or per-column loops are needed.
+
+Images are named {column}{basic_name} with column 1 being the rightmost column, the order
+SLMManager.printing_logic displays them in.
+
+Usage:
+    xmax_array = linear_profile(20, 80, 5 * SLM_WIDTH)
+    write_column_images(xmax_array, 5, save_to, 'chirp_test1_20to80.png', ymin=0, ymax=128)
+
+    # or without any files, one frame per printing line
+    source = ChirpColumnSource.from_parameters(5, profile='linear', xmax_i=20, xmax_f=80)
+    image = source.frame(1)
+'''
+
+SLM_WIDTH = 1920
+SLM_HEIGHT = 1152
+# Gray mappings of chirp_waveform
+MAPPINGS = ('legacy', 'range')
+
+
+def linear_profile(xmax_i, xmax_f, width):
+    """
+    Period changing linearly from xmax_i to xmax_f over width pixels.
+    """
+    return np.linspace(xmax_i, xmax_f, width)
+
+
+def quadratic_profile(xmax_i, xmax_f, width):
+    """
+    Period changing quadratically from xmax_i to xmax_f, slowly at the start and fast at the end.
+    """
+    t = np.linspace(0, 1, width)
+    return xmax_i + (xmax_f - xmax_i) * t ** 2
+
+
+def piecewise_profile(points, width):
+    """
+    Period interpolated linearly between control points.
+
+    Parameters:
+    points (list): (position, xmax) pairs, position as a fraction of the full width from 0 to 1.
+    width (int): Full width of the print in pixels.
+    """
+    points = sorted(points)
+    positions = [position for position, xmax in points]
+    values = [xmax for position, xmax in points]
+    return np.interp(np.linspace(0, 1, width), positions, values)
+
+
+def csv_profile(path, width):
+    """
+    Period profile read from a csv file with the columns position,xmax (position as a fraction of the full width).
+    """
+    points = []
+    with open(path, newline='') as csv_file:
+        for row in csv.DictReader(csv_file):
+            points.append((float(row['position']), float(row['xmax'])))
+    return piecewise_profile(points, width)
+
+
+def make_profile(width, profile='linear', xmax_i=20, xmax_f=80, points=None, csv_path=None):
+    """
+    Period profile by name, with the inputs of chirped-SLMimage.py.
+    """
+    if profile == 'linear':
+        return linear_profile(xmax_i, xmax_f, width)
+    if profile == 'quadratic':
+        return quadratic_profile(xmax_i, xmax_f, width)
+    if profile == 'piecewise':
+        return piecewise_profile(points, width)
+    if profile == 'csv':
+        return csv_profile(csv_path, width)
+    raise ValueError(f"Unknown period profile '{profile}'")
+
+
+def chirp_waveform(xmax_array, ymin=0, ymax=128, mapping='legacy'):
+    """
+    Chirped sawtooth over the full print width.
+
+    Parameters:
+    xmax_array (numpy.ndarray): Instantaneous period in pixels for every pixel of the print width.
+    mapping (str): Gray values of the sawtooth, one of MAPPINGS. 'legacy' is the mapping of the original
+        chirped-SLMimage.py the chirp prints are calibrated with, ymin + (ymax - ymin) * (1 + sawtooth / 2) truncated,
+        so the sawtooth runs from (ymin + ymax) / 2 to ymax + (ymax - ymin) / 2 (64 to 192 for 0 to 128).
+        'range' runs from ymin to ymax, rounded.
+
+    Returns:
+    numpy.ndarray: uint8 gray value for every pixel of the print width.
+    """
+    # Integral of the instantaneous frequency, in periods
+    periods = np.cumsum(1 / np.asarray(xmax_array, dtype=np.float64))
+    if mapping == 'legacy':
+        # The arithmetic of scipy.signal.sawtooth and of the float to uint8 assignment of the original script
+        sawtooth = np.mod(2 * np.pi * periods, 2 * np.pi) / np.pi - 1
+        waveform = np.floor(ymin + (ymax - ymin) * (1 + sawtooth / 2))
+    elif mapping == 'range':
+        waveform = np.round(ymin + (ymax - ymin) * np.mod(periods, 1))
+    else:
+        raise ValueError(f"Unknown gray mapping '{mapping}', choose from {MAPPINGS}")
+    return np.clip(waveform, 0, 255).astype(np.uint8)
+
+
+def column_frames(waveform, num_cols, SLM_height=SLM_HEIGHT):
+    """
+    Split the waveform into one SLM frame per print column.
+
+    Returns:
+    list: num_cols read-only uint8 arrays of shape (SLM_height, len(waveform) // num_cols), left to right. They are
+    broadcast views of the waveform and take no extra memory.
+    """
+    rows = np.asarray(waveform).reshape(num_cols, -1)
+    return [np.broadcast_to(row, (SLM_height, row.size)) for row in rows]
+
+
+def write_column_images(xmax_array, num_cols, save_to, basic_name, ymin=0, ymax=128, SLM_height=SLM_HEIGHT,
+                        workers=8, mapping='legacy'):
+    """
+    Generate and save the column images of a chirped print.
+
+    Parameters:
+    xmax_array (numpy.ndarray): Period profile over the full width, num_cols * SLM width pixels.
+    num_cols (int): Number of columns of the print.
+    save_to (str): Folder the images are saved in.
+    basic_name (str): File name the column number is put in front of.
+    mapping (str): Gray mapping of the sawtooth, see chirp_waveform.
+
+    Returns:
+    list: Paths of the saved images, left to right.
+    """
+    if len(xmax_array) % num_cols != 0:
+        raise ValueError(f"Profile width {len(xmax_array)} is not a multiple of {num_cols} columns")
+
+    if save_to and not os.path.exists(save_to):
+        os.makedirs(save_to)
+
+    frames = column_frames(chirp_waveform(xmax_array, ymin, ymax, mapping), num_cols, SLM_height)
+    # Images are created from left to right, but printed right to left
+    paths = [os.path.join(save_to, f'{num_cols - n}{basic_name}') for n in range(num_cols)]
+
+    # PNG compression releases the GIL, so the columns are saved in parallel
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda frame, path: Image.fromarray(np.ascontiguousarray(frame)).save(path), frames, paths))
+
+    return paths
+
+
+class ChirpColumnSource:
+    def __init__(self, xmax_array, num_cols, ymin=0, ymax=128, SLM_height=SLM_HEIGHT, mapping='legacy'):
+        """
+        Renders the column frames of a chirped print on demand instead of loading them from disk.
+
+        The waveform of the whole print is computed once, a frame is its slice for one column copied into one of
+        two alternating buffers. prefetch renders the next line in a thread while the current one is printing.
+
+        Parameters:
+        xmax_array (numpy.ndarray): Period profile over the full width, num_cols * SLM width pixels.
+        num_cols (int): Number of columns (printing lines).
+        mapping (str): Gray mapping of the sawtooth, see chirp_waveform.
+        """
+        if len(xmax_array) % num_cols != 0:
+            raise ValueError(f"Profile width {len(xmax_array)} is not a multiple of {num_cols} columns")
+
+        self.num_cols = num_cols
+        self.rows = chirp_waveform(xmax_array, ymin, ymax, mapping).reshape(num_cols, -1)
+        self.buffers = [np.empty((SLM_height, self.rows.shape[1]), dtype=np.uint8) for _ in range(2)]
+        self.prepared = None  # (line, image) rendered ahead of time
+        self.thread = None
+
+    @classmethod
+    def from_parameters(cls, num_cols, SLM_width=SLM_WIDTH, SLM_height=SLM_HEIGHT, ymin=0, ymax=128, mapping='legacy',
+                        **profile):
+        """
+        Source for num_cols columns, the remaining keyword arguments go to make_profile.
+        """
+        xmax_array = make_profile(SLM_width * num_cols, **profile)
+        return cls(xmax_array, num_cols, ymin, ymax, SLM_height, mapping)
+
+    def render(self, line):
+        """
+        Frame for a printing line, line 1 is the rightmost column like the {n}{basic_name} images.
+        """
+        if not 1 <= line <= self.num_cols:
+            raise ValueError(f"Line {line} outside of 1 to {self.num_cols}")
+        # Lines alternate between the two buffers, so rendering line n + 1 never touches the frame of line n
+        buffer = self.buffers[line % 2]
+        buffer[...] = self.rows[self.num_cols - line]
+        return Image.fromarray(buffer)
+
+    def prefetch(self, line):
+        """
+        Start rendering a line in the background, lines outside of the print are ignored.
+        """
+        if not 1 <= line <= self.num_cols:
+            return
+        self.wait()
+        self.thread = threading.Thread(target=self._prepare, args=(line,))
+        self.thread.start()
+
+    def _prepare(self, line):
+        self.prepared = (line, self.render(line))
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def frame(self, line):
+        """
+        Frame for a printing line, taken from the prefetch if it was rendered ahead.
+        """
+        self.wait()
+        if self.prepared is not None and self.prepared[0] == line:
+            image = self.prepared[1]
+        else:
+            image = self.render(line)
+        self.prepared = None
+        return image
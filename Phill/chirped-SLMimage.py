@@ -1,13 +1,10 @@
-from PIL import Image
-import numpy as np
-from scipy import signal 
-import os
+from chirp_generator import SLM_WIDTH, SLM_HEIGHT, make_profile, write_column_images
 
 '''
 Created Jun 10 2025 
 
 Creates images for use with the modified printing code (chirped_printer.py) 
-Takes a starting and ending period in pixel values and chirps it over a specified number of columns
+Takes a starting and ending period in pixel values (or another period profile, see chirp_generator.py) and chirps it over a specified number of columns
 
 To Do: add GUI to collect user inputs 
 
@@ -23,6 +20,8 @@ num_cols = 5    	#number of desired columns in final print run
 
 ymin = 0		    #minium greyscale value           
 ymax = 128		#maximum greyscale value 
+mapping = 'legacy'	#'legacy': greyscale values as the chirp prints so far, ymin + (ymax - ymin)*(1 + sawtooth/2), 64 to 192 for 0 to 128
+				#'range': sawtooth from ymin to ymax, changes the printed gratings (see chirp_generator.py)
 
 '''Folder and File name'''
 #folder where images will be saved, leave blank to save in same directory as script 
@@ -30,39 +29,34 @@ save_to = 'C:/Users/mcgeelab/Desktop/SLMImages'
 #name scheme for saved mages, a number corresponding to the image's column is appended 
 basic_name = 'chirp_test1_20to80.png' 
 
-'''Generate the chirped sawtooth waveform'''
-SLM_width = 1920    	#parameters of SLM screen
-SLM_height = 1152 
-
-chirp_width = SLM_width*num_cols    #calculate total pixel width of final chirped grating 
-y_pp = ymax - ymin 					#peak to peak greyscale value 
-
-xmax_array = np.linspace(xmax_i, xmax_f, chirp_width) #calculate the instaneous xmax value over the whole width 
+'''Period profile'''
+#'linear', 'quadratic', 'piecewise' or 'csv'
+profile = 'linear'
+#for 'piecewise': (position, xmax) pairs, position as a fraction of the full print width
+profile_points = [(0, xmax_i), (0.5, 40), (1, xmax_f)]
+#for 'csv': file with the columns position,xmax
+profile_csv = 'profile.csv'
 
-phase = 2*np.pi*np.cumsum(1/xmax_array) #nonlinear array that produces a linear chirp when fed to sawtooth function
-										#essentially the integral of the instaneous xmax value 
+'''Generate the chirped sawtooth waveform and save one image per column'''
+SLM_width = SLM_WIDTH    	#parameters of SLM screen
+SLM_height = SLM_HEIGHT
 
-waveform = ymin + y_pp*(1 + signal.sawtooth(phase) / 2) 	#generate a chirped sawtooth that oscillates from ymin to ymax
+chirp_width = SLM_width*num_cols    #calculate total pixel width of final chirped grating 
 
+profile_inputs = {'profile': profile, 'xmax_i': xmax_i, 'xmax_f': xmax_f, 'points': profile_points, 'csv_path': profile_csv}
+xmax_array = make_profile(chirp_width, **profile_inputs) #instantaneous xmax value over the whole width
 
-'''Create image object and save''' 
-image_array = np.zeros((SLM_height, SLM_width), dtype = np.uint8)	#empty array to build image in 
+#phase is integrated once over the whole width, image names are preceded by the column number
+paths = write_column_images(xmax_array, num_cols, save_to, basic_name, ymin, ymax, SLM_height, mapping=mapping)
+print(f'{len(paths)} column images saved to {save_to}')
 
-for n in np.arange(num_cols):						#loop for each column in print
-	
-	for x in np.arange(SLM_width):					#in each column build the SLM image from waveform
-		ii = x + n*SLM_width						    #index for the chirp waveform to be correct for each column
-		image_array[:,x] = waveform[ii]				#fill the image array 
-		
-	colname = str(num_cols - n)								#images are created from left to right, but printed right to left 
-	image = Image.fromarray(image_array)		#turn the array into an image object and save 
-	image.save(os.path.join(save_to, colname + basic_name)) 	#image names are preceded by the column number
-  
 '''
 #just for testing/debugging
-wholeimage_array = np.zeros((SLM_height, chirp_width), dtype=np.uint8)
-for xx in np.arange(chirp_width):
-    wholeimage_array[:,xx] = waveform[xx]
+import os
+import numpy as np
+from PIL import Image
+from chirp_generator import chirp_waveform
+wholeimage_array = np.broadcast_to(chirp_waveform(xmax_array, ymin, ymax, mapping), (SLM_height, chirp_width)).copy()
 
 wholeimage = Image.fromarray(wholeimage_array)
 wholeimage.save(os.path.join(save_to, 'whole.png'))
@@ -18,6 +18,7 @@ import csv
 import glob
 import os
 import threading
+from collections import OrderedDict
 import numpy as np
 from scipy import signal
 from natsort import natsorted
@@ -25,9 +26,18 @@ from PIL import Image, ImageTk
 from screeninfo import get_monitors
 from tkinter import Toplevel, Label, Tk, filedialog, Button, Frame, Scale, Entry, messagebox, END
 from SerialMotorControl_Active import MotorController
+from chirp_generator import ChirpColumnSource
+from tile_trace import TileTrace
+from dose_model import exposure_times, load_exposures
+from job_journal import JobJournal
+from job_manifest import load_manifest
+from print_time_estimator import LiveEstimate, format_eta, print_durations, stitch_durations
+from telemetry import TelemetryPublisher
+from tile_coordinates import tile_coordinates
 """
 The printing_logic function in the SLMManager class is modified to display a new SLM image for each column. 
-The SLM images to be displayed need to be pre generated and placed in the correct folder. 
+The SLM images to be displayed need to be pre generated and placed in the correct folder, 
+or are rendered from chirp_parameters while the previous line is printing. 
 The GUI will still prompt the user to create a color for printing but the SLM image this generates is overwritten before printing begins. 
 """
 
@@ -35,6 +45,17 @@ basic_image_name = 'chirp_test1_20to80.png' #scheme the pregenerated column SLM
 #a number denoting which column the pattern is for should precede the basic image name
 #simple example: basic image name is '.png', and actual saved SLM patterns are 1.png, 2.png, 3.png etc. 
 
+SLM_REFRESH_MS = 16 #refresh interval of the SLM (60 Hz), in-memory frames arriving faster than this are coalesced
+
+SLM_TRACE = False #write slm_trace.csv with the timing of every frame into the job folder
+TILE_TRACE = False #write tile_trace.csv with the timing of every tile (every line when printing) into the job folder
+SLM_FRAME_COUNTER_BLOCK = 0 #size in pixels of the bits of a frame counter drawn in the top left corner, 0 is off
+TELEMETRY_PORT = None #UDP port on localhost the job telemetry is sent to for dashboards (python telemetry.py --port ...), None is off
+
+chirp_parameters = None #set to render the column patterns on the fly instead of loading pregenerated images
+#the keys are the inputs of chirped-SLMimage.py, the number of columns is taken from the print settings
+#example: chirp_parameters = {'profile': 'linear', 'xmax_i': 20, 'xmax_f': 80, 'ymin': 0, 'ymax': 128, 'mapping': 'legacy'}
+
 class Shutter:
     def __init__(self, port, baudrate=9600, timeout=.1, stopbits=1, bytesize=8):
         self.serial_shutter = serial.Serial()
@@ -43,6 +64,10 @@ class Shutter:
         self.serial_shutter.timeout = timeout
         self.serial_shutter.stopbits = stopbits
         self.serial_shutter.bytesize = bytesize
+        # For the tile trace: bytes sent and received, and when toggle_pause opened and closed the shutter
+        self.serial_bytes = 0
+        self.opened_at = None
+        self.closed_at = None
 
     def write_command(self, command, close_after=False):
         """
@@ -59,6 +84,7 @@ class Shutter:
             if not self.serial_shutter.is_open:
                 self.serial_shutter.open()
             self.serial_shutter.write(cmd.encode())
+            self.serial_bytes += len(cmd)
         except serial.SerialException as e:
             print(f"Serial communication error: {e}")
         finally:
@@ -71,6 +97,7 @@ class Shutter:
         while time.time() < end_time:
             if self.serial_shutter.in_waiting:
                 char = self.serial_shutter.read(1).decode(errors='replace')  # Use 'replace' to handle unexpected characters gracefully
+                self.serial_bytes += 1
                 received_data += char
                 if prompt in received_data:
                     break
@@ -87,6 +114,7 @@ class Shutter:
 
         # Send command
         self.serial_shutter.write(b'ens?\r')
+        self.serial_bytes += 5
         time.sleep(0.1)  # Adjust based on device response time
 
         # Read and process the response
@@ -112,8 +140,10 @@ class Shutter:
         (arg1) pause : number of seconds to pause (float)
         """
         self.write_command('ens')
+        self.opened_at = time.perf_counter()
         time.sleep(pause)
         self.write_command('ens')
+        self.closed_at = time.perf_counter()
 
     def toggle(self):
         self.write_command('ens')
@@ -150,6 +180,193 @@ class Shutter:
             print(f"Error closing serial port: {e}")
 
 
+class FrameCache:
+    """
+    Least-recently-used cache for decoded SLM frames, keyed by the frame id from dataset.csv.
+
+    Parameters:
+    max_frames (int): Number of frames kept in memory. A decoded 1920x1152 frame is roughly 2.2 MB in L mode.
+    """
+    def __init__(self, max_frames=32):
+        self.max_frames = max_frames
+        self.frames = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, frame_id):
+        if frame_id not in self.frames:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.frames.move_to_end(frame_id)
+        return self.frames[frame_id]
+
+    def put(self, frame_id, frame):
+        self.frames[frame_id] = frame
+        self.frames.move_to_end(frame_id)
+        while len(self.frames) > self.max_frames:
+            self.frames.popitem(last=False)
+
+    def clear(self):
+        self.frames.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class FrameTrace:
+    """
+    Timing of every SLM frame of a job, written to a csv file when the job ends.
+
+    For every frame: scheduled (display was called), started (the Tk thread picked it up), decoded (image file
+    read), applied (pasted into the PhotoImage) and flushed (Tk has redrawn), in ms since the trace started.
+    Empty fields mean the step did not happen, e.g. no decode for cached or in-memory frames.
+
+    Parameters:
+    path (str): csv file the trace is written to.
+    """
+    FIELDS = ["frame", "source", "scheduled_ms", "started_ms", "decoded_ms", "applied_ms", "flushed_ms"]
+
+    def __init__(self, path):
+        self.path = path
+        self.origin = time.perf_counter()
+        self.rows = []
+
+    def add(self, frame, source, scheduled, started, decoded, applied, flushed):
+        times = [None if t is None else round((t - self.origin) * 1000, 3)
+                 for t in (scheduled, started, decoded, applied, flushed)]
+        self.rows.append([frame, source] + times)
+
+    def save(self):
+        with open(self.path, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(self.FIELDS)
+            writer.writerows([["" if value is None else value for value in row] for row in self.rows])
+        print(f"SLM trace with {len(self.rows)} frames saved at {self.path}")
+
+    def summary(self):
+        """
+        Mean and max duration of every step, over the frames that went through it.
+        """
+        durations = {"queue": [], "decode": [], "apply": [], "flush": [], "total": []}
+        for frame, source, scheduled, started, decoded, applied, flushed in self.rows:
+            if scheduled is not None:
+                durations["queue"].append(started - scheduled)
+                durations["total"].append(flushed - scheduled)
+            if decoded is not None:
+                durations["decode"].append(decoded - started)
+            durations["apply"].append(applied - (decoded if decoded is not None else started))
+            durations["flush"].append(flushed - applied)
+
+        lines = [f"{step}: mean {sum(values) / len(values):.1f} ms, max {max(values):.1f} ms"
+                 for step, values in durations.items() if values]
+        return "SLM frame timing - " + ("; ".join(lines) if lines else "no frames")
+
+
+class SLMSurface:
+    """
+    One PhotoImage shown in a label, every frame is pasted into it instead of allocating a new PhotoImage.
+    A new PhotoImage is only made when the mode or size of the frames changes.
+
+    Also keeps the frame-to-screen latency: time from scheduling a frame until it is pasted and Tk has redrawn.
+
+    Parameters:
+    label (Label): Label the surface is shown in.
+    width (int): Width of the SLM.
+    height (int): Height of the SLM.
+    """
+    def __init__(self, label, width=1920, height=1152, mode='L'):
+        self.label = label
+        self.photo = None
+        self.mode = None
+        self.size = None
+        self.reallocations = 0
+        self.latencies = []
+        self.last_latency = None  # latency of the newest frame, taken by the tile trace
+        self.frame_number = 0
+        self.trace = None  # FrameTrace of the running job, if SLM_TRACE is set
+        self.counter_block = SLM_FRAME_COUNTER_BLOCK
+        self.allocate(mode, (width, height))
+
+    def allocate(self, mode, size):
+        self.photo = ImageTk.PhotoImage(mode, size)
+        self.mode = mode
+        self.size = size
+        self.label.configure(image=self.photo)
+        self.label.image = self.photo  # Keep a reference!
+        self.reallocations += 1
+
+    def show(self, image, scheduled=None, started=None, decoded=None, source=""):
+        """
+        Put a PIL image on the screen, must be called from the Tk thread.
+
+        Parameters:
+        image (Image): Frame to show.
+        scheduled (float): time.perf_counter() when the frame was requested, for the latency statistics.
+        started (float): time.perf_counter() when the Tk thread started on the frame, defaults to now.
+        decoded (float): time.perf_counter() when the frame was read from disk, None if it was not.
+        source (str): File name or frame id for the trace.
+        """
+        if started is None:
+            started = time.perf_counter()
+        self.frame_number += 1
+        if self.counter_block:
+            image = self.stamp_counter(image)
+
+        if image.mode != self.mode or image.size != self.size:
+            self.allocate(image.mode, image.size)
+        elif self.label.image is not self.photo:
+            # Something else was shown in the label meanwhile
+            self.label.configure(image=self.photo)
+            self.label.image = self.photo  # Keep a reference!
+        self.photo.paste(image)
+        applied = time.perf_counter()
+
+        # Redraw now, so the latency covers the frame actually being on the screen
+        self.label.update_idletasks()
+        flushed = time.perf_counter()
+
+        if scheduled is not None:
+            self.latencies.append(flushed - scheduled)
+            self.last_latency = flushed - scheduled
+        if self.trace is not None:
+            self.trace.add(self.frame_number, source, scheduled, started, decoded, applied, flushed)
+
+    def stamp_counter(self, image):
+        """
+        Copy of the frame with the frame number drawn as 16 bits in the top left corner, most significant bit
+        first, white for 1 and black for 0. A camera or photodiode on the SLM can read it back.
+        """
+        bits = np.array([(self.frame_number >> bit) & 1 for bit in range(15, -1, -1)], dtype=np.uint8) * 255
+        block = np.repeat(np.repeat(bits[np.newaxis, :], self.counter_block, axis=0), self.counter_block, axis=1)
+        stamped = image.copy()
+        stamped.paste(Image.fromarray(block), (0, 0))
+        return stamped
+
+    def start_trace(self, path):
+        self.trace = FrameTrace(path)
+
+    def stop_trace(self):
+        if self.trace is None:
+            return
+        self.trace.save()
+        print(self.trace.summary())
+        self.trace = None
+
+    def latency_report(self):
+        if not self.latencies:
+            return "No frames shown"
+        latencies_ms = np.array(self.latencies) * 1000
+        return (f"{len(latencies_ms)} frames, frame-to-screen latency mean {latencies_ms.mean():.1f} ms, "
+                f"95% {np.percentile(latencies_ms, 95):.1f} ms, max {latencies_ms.max():.1f} ms, "
+                f"{self.reallocations} PhotoImage allocations")
+
+    def reset_statistics(self):
+        self.latencies = []
+        self.last_latency = None
+        self.reallocations = 0
+        self.frame_number = 0
+
+
 class SLMWindow:
     def __init__(self, master, grating=None):
         # Monitor controlling
@@ -169,36 +386,86 @@ class SLMWindow:
         # self.window_slm.geometry(f'{slm_monitor.width}x{slm_monitor.height}+{slm_monitor.x}+{slm_monitor.y}')
         self.window_slm.overrideredirect(True)
 
-        # Default grating if none provided
-        if grating is None:
-            array = np.zeros((height, width), dtype=np.uint16)
-            default_image = Image.fromarray(array)
-            default_image = default_image.convert('L')
-            grating = ImageTk.PhotoImage(default_image)
-        elif not isinstance(grating, ImageTk.PhotoImage):
-            grating = ImageTk.PhotoImage(Image.open(grating))
-
-        # Load the image into the SLM monitor window
-        self.window_slm_label = Label(self.window_slm, image=grating)
+        # Every frame is pasted into the same PhotoImage, starting with a black SLM
+        self.window_slm_label = Label(self.window_slm)
         self.window_slm_label.pack(fill="both", expand=True)
-        self.window_slm_label.image = grating  # Keep a reference!
+        self.surface = SLMSurface(self.window_slm_label, width, height)
+
+        if isinstance(grating, ImageTk.PhotoImage):
+            self.window_slm_label.configure(image=grating)
+            self.window_slm_label.image = grating  # Keep a reference!
+        elif grating is not None:
+            self.surface.show(Image.open(grating))
+
+        self.pending_image = None  # Newest in-memory frame waiting for the next refresh
+        self.pending_scheduled = None
+        self.last_flush = 0
+
+        # Decoded frames of deduplicated jobs, so repeated frames are not re-decoded
+        self.frame_cache = FrameCache()
+        self.current_frame_id = None
 
         # Bind escape key to close window
         self.window_slm.bind("<Escape>", lambda e: self.close_window())
 
     def display(self, grating_path):
         # Ensure updates happen in the main thread
-        self.image_window.after(0, self._update_image, grating_path)
+        self.image_window.after(0, self._update_image, grating_path, time.perf_counter())
+
+    def display_frame(self, frame_id, grating_path):
+        # Same as display, but goes through the frame cache
+        self.image_window.after(0, self._update_frame, frame_id, grating_path, time.perf_counter())
+
+    def display_image(self, image):
+        # Same as display, for a frame that is already in memory. Only the newest frame is kept, so frames
+        # arriving faster than SLM_REFRESH_MS (e.g. from sliders) are coalesced into one update
+        schedule = self.pending_image is None
+        self.pending_image = image
+        self.pending_scheduled = time.perf_counter()
+        if schedule:
+            delay = max(0, int(SLM_REFRESH_MS - (time.perf_counter() - self.last_flush) * 1000))
+            self.image_window.after(delay, self._flush_image)
+
+    def _flush_image(self):
+        image = self.pending_image
+        self.pending_image = None
+        if image is None:
+            return
+        self.surface.show(image, self.pending_scheduled, source="memory")
+        self.current_frame_id = None
+        self.last_flush = time.perf_counter()
 
-    def _update_image(self, grating_path):
-        # Load and display the new image, maintaining a reference to avoid garbage collection
+    def _update_image(self, grating_path, scheduled=None):
+        # Load the new image and paste it onto the SLM
+        started = time.perf_counter()
         try:
-            grating = ImageTk.PhotoImage(Image.open(grating_path))
-            self.window_slm_label.configure(image=grating)
-            self.window_slm_label.image = grating  # Keep a reference!
+            image = Image.open(grating_path)
+            image.load()
         except Exception as e:
             print(f"Error loading image {grating_path}: {e}")
             # Optionally, display an error message on the SLM window
+            return
+        self.surface.show(image, scheduled, started, time.perf_counter(), os.path.basename(grating_path))
+        self.current_frame_id = None
+
+    def _update_frame(self, frame_id, grating_path, scheduled=None):
+        # Frame is already on the SLM, nothing to do
+        if frame_id == self.current_frame_id:
+            return
+        started = time.perf_counter()
+        decoded = None
+        image = self.frame_cache.get(frame_id)
+        if image is None:
+            try:
+                image = Image.open(grating_path)
+                image.load()
+            except Exception as e:
+                print(f"Error loading image {grating_path}: {e}")
+                return
+            decoded = time.perf_counter()
+            self.frame_cache.put(frame_id, image)
+        self.surface.show(image, scheduled, started, decoded, f"frame {frame_id}")
+        self.current_frame_id = frame_id
 
     def display_text(self, msg):
         # Schedule the text update to be safe with threads
@@ -216,6 +483,7 @@ class PrintingPicture:
         self.filepath = filepath
         self.slm = slm
         self.rgb = [0, 0, 0]
+        self.profiles = {}  # Band profiles per x_max
 
     def save_color_and_x_max(self, new_color, x_max):
         self.color = new_color
@@ -231,9 +499,9 @@ class PrintingPicture:
             image_path = os.path.join(self.filepath, "Image1.png")
             image.save(image_path)
             print(f"Image saved at {image_path}")
-            # Display the image using slm, if available
+            # Display the image using slm, if available, straight from memory
             if self.slm:
-                self.slm.display(image_path)
+                self.slm.display_image(image)
             else:
                 print("SLM instance not available for displaying the image.")
         else:
@@ -244,66 +512,56 @@ class PrintingPicture:
         hex_color = hex_color.lstrip('#')
         return tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
 
-    def make_SLM_pattern(self, red, green, blue, x_max):
-        t = np.linspace(0, 1920, 1920)
-
-        # Variable X_max
-        # f1 = 1 / 30  # blue
-        f1 = 1 / (x_max * 1)
-        # f2 = 1 / 32.7  # green
-        f2 = 1 / (x_max * 1.09)
-        # f3 = 1 / 38.91  # red
-        f3 = 1 / (x_max * 1.297)
-        # Ymax = 128, Ymin = 0
-        # st = np.clip((1 + signal.sawtooth(2 * np.pi * f1 * t)) * 128, 0, 255)
-        st = (1 + signal.sawtooth(2 * np.pi * f1 * t)) * 64
-        st1 = (1 + signal.sawtooth(2 * np.pi * f2 * t)) * 64
-        st2 = (1 + signal.sawtooth(2 * np.pi * f3 * t)) * 64
-
-        array = np.zeros((1152, 1920))
-        i = 0
-        j = 0
-        
+    def band_profiles(self, x_max):
+        """
+        Sawtooth rows for the blue, green and red band of an x_max, computed once and kept.
+        """
+        if x_max not in self.profiles:
+            t = np.linspace(0, 1920, 1920)
+            # Ymax = 128, Ymin = 0, x_max factors 1 (blue), 1.09 (green) and 1.297 (red)
+            self.profiles[x_max] = [((1 + signal.sawtooth(2 * np.pi / (x_max * factor) * t)) * 64).astype(np.uint8)
+                                    for factor in (1, 1.09, 1.297)]
+        return self.profiles[x_max]
+
+    def make_SLM_row(self, red, green, blue, x_max):
+        """
+        One row of the SLM pattern, the bands are as wide as the share of their color in the total.
+        """
         total = red + green + blue
-        
         if x_max == 1 or total == 0:
-            # Create a black array and return as an image
-            array = np.zeros((1152, 1920), dtype=np.uint8)  # A black image
-            return Image.fromarray(array).convert("RGB")
-        
+            # Black pattern
+            return np.zeros(1920, dtype=np.uint8)
+
+        st, st1, st2 = self.band_profiles(x_max)
+
         # Normalize RGB values to be proportional to the lengths for each color region
         regionblue = 1920 * (blue / total)
         regiongreen = 1920 * (green / total)
-        regionred = 1920 * (red / total)
-
-        while i < regionblue:
-            array[0][i] = (st[i])
-            i = i + 1
 
-        while i < regionblue + regiongreen - 1:
-            array[0][i] = (st1[i])
-            i = i + 1
+        i = np.arange(1920)
+        return np.where(i < regionblue, st, np.where(i < regionblue + regiongreen - 1, st1, st2))
 
-        while i < 1920:
-            array[0][i] = (st2[i])
-            i = i + 1
-
-        while j < 1152:
-            array[j] = array[0]
-            j = j + 1
+    def make_SLM_pattern(self, red, green, blue, x_max):
+        """
+        SLM pattern as an L-mode image.
+        """
+        return self.pattern_image(self.make_SLM_row(red, green, blue, x_max))
 
-        # array = np.clip(array, 0, 255)  # Ensure values are within [0, 255]
-        # array = array.astype(np.uint8)  # Convert to uint8 type for image generation
-        # data = Image.fromarray(array)
-        # image = data.convert("RGB")
-        data = Image.fromarray(array)
-        image = data.convert("RGB")
-        return image
+    def pattern_image(self, row):
+        """
+        L-mode image of a pattern row repeated over the SLM height. Every call fills a new array (about 0.3 ms), so a
+        frame SLMWindow.display_image has not drawn yet is never changed by the next pattern, e.g. from the live preview.
+        """
+        pattern = np.empty((1152, 1920), dtype=np.uint8)
+        pattern[...] = row
+        return Image.fromarray(pattern)
 
 
 class ColorPicker:
-    def __init__(self, on_color_save=None):
+    def __init__(self, on_color_save=None, pattern_source=None, slm_in_use=None):
         self.on_color_save = on_color_save
+        self.pattern_source = pattern_source  # PrintingPicture for the live SLM pattern preview
+        self.slm_in_use = slm_in_use  # Returns True while a job shows its frames, the preview then stays off the SLM
         self.selected_color = "#FFFFFF"  # Default color
         self.x_max = 1  # Default value for Xmax
         self.customFont = ("Helvetica", 16)
@@ -338,6 +596,12 @@ class ColorPicker:
         self.color_preview = Label(self.popup, bg='black', width=20, height=14)
         self.color_preview.grid(row=0, column=2, rowspan=5, padx=20, pady=20)
 
+        # SLM pattern preview at a quarter of the SLM resolution, one PhotoImage updated with paste
+        self.pattern_photo = ImageTk.PhotoImage('L', (480, 288))
+        self.pattern_preview = Label(self.popup, bg='black', image=self.pattern_photo)
+        self.pattern_preview.grid(row=0, column=3, rowspan=5, padx=20, pady=20)
+        self.preview_pending = False
+
         # Save color button
         Button(self.popup, text="Save Color", font=self.customFont, command=self.save_selected_color).grid(row=5, column=2)
 
@@ -364,6 +628,31 @@ class ColorPicker:
         # This method is bound to the Xmax scale (slider)
         self.xmax_entry.delete(0, END)
         self.xmax_entry.insert(0, value)  # Slider directly updates the entry
+        self.update_pattern_preview()
+
+    def update_pattern_preview(self):
+        # Slider moves are coalesced, the preview is rendered at most once per SLM refresh interval
+        if self.pattern_source is None or self.preview_pending:
+            return
+        self.preview_pending = True
+        self.popup.after(SLM_REFRESH_MS, self.render_pattern_preview)
+
+    def render_pattern_preview(self):
+        # Render the pattern that Save Color would create, from the current HEX and Xmax entries
+        self.preview_pending = False
+        try:
+            red, green, blue = self.pattern_source.hex_to_rgb(self.hex_entry.get())
+            x_max = int(self.xmax_entry.get())
+        except ValueError:
+            # Entries are being edited and not valid yet
+            return
+
+        row = self.pattern_source.make_SLM_row(red, green, blue, x_max)
+        self.pattern_photo.paste(Image.fromarray(np.broadcast_to(row[::4], (288, 480)).copy()))
+
+        # Live pattern on the SLM itself, never over the frame of a running stitch or print
+        if self.pattern_source.slm and not (self.slm_in_use is not None and self.slm_in_use()):
+            self.pattern_source.slm.display_image(self.pattern_source.pattern_image(row))
 
     def validate_xmax_entry(self, event=None):
         # Validate and correct the entry, then update the slider
@@ -380,6 +669,7 @@ class ColorPicker:
 
         self.x_max = corrected_value
         self.xmax_scale.set(corrected_value)  # Ensure slider is in sync
+        self.update_pattern_preview()
 
     # Function to update color preview from slider values
     def update_preview_from_sliders(self, event=None):
@@ -403,6 +693,7 @@ class ColorPicker:
         self.hex_entry.delete(0, END)
         self.hex_entry.insert(0, hex_color)
         self.color_preview.config(bg=hex_color)
+        self.update_pattern_preview()
 
     def update_preview_from_entries(self, event):
         # This function is triggered when the RGB or brightness entry fields are manually updated
@@ -436,6 +727,7 @@ class ColorPicker:
             self.hex_entry.delete(0, END)
             self.hex_entry.insert(0, hex_color)
             self.color_preview.config(bg=hex_color)
+            self.update_pattern_preview()
 
         except ValueError:
             # If conversion to integer fails, it means the entry is not a valid number
@@ -465,8 +757,9 @@ class SLMManager:
         self.printing_speed = 40
 
         self.imagesSLM = []  # List of image paths
+        self.frame_ids = []  # Frame id for each image, empty if dataset.csv has no frame column
         self.added_RGB_values = []  # List of added RGB values for each image
-        self.exp_times = []  # List of exposure times for each image
+        self.exp_times = []  # Exposure time in s for each image
 
         self.positions_X = []
         self.positions_Z = []
@@ -483,6 +776,15 @@ class SLMManager:
         self.printing_lines = 0  # Index for all lines that get printed
         self.printing_rows = 0
         self.currentLine = 0  # Index for the current line
+        self.firstLine = 1  # First line printed, later than 1 when resuming an interrupted print
+        self.chirp_source = None  # Renders the column patterns when chirp_parameters is set
+        self.tile_trace = None  # TileTrace of the running job, if TILE_TRACE is set
+        self.estimate = None  # LiveEstimate of the running job, for the time left in the status
+        self.journal = None  # JobJournal of the running job, for resuming it after an interruption
+        self.stage_positions = None  # Positions of the tiles for the journal, the tile trace and the telemetry
+        self.frame_cache_folder = None  # Job folder the frames in the frame cache belong to
+        # Status and progress for readers outside the Tk thread, published from the Tk thread only
+        self.telemetry = TelemetryPublisher("", TELEMETRY_PORT)
 
         # Needed if Paused while Printing, for Stitching we usually close directly after open and then go into Pause
         self.shutter_opened = False  # Tracks the current state of the shutter
@@ -498,6 +800,7 @@ class SLMManager:
     def reset_parameter(self):
         # Reset important lists
         self.imagesSLM = []
+        self.frame_ids = []
         self.added_RGB_values = []
         self.exp_times = []
 
@@ -519,6 +822,14 @@ class SLMManager:
         self.printing_lines = 0
         self.printing_rows = 0
         self.currentLine = 0
+        self.firstLine = 1
+        self.chirp_source = None
+        self.stop_tile_trace()
+        self.estimate = None
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = None
+        self.stage_positions = None
 
         # Ensure Exit and Pause Parameter aare reset:
         self.shutter_opened = False
@@ -545,15 +856,46 @@ class SLMManager:
         """Update the status label text."""
         if self.status_label:
             self.status_label.config(text=status)
+        self.telemetry.publish(status=status)
+
+    def publish_progress(self, job, step, steps):
+        """
+        Publish the progress of the running job to the telemetry, from the Tk thread like update_status.
+
+        Parameters:
+        job (str): Name of the job, e.g. "absolute stitching".
+        step (int): Tile (line) in progress, 1 for the first, steps + 1 once all are done.
+        steps (int): Tiles (lines) of the job.
+        """
+        positions = None
+        if self.stage_positions is not None and step <= steps:
+            positions = tuple(float(position) for position in self.stage_position(step))
+        elif self.current_mode == 'absolute' and step <= steps:
+            positions = (float(self.positions_X[step - 1] + self.absolute_offset_X),
+                         float(self.positions_Z[step - 1] + self.absolute_offset_Z))
+        eta = None
+        if step > steps:
+            eta = 0.0
+        elif self.estimate is not None:
+            eta = max(0.0, float(self.estimate.remaining()))
+        self.telemetry.publish(job=job, busy=step <= steps, step=min(step, steps), steps=steps,
+                               percentage_done=(step - 1) / steps * 100 if steps else 0.0, positions=positions, eta=eta)
 
     def reset_final_callback(self):
         """Resets the final callback to None safely."""
         self.final_callback = None
 
+    def show_image(self, index):
+        # Deduplicated jobs reference their frames by id, so they can go through the frame cache
+        if self.frame_ids:
+            self.slm.display_frame(self.frame_ids[index], self.imagesSLM[index])
+        else:
+            self.slm.display(self.imagesSLM[index])
+
     def next_image(self):
         self.currentImage += 1
         image_path = self.imagesSLM[self.currentImage]  # Get the next image path
-        self.slm.display(image_path)  # Display the next image using the SLMWindow instance
+        self.show_image(self.currentImage)  # Display the next image using the SLMWindow instance
         print(f"Displaying image {self.currentImage+1} of {len(self.imagesSLM)}: {os.path.basename(image_path)}")
 
     def open_images(self, callback=None):
@@ -577,13 +919,23 @@ class SLMManager:
             return
         print("PNG files in the specified directory found")
 
-        if os.path.exists(self.dataset_filepath) & os.path.exists(self.added_RGB_values_filepath):
+        manifest = load_manifest(self.filepath)
+        if manifest is not None or (os.path.exists(self.dataset_filepath) & os.path.exists(self.added_RGB_values_filepath)):
 
             # I want the Pop-Up Window right here and stop the code from continuing
             self.open_settings_stitch_popup()
 
-            self.load_csv_data(path_to_csv=self.dataset_filepath)
+            # job.npz loads without parsing, older jobs only have the CSV files
+            if manifest is not None:
+                self.load_manifest_data(manifest)
+            else:
+                self.load_csv_data(path_to_csv=self.dataset_filepath)
             print("Exposure Times and Absolute Values loaded!")
+
+            # Deduplicated jobs store every unique frame once, the tiles reference them by id
+            if self.frame_ids:
+                self.imagesSLM = [os.path.join(self.filepath, f"pattern_{frame_id}.png") for frame_id in self.frame_ids]
+                print(f"{len(set(self.frame_ids))} unique frames referenced by {len(self.frame_ids)} tiles")
         else:
             print("CSV file not found")
             self.slm_manager.update_status("CSV-file not found. Please try again.")
@@ -597,7 +949,16 @@ class SLMManager:
         self.current_mode = None
         self.currentImage = 0
         self.update_status("Ready")
-        self.slm.display(self.imagesSLM[self.currentImage])
+        # Reading the same job again (e.g. to resume it) keeps its decoded frames
+        if self.frame_cache_folder != self.filepath:
+            self.slm.frame_cache.clear()
+            self.frame_cache_folder = self.filepath
+        self.slm.surface.reset_statistics()
+        if SLM_TRACE:
+            self.slm.surface.start_trace(os.path.join(self.filepath, "slm_trace.csv"))
+        if TILE_TRACE:
+            self.tile_trace = TileTrace(os.path.join(self.filepath, "tile_trace.csv"))
+        self.show_image(self.currentImage)
         print(f"Displaying the first image: {os.path.basename(self.imagesSLM[self.currentImage])}")
         if callback:
             callback()
@@ -642,12 +1003,30 @@ class SLMManager:
         if self.currentImage <= len(self.imagesSLM):
             if self.currentImage == 0:
                 self.current_mode = mode
+                if self.current_mode == 'absolute':
+                    job = f"absolute stitching, {len(self.imagesSLM)} tiles, {int(self.columns)} x {int(self.rows)}, offset {self.absolute_offset_X} {self.absolute_offset_Z}"
+                else:
+                    job = f"{self.current_mode} stitching, {len(self.imagesSLM)} tiles, {int(self.columns)} x {int(self.rows)}, start {self.start_pos_X} {self.start_pos_Z}"
+                self.currentImage = self.start_journal(self.filepath, job, len(self.imagesSLM), "tiles")
+                if self.currentImage:
+                    # Shown while moving to the first tile left to do
+                    self.show_image(self.currentImage)
+                self.estimate = LiveEstimate(stitch_durations(
+                    self.exp_times, self.positions_X, self.positions_Z, mode=self.current_mode,
+                    offset_x=self.absolute_offset_X, offset_z=self.absolute_offset_Z, columns=self.columns,
+                    rows=self.rows, start_x=self.start_pos_X, start_z=self.start_pos_Z,
+                    first_tile=self.currentImage + 1))
+                print(f"Estimated time for the Stitching: {format_eta(self.estimate.total)}")
             
+            self.publish_progress(f"{self.current_mode} stitching", self.currentImage + 1, len(self.imagesSLM))
             if self.currentImage < len(self.imagesSLM):
-                self.update_status(f"Current Status: Busy with {self.current_mode} Stitching. Pixel {self.currentImage + 1} of {len(self.imagesSLM)}")
+                self.update_status(f"Current Status: Busy with {self.current_mode} Stitching. Pixel {self.currentImage + 1} of {len(self.imagesSLM)}, {self.estimate.status()}")
             elif self.currentImage == len(self.imagesSLM):
                 self.update_status("Current Status: Resetting to Center after Stitching!")
 
+            if self.tile_trace is not None and self.currentImage < len(self.imagesSLM):
+                self.start_tile_trace(self.currentImage + 1)
+
             # Movement after pulling up the picture (First picture already there)
             if self.current_mode == 'absolute':
                 threading.Thread(target=self.motor_controller.stitching_absolute, args=(
@@ -664,18 +1043,125 @@ class SLMManager:
             # If it is the last image, just update the status to indicate completion
             self.update_status(f'Done with {self.current_mode} Stitching')
             print("No more Images! Stitching has been completed")
+            print(self.slm.surface.latency_report())
+            self.slm.surface.stop_trace()
+            self.stop_tile_trace()
+            self.finish_journal()
             if self.final_callback:
                 self.final_callback()
 
+    def start_journal(self, folder, job, steps, name):
+        """
+        Open the journal of the job. If an earlier run of the same job was interrupted, offer to continue after the
+        tiles (lines) it finished, the motor controller then goes straight to the first one left to do.
+
+        Parameters:
+        folder (str): Job folder.
+        job (str): Description of the job, see job_journal.py.
+        steps (int): Tiles (lines) of the job.
+        name (str): What the steps are called in the question, "tiles" or "lines".
+
+        Returns:
+        int: Tiles (lines) skipped, 0 when starting from the beginning.
+        """
+        self.journal = JobJournal(folder, job)
+        finished = self.journal.finished()
+        resume = 0 < finished < steps and messagebox.askyesno(
+            "Resume job", f"{finished} of {steps} {name} were done before this job was interrupted.\n\n"
+                          f"Yes continues with {name[:-1]} {finished + 1}, No starts over from {name[:-1]} 1.")
+        self.journal.open(resume)
+        self.stage_positions = None
+        skipped = finished if resume else 0
+        self.motor_controller.resume_from = skipped
+        if skipped:
+            print(f"Resuming after {skipped} of {steps} {name}")
+        return skipped
+
+    def journal_done(self, step):
+        """
+        Record a finished tile (line) in the journal, with its stage position.
+
+        Parameters:
+        step (int): Tile (line) number, 1 for the first.
+        """
+        if self.journal is None:
+            return
+        self.journal.done(step, *self.stage_position(step))
+
+    def stage_position(self, step):
+        """
+        Stage position of a tile, the start of the line when printing. Relative stitching and printing take the
+        positions from the motor controller, so this is only called once it has started the job (after the first
+        movement).
+
+        Parameters:
+        step (int): Tile (line) number, 1 for the first.
+
+        Returns:
+        tuple: X and Z in counts.
+        """
+        if self.stage_positions is None:
+            if self.current_mode == 'absolute':
+                self.stage_positions = (np.asarray(self.positions_X) + self.absolute_offset_X,
+                                        np.asarray(self.positions_Z) + self.absolute_offset_Z)
+            elif self.current_mode == 'relative':
+                self.stage_positions = self.motor_controller.stitch_positions()
+            else:
+                # Printing, the start of every line
+                motor = self.motor_controller
+                self.stage_positions = tile_coordinates(1, self.printing_lines, motor.SLM_printing_pixel,
+                                                        start_x=motor.start_pos_X, start_z=motor.start_pos_Z)
+        return self.stage_positions[0][step - 1], self.stage_positions[1][step - 1]
+
+    def finish_journal(self):
+        if self.journal is not None:
+            self.journal.finish()
+            self.journal = None
+
+    def start_tile_trace(self, tile):
+        """
+        Start the trace row of the tile (the printed line) whose movement starts now.
+
+        Parameters:
+        tile (int): Tile number, 1 for the first.
+        """
+        self.tile_trace.start_tile(tile, serial_bytes=self.motor_controller.serial_bytes)
+
+    def end_tile_trace(self, tile, serial_bytes):
+        """
+        Finish the trace row of the tile after its movement, with its stage position and the latency of the frame
+        shown for it if it changed.
+
+        Parameters:
+        tile (int): Tile number, 1 for the first.
+        serial_bytes (int): Byte count of the serial lines now.
+        """
+        frame_swap = None
+        if self.slm:
+            frame_swap, self.slm.surface.last_latency = self.slm.surface.last_latency, None
+        x, z = self.stage_position(tile)
+        self.tile_trace.end_tile(serial_bytes, frame_swap, x, z)
+
+    def stop_tile_trace(self):
+        if self.tile_trace is not None:
+            self.tile_trace.close()
+            self.tile_trace = None
+
     def after_movement_stitching(self):
         # Exposure after movement and pulling up a picture
         if self.currentImage < len(self.imagesSLM):
+            if self.tile_trace is not None:
+                self.tile_trace.move_done()
             time.sleep(1.25)
             shutter = Shutter("COM6")
             self.shutter_opened = True
             shutter.toggle_pause(self.exp_times[self.currentImage])
             shutter.close_connection()
             self.shutter_opened = False
+            if self.tile_trace is not None:
+                self.tile_trace.exposure(shutter.opened_at, shutter.closed_at, self.exp_times[self.currentImage])
+                self.end_tile_trace(self.currentImage + 1, self.motor_controller.serial_bytes + shutter.serial_bytes)
+            self.journal_done(self.currentImage + 1)
             
         if self.currentImage + 1 < len(self.imagesSLM):
             self.slm.image_window.after(30, self.next_image)
@@ -683,6 +1169,8 @@ class SLMManager:
             # Allows to exit at next .after in the Logic
             self.currentImage += 1
             print("Movement and Exposure finished")
+        if self.estimate is not None:
+            self.estimate.step_done()
         # Scheduling the next function!
         self.slm.image_window.after(50, self.stitching_logic)
 
@@ -707,7 +1195,8 @@ class SLMManager:
         # Choose Color ?XMAX? and directly create an image (Save lets us continue)?
         # Open created image!
         print_picture = PrintingPicture(filepath=self.printing_filepath, slm=self.slm)
-        color_picker = ColorPicker(on_color_save=print_picture.save_color_and_x_max)
+        color_picker = ColorPicker(on_color_save=print_picture.save_color_and_x_max, pattern_source=print_picture,
+                                   slm_in_use=lambda: self.current_mode is not None)
         color_picker.open_color_picker()
 
         if callback:
@@ -752,44 +1241,94 @@ class SLMManager:
         #modifications from Julian's original code start here
         if self.currentLine <= (self.printing_lines + 1):
             if self.currentLine == 0:
+                self.current_mode = 'printing'
+                job = f"printing, {self.printing_lines} lines of {self.printing_rows} rows, speed {self.printing_speed}, start {self.start_pos_X} {self.start_pos_Z}"
+                self.firstLine = self.start_journal(self.printing_filepath, job, self.printing_lines, "lines") + 1
+                self.estimate = LiveEstimate(print_durations(self.printing_lines, self.printing_rows,
+                                                             self.printing_speed, self.start_pos_X, self.start_pos_Z,
+                                                             first_line=self.firstLine))
+                print(f"Estimated time for the Printing: {format_eta(self.estimate.total)}")
                 self.update_status("Current Status: Moving to Start-Location for Printing!")
+                if self.slm:
+                    self.slm.surface.reset_statistics()
+                    if SLM_TRACE:
+                        self.slm.surface.start_trace(os.path.join(self.printing_filepath, "slm_trace.csv"))
+                if TILE_TRACE:
+                    self.tile_trace = TileTrace(os.path.join(self.printing_filepath, "tile_trace.csv"))
+                if chirp_parameters is not None:
+                    # Whole chirp is computed once, line 1 is rendered while moving to the start
+                    self.chirp_source = ChirpColumnSource.from_parameters(self.printing_lines, **chirp_parameters)
+                    self.chirp_source.prefetch(self.firstLine)
             elif self.currentLine <= self.printing_lines:
-                self.update_status(f"Current Status: Busy with Printing. Line {self.currentLine} of {self.printing_lines}")
+                self.publish_progress("printing", self.currentLine, self.printing_lines)
+                self.update_status(f"Current Status: Busy with Printing. Line {self.currentLine} of {self.printing_lines}, {self.estimate.status()}")
                 #load column image onto SLM 
                 if self.slm:
-                    self.slm.display(os.path.join(self.printing_filepath, f'{self.currentLine}{basic_image_name}')) 
+                    if self.chirp_source is not None:
+                        # Show the prepared frame and render the next line while this one is printing
+                        self.slm.display_image(self.chirp_source.frame(self.currentLine))
+                        self.chirp_source.prefetch(self.currentLine + 1)
+                    else:
+                        self.slm.display(os.path.join(self.printing_filepath, f'{self.currentLine}{basic_image_name}')) 
                 
             else:
+                self.publish_progress("printing", self.currentLine, self.printing_lines)
                 self.update_status("Current Status: Resetting to Center after Printing!")
             # Startup
-            if self.currentLine == 1:
+            if self.currentLine == self.firstLine:
                 # Open Shutter
                 shutter = Shutter("COM6")
                 shutter.toggle()
+                opened_at = time.perf_counter()
                 shutter.close_connection()
                 self.shutter_opened = True
 
+            if self.tile_trace is not None and 1 <= self.currentLine <= self.printing_lines:
+                self.start_tile_trace(self.currentLine)
+                if self.currentLine == self.firstLine:
+                    # The shutter stays open over all lines, opened before line 1 and closed after the last one
+                    self.tile_trace.exposure(opened=opened_at)
+
             # Logic for printing, basically start threading with a callback
             threading.Thread(target=self.motor_controller.printing, args=(
                 self.printing_lines, self.printing_rows, self.printing_speed, self.start_pos_X, self.start_pos_Z,
                 self.after_movement_printing, self.boundary_exit_function)).start()
 
-            # Always count up after a line
-            self.currentLine += 1
+            # Always count up after a line, from the start to the first line left to do when resuming
+            self.currentLine = self.firstLine if self.currentLine == 0 else self.currentLine + 1
         else:
             self.update_status("Done with Printing")
             print("No more Lines! Printing has been completed")
+            if self.slm:
+                print(self.slm.surface.latency_report())
+                self.slm.surface.stop_trace()
+            self.stop_tile_trace()
+            self.finish_journal()
             if self.final_callback:
                 self.final_callback()
 
     def after_movement_printing(self):
+        # currentLine is already counted up, the line that just moved is currentLine - 1. The move to the start comes
+        # back with firstLine - 1, a line that was printed before the job was interrupted (or none) and not now
+        line = self.currentLine - 1
+        closed_at = None
         # End
         if self.currentLine == (self.printing_lines + 1):
             # Close Shutter
             shutter = Shutter("COM6")
             shutter.toggle()
+            closed_at = time.perf_counter()
             shutter.close_connection()
             self.shutter_opened = False
+        if self.tile_trace is not None and self.firstLine <= line <= self.printing_lines:
+            self.tile_trace.move_done()
+            if closed_at is not None:
+                self.tile_trace.exposure(closed=closed_at)
+            self.end_tile_trace(line, self.motor_controller.serial_bytes)
+        if self.firstLine <= line <= self.printing_lines:
+            self.journal_done(line)
+        if self.estimate is not None:
+            self.estimate.step_done()
         self.slm.image_window.after(50, self.printing_logic)
 
     def load_csv_data(self, path_to_csv):
@@ -802,20 +1341,37 @@ class SLMManager:
                 self.added_RGB_values = []
                 self.positions_X = []
                 self.positions_Z = []
+                self.frame_ids = []
 
                 # Read values from each row and append to the respective lists
                 for row in reader:
                     self.added_RGB_values.append(float(row[0]))
                     self.positions_X.append(int(row[1]))
                     self.positions_Z.append(int(row[2]))
-            # Calculate Exposure times and store in the List exp_times
-            self.exp_times = [(value / 765) * self.max_exp_time if value != 0 else 0 for value in self.added_RGB_values]
+                    # Optional fourth column: id of the frame shown for this tile
+                    if len(row) > 3:
+                        self.frame_ids.append(int(row[3]))
+            # Calculate Exposure times, from exposures.npy if the generator stored the dose of every tile
+            exposures = load_exposures(os.path.dirname(path_to_csv))
+            if exposures is None or len(exposures) != len(self.added_RGB_values):
+                exposures = np.asarray(self.added_RGB_values, dtype=float) / 765
+            self.exp_times = exposure_times(exposures, self.max_exp_time)
             self.read_columns_and_rows(data_x=self.positions_X)
         except FileNotFoundError:
             print(f"CSV file not found: {path_to_csv}")
         except ValueError as e:
             print(f"Error processing CSV file: {e}")
 
+    def load_manifest_data(self, manifest):
+        """Take positions, exposures, frames and the size of the stitch from a job manifest (see job_manifest.py)."""
+        self.added_RGB_values = manifest["added_rgb"].tolist()
+        self.positions_X = manifest["x"].tolist()
+        self.positions_Z = manifest["z"].tolist()
+        self.frame_ids = manifest["frame_ids"].tolist()
+        self.exp_times = exposure_times(manifest["exposures"], self.max_exp_time)
+        self.columns = manifest["columns"]
+        self.rows = manifest["rows"]
+
     def read_columns_and_rows(self, data_x):
         """Calculate the length of numbers in a list until the second occurrence of the same number, so the columns."""
         width_columns = 0
@@ -1491,6 +2047,7 @@ class ApplicationController:
             # Move to 0:0
             #self.motor_controller.move_to_zero()
             self.motor_controller.close_connection()
+            self.slm_manager.telemetry.close()
             # Fully exit here
             self.root.destroy()
         else:
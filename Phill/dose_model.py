@@ -0,0 +1,206 @@
+import csv
+import os
+import numpy as np
+
+'''
+Dose model of stitched tiles: how long a tile is exposed for the colors it shows.
+
+A tile is one SLM frame of subpixels, each with an RGB color. The frame gets a single exposure, so the subpixel that
+needs the most dose sets the exposure of the tile and the others are dimmed through their y_max, as subdivided_pixel
+in Split_RGB_subdivision_ymax_manipulation.py does. Each wavelength needs a different dose for full brightness, the
+calibration table holds it per color relative to the others. With 1 for all three the dose is added_RGB / 765, the
+exposure SLMManager has always used.
+
+The brightness of a grating also grows with its y_max. rebalance() uses that to shorten the exposures: tiles are
+written with a larger y_max and exposed for correspondingly less time, for the same brightness. The response of
+brightness to y_max is linear unless a measured one is given, load_response() reads it from the y_max study
+(Mika/plots/y_max_study/data).
+
+Exposures are stored with the job as exposures.npy, the exposure of every tile as a fraction of the maximum exposure
+time set when stitching. SLMManager.load_csv_data prefers it over added_RGB_values.csv.
+
+    model = DoseModel()
+    doses = model.tile_doses(rgb)                  # rgb of shape (tiles, subpixels, 3)
+    exposures, y_max = model.rebalance(doses)
+    save_exposures(folder, exposures)
+'''
+
+COLORS = ("red", "green", "blue")
+
+# Dose each color needs for full brightness, relative to the others
+CALIBRATION = {"red": 1.0, "green": 1.0, "blue": 1.0}
+
+# y_max of the brightest subpixel of a tile, and the largest y_max rebalance() may raise it to
+Y_MAX_REFERENCE = 128
+Y_MAX_LIMIT = 128
+
+EXPOSURES_FILENAME = "exposures.npy"
+
+# Measurements the running median of load_response() spans, the single depths of the y_max study scatter a lot
+RESPONSE_WINDOW = 9
+
+
+class DoseModel:
+    def __init__(self, calibration=None, response=None):
+        """
+        Parameters:
+        calibration (dict): Relative dose per color for full brightness, CALIBRATION if None.
+        response (tuple): Measured (y_max values, brightness) of gratings exposed equally long, None for brightness
+        proportional to y_max.
+        """
+        calibration = CALIBRATION if calibration is None else calibration
+        self.weights = np.array([calibration[color] for color in COLORS], dtype=float)
+        self.response = None
+        if response is not None:
+            y_max, brightness = (np.asarray(values, dtype=float) for values in response)
+            order = np.argsort(y_max)
+            self.response = (y_max[order], brightness[order])
+
+    def subpixel_doses(self, rgb):
+        """
+        Dose of every subpixel as a fraction of the dose of full white.
+
+        Parameters:
+        rgb (numpy.ndarray): Colors of shape (..., 3) with values from 0 to 255.
+        """
+        return np.asarray(rgb, dtype=float) @ self.weights / (255 * self.weights.sum())
+
+    def tile_doses(self, rgb):
+        """
+        Dose of every tile, set by its brightest subpixel.
+
+        Parameters:
+        rgb (numpy.ndarray): Colors of shape (tiles, subpixels, 3).
+
+        Returns:
+        numpy.ndarray: Dose of every tile from 0 to 1, the exposure as a fraction of the maximum exposure time.
+        """
+        return self.subpixel_doses(rgb).max(axis=-1)
+
+    def subpixel_levels(self, rgb):
+        """
+        Dose of every subpixel relative to the brightest one of its tile, which sets its y_max.
+
+        Parameters:
+        rgb (numpy.ndarray): Colors of shape (tiles, subpixels, 3) or (subpixels, 3) for a single tile.
+        """
+        doses = self.subpixel_doses(rgb)
+        peak = doses.max(axis=-1, keepdims=True)
+        return np.divide(doses, peak, out=np.zeros_like(doses), where=peak > 0)
+
+    def brightness(self, y_max):
+        """
+        Brightness of gratings with the given y_max relative to each other, for equal exposures.
+        """
+        y_max = np.asarray(y_max, dtype=float)
+        if self.response is None:
+            return y_max / Y_MAX_REFERENCE
+        return np.interp(y_max, *self.response)
+
+    def subpixel_y_max(self, levels, tile_y_max):
+        """
+        y_max that gives each subpixel its level of the brightness of the tile's brightest subpixel, read from the
+        rising part of the response. Without a measured response the level scales y_max linearly.
+
+        Parameters:
+        levels (numpy.ndarray): Levels from subpixel_levels.
+        tile_y_max (float): y_max of the brightest subpixel.
+        """
+        levels = np.asarray(levels, dtype=float)
+        if self.response is None:
+            return levels * tile_y_max
+        y_max, brightness = self.response
+        rising = y_max <= tile_y_max
+        # Brightness has to grow with y_max for the inversion, flat stretches keep the smaller y_max
+        envelope = np.maximum.accumulate(brightness[rising])
+        return np.interp(levels * self.brightness(tile_y_max), envelope, y_max[rising])
+
+    def rebalance(self, doses, y_max=Y_MAX_REFERENCE, y_max_limit=Y_MAX_LIMIT, min_dose=0.0):
+        """
+        Shortest exposure of every tile for the brightness it has at the given y_max, by writing it with the y_max
+        of the highest brightness up to y_max_limit. Tiles that would fall below min_dose (the shortest exposure the
+        shutter can do) keep min_dose and get a lower y_max instead.
+
+        Parameters:
+        doses (numpy.ndarray): Dose of every tile at y_max, from tile_doses.
+        y_max (float): y_max the doses are meant for.
+        y_max_limit (int): Largest y_max a tile may get.
+        min_dose (float): Shortest exposure as a fraction of the maximum exposure time.
+
+        Returns:
+        tuple: Exposure of every tile as a fraction of the maximum exposure time, y_max of its brightest subpixel.
+        """
+        doses = np.asarray(doses, dtype=float)
+        candidates = np.arange(1, y_max_limit + 1)
+        gains = self.brightness(candidates) / self.brightness(y_max)
+        best = int(np.argmax(gains))
+
+        exposures = doses / gains[best]
+        tile_y_max = np.full(doses.shape, candidates[best])
+
+        short = (doses > 0) & (exposures < min_dose)
+        if short.any():
+            # Largest y_max whose gain keeps the exposure at min_dose at least
+            reachable = np.maximum.accumulate(gains[:best + 1])
+            index = np.clip(np.searchsorted(reachable, doses[short] / min_dose, side='right') - 1, 0, best)
+            tile_y_max[short] = candidates[index]
+            exposures[short] = doses[short] / gains[index]
+        return exposures, tile_y_max
+
+
+def load_response(path, window=RESPONSE_WINDOW):
+    """
+    Brightness response to y_max from the y_max study, rows of y_max, depth in nm and exposure in s. The depth per
+    second of exposure stands in for the brightness, smoothed with a running median over window measurements.
+
+    Returns:
+    tuple: (y_max values, brightness) for DoseModel.
+    """
+    data = np.loadtxt(path, delimiter=',', ndmin=2)
+    data = data[np.argsort(data[:, 0])]
+    y_max, depth_rate = data[:, 0], data[:, 1] / data[:, 2]
+    half = window // 2
+    padded = np.pad(depth_rate, half, mode='edge')
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window)
+    brightness = np.median(windows, axis=1)
+    # A flat pattern (y_max 0) writes no grating
+    if y_max[0] > 0:
+        y_max, brightness = np.concatenate([[0.0], y_max]), np.concatenate([[0.0], brightness])
+    return y_max, brightness
+
+
+def load_calibration(path):
+    """
+    Calibration table from a csv file with the columns color and dose, e.g. "red,1.2".
+    """
+    calibration = dict(CALIBRATION)
+    with open(path, newline='') as csv_file:
+        for row in csv.reader(csv_file):
+            if row and row[0].strip().lower() in calibration:
+                calibration[row[0].strip().lower()] = float(row[1])
+    return calibration
+
+
+def exposure_times(exposures, max_exp_time):
+    """
+    Exposure of every tile in seconds.
+
+    Parameters:
+    exposures (numpy.ndarray): Exposures as a fraction of the maximum exposure time, e.g. added_RGB / 765.
+    max_exp_time (float): Maximum exposure time in seconds.
+    """
+    return np.asarray(exposures, dtype=float) * max_exp_time
+
+
+def save_exposures(folder, exposures):
+    np.save(os.path.join(folder, EXPOSURES_FILENAME), np.asarray(exposures, dtype=np.float32))
+
+
+def load_exposures(folder):
+    """
+    Exposures stored with a job, None if the job has none.
+    """
+    path = os.path.join(folder, EXPOSURES_FILENAME)
+    if not os.path.exists(path):
+        return None
+    return np.load(path).astype(float)
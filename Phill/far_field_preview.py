@@ -0,0 +1,309 @@
+import argparse
+import csv
+import hashlib
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from period_calculator import print_pitch, wavelength_blue, wavelength_green, wavelength_red
+
+"""
+Simulated far-field preview for generated SLM frames and printing jobs.
+
+A frame is treated as a phase grating (gray two_pi_gray = 2*pi), its far field is the power spectrum of a centered
+window of the frame. Spatial frequencies are converted to diffraction angles per color with the relations of
+period_calculator.py (sin(angle) = order * wavelength / period, one SLM pixel = 1/15 um in the print), and the
+preview shows the spectrum on an angle grid with one color channel per wavelength.
+
+For whole jobs the window keeps the FFT small, frames are loaded in threads, and previews are cached per frame
+file (in memory and optionally on disk), so repeated frames and repeated runs cost nothing.
+
+Usage:
+    python far_field_preview.py output/pattern_1.png
+    python far_field_preview.py output --output preview.png      # folder with dataset.csv
+
+    preview = FarFieldPreview(two_pi_gray=128)
+    image = preview.preview_frame(frame)                         # uint8 RGB array
+    previews, coordinates = preview.preview_job("output")
+    preview.job_mosaic(previews, coordinates).show()
+"""
+
+# wavelength in µm
+WAVELENGTHS = {
+    "red": wavelength_red,
+    "green": wavelength_green,
+    "blue": wavelength_blue,
+}
+
+# size of one SLM pixel in the print in µm (x_max = period / print_pitch)
+PRINT_PITCH = print_pitch
+
+
+class FarFieldPreview:
+    def __init__(self, window=256, size=128, max_angle=60, two_pi_gray=255, wavelengths=None, pitch=PRINT_PITCH,
+                 suppress_zero_order=True, cache_dir=None):
+        """
+        Parameters:
+        window (int): Side of the centered frame window that is transformed, sets the angular resolution.
+        size (int): Side of the preview image in pixels.
+        max_angle (float): Largest diffraction angle shown in degrees, the preview covers -max_angle to max_angle.
+        two_pi_gray (float): Gray value that corresponds to a phase of 2*pi on the SLM.
+        wavelengths (dict): Color name to wavelength in µm, at most three, defaults to WAVELENGTHS.
+        pitch (float): Size of one SLM pixel in the print in µm.
+        suppress_zero_order (bool): Remove the undiffracted light so the orders are visible.
+        cache_dir (str): Folder to keep previews between runs, None keeps them in memory only.
+        """
+        self.window = window
+        self.size = size
+        self.max_angle = max_angle
+        self.two_pi_gray = two_pi_gray
+        self.wavelengths = WAVELENGTHS if wavelengths is None else wavelengths
+        self.pitch = pitch
+        self.suppress_zero_order = suppress_zero_order
+        self.cache_dir = cache_dir
+        self.cache = {}
+
+        if self.cache_dir is not None and not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        self.phase_table = (np.arange(256) * (2 * np.pi / self.two_pi_gray)).astype(np.float32)
+        self.frequencies = np.fft.fftshift(np.fft.fftfreq(self.window, d=self.pitch))
+        self.angle_maps = [self.angle_map(wavelength) for wavelength in self.wavelengths.values()]
+
+    def angle_map(self, wavelength):
+        """
+        Spectrum bin shown at every preview pixel for one wavelength.
+
+        Returns:
+        tuple: (row_index, column_index, visible) arrays of shape (size, size), visible is False where the angle
+        needs a spatial frequency outside the window spectrum.
+        """
+        sin_angle = np.sin(np.radians(np.linspace(-self.max_angle, self.max_angle, self.size)))
+        # Spatial frequency in 1/µm that diffracts into each angle, sin(angle) = wavelength / period
+        frequency = sin_angle / wavelength
+        step = self.frequencies[1] - self.frequencies[0]
+        index = np.round(frequency / step).astype(np.intp) + self.window // 2
+        inside = (index >= 0) & (index < self.window)
+        index = np.clip(index, 0, self.window - 1)
+
+        # Rows run from top to bottom, so the vertical angle axis is flipped
+        row_index = index[::-1, np.newaxis].repeat(self.size, axis=1)
+        column_index = index[np.newaxis, :].repeat(self.size, axis=0)
+        visible = inside[::-1, np.newaxis] & inside[np.newaxis, :]
+        return row_index, column_index, visible
+
+    def crop_window(self, frame):
+        frame = np.asarray(frame)
+        if frame.ndim == 3:
+            frame = frame[..., 0]
+        height, width = frame.shape
+        if height < self.window or width < self.window:
+            raise ValueError(f"Frame {width}x{height} is smaller than the preview window {self.window}")
+        top = (height - self.window) // 2
+        left = (width - self.window) // 2
+        return frame[top:top + self.window, left:left + self.window]
+
+    def spectra(self, frames):
+        """
+        Far-field power spectra of a stack of frames, zero frequency in the center.
+
+        Parameters:
+        frames (numpy.ndarray): uint8 windows of shape (B, window, window).
+
+        Returns:
+        numpy.ndarray: float32 spectra of shape (B, window, window), each normalized to a total power of 1.
+        """
+        field = np.exp(1j * self.phase_table[frames]).astype(np.complex64)
+        spectrum = np.abs(np.fft.fft2(field, axes=(-2, -1))) ** 2
+        spectrum = np.fft.fftshift(spectrum, axes=(-2, -1)).astype(np.float32)
+        spectrum /= spectrum.sum(axis=(-2, -1), keepdims=True)
+
+        if self.suppress_zero_order:
+            center = self.window // 2
+            spectrum[:, center - 1:center + 2, center - 1:center + 2] = 0
+        return spectrum
+
+    def render(self, spectra):
+        """
+        Map spectra onto the angle grid, one color channel per wavelength, log scaled to uint8.
+        """
+        previews = np.zeros((len(spectra), self.size, self.size, 3), dtype=np.float32)
+        for channel, (row_index, column_index, visible) in enumerate(self.angle_maps):
+            previews[..., channel] = spectra[:, row_index, column_index] * visible
+
+        previews = np.log1p(previews * 1e4)
+        peak = previews.max(axis=(1, 2, 3), keepdims=True)
+        previews = np.divide(previews, peak, out=np.zeros_like(previews), where=peak > 0)
+        return (previews * 255).astype(np.uint8)
+
+    def preview_frames(self, frames):
+        """
+        Previews of a list of frames.
+
+        Returns:
+        numpy.ndarray: uint8 RGB previews of shape (B, size, size, 3).
+        """
+        windows = np.stack([self.crop_window(frame) for frame in frames])
+        return self.render(self.spectra(windows))
+
+    def preview_frame(self, frame):
+        return self.preview_frames([frame])[0]
+
+    def first_orders(self, frame):
+        """
+        Strongest diffraction order of a frame and its angle for every color.
+
+        Returns:
+        dict: Color name to (angle_x, angle_y) in degrees, None for colors where the order is evanescent.
+        """
+        spectrum = self.spectra(self.crop_window(frame)[np.newaxis])[0]
+        row, column = np.unravel_index(np.argmax(spectrum), spectrum.shape)
+        frequency_x = self.frequencies[column]
+        frequency_y = -self.frequencies[row]
+
+        angles = {}
+        for color, wavelength in self.wavelengths.items():
+            sin_x = wavelength * frequency_x
+            sin_y = wavelength * frequency_y
+            if sin_x ** 2 + sin_y ** 2 > 1:
+                angles[color] = None
+            else:
+                angles[color] = (math.degrees(math.asin(sin_x)), math.degrees(math.asin(sin_y)))
+        return angles
+
+    def cache_key(self, path):
+        stat = os.stat(path)
+        settings = (self.window, self.size, self.max_angle, self.two_pi_gray, tuple(self.wavelengths.values()),
+                    self.pitch, self.suppress_zero_order)
+        text = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{settings}"
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def load_cached(self, key):
+        if key in self.cache:
+            return self.cache[key]
+        if self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, f"{key}.npy")
+            if os.path.exists(path):
+                self.cache[key] = np.load(path)
+                return self.cache[key]
+        return None
+
+    def store_cached(self, key, preview):
+        self.cache[key] = preview
+        if self.cache_dir is not None:
+            np.save(os.path.join(self.cache_dir, f"{key}.npy"), preview)
+
+    def load_window(self, path):
+        with Image.open(path) as image:
+            return self.crop_window(np.asarray(image.convert("L")))
+
+    def preview_files(self, paths, batch_size=64, workers=8):
+        """
+        Previews for a list of frame files, every distinct file is loaded and transformed once.
+
+        Returns:
+        list: uint8 RGB previews in the order of paths.
+        """
+        keys = [self.cache_key(path) for path in paths]
+        missing = {}
+        for key, path in zip(keys, paths):
+            if key not in missing and self.load_cached(key) is None:
+                missing[key] = path
+
+        missing_keys = list(missing)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for start in range(0, len(missing_keys), batch_size):
+                batch_keys = missing_keys[start:start + batch_size]
+                windows = np.stack(list(executor.map(self.load_window, [missing[key] for key in batch_keys])))
+                for key, preview in zip(batch_keys, self.render(self.spectra(windows))):
+                    self.store_cached(key, preview)
+
+        return [self.cache[key] for key in keys]
+
+    def preview_job(self, job_path, batch_size=64, workers=8):
+        """
+        Previews for every tile of a job folder with dataset.csv and pattern_{n}.png frames.
+
+        Returns:
+        tuple: (previews, coordinates) with one preview and one (X, Z) stage coordinate per csv row.
+        """
+        frame_paths, coordinates = read_job(job_path)
+        return self.preview_files(frame_paths, batch_size, workers), coordinates
+
+    def job_mosaic(self, previews, coordinates, thumbnail=32):
+        """
+        Arrange tile previews at their stage positions, as seen looking at the print.
+        """
+        x_values = sorted(set(x for x, z in coordinates))
+        z_values = sorted(set(z for x, z in coordinates), reverse=True)
+        column_of = {x: i for i, x in enumerate(x_values)}
+        row_of = {z: i for i, z in enumerate(z_values)}
+
+        mosaic = np.zeros((len(z_values) * thumbnail, len(x_values) * thumbnail, 3), dtype=np.uint8)
+        step = max(1, self.size // thumbnail)
+        for preview, (x, z) in zip(previews, coordinates):
+            small = preview[::step, ::step][:thumbnail, :thumbnail]
+            row = row_of[z] * thumbnail
+            column = column_of[x] * thumbnail
+            mosaic[row:row + small.shape[0], column:column + small.shape[1]] = small
+
+        return Image.fromarray(mosaic)
+
+
+def read_job(job_path):
+    """
+    Frame file and stage coordinate for every row of a job's dataset.csv.
+
+    Uses the optional frame column for deduplicated jobs, otherwise row n uses pattern_{n}.png.
+    """
+    frame_paths = []
+    coordinates = []
+    with open(os.path.join(job_path, "dataset.csv"), newline='') as csv_file:
+        reader = csv.reader(csv_file)
+        next(reader)  # Skip the header row
+        for index, row in enumerate(reader):
+            frame_id = row[3] if len(row) > 3 else index + 1
+            frame_paths.append(os.path.join(job_path, f"pattern_{frame_id}.png"))
+            coordinates.append((float(row[1]), float(row[2])))
+    return frame_paths, coordinates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated far-field preview of SLM frames and printing jobs.")
+    parser.add_argument("path", help="Frame image, or job folder with dataset.csv")
+    parser.add_argument("--output", help="Save the preview (or job mosaic) to this file instead of showing it")
+    parser.add_argument("--window", type=int, default=256, help="Side of the transformed frame window")
+    parser.add_argument("--size", type=int, default=128, help="Side of a preview in pixels")
+    parser.add_argument("--max-angle", type=float, default=60, help="Largest diffraction angle shown in degrees")
+    parser.add_argument("--two-pi-gray", type=float, default=255, help="Gray value of a 2*pi phase shift")
+    parser.add_argument("--cache-dir", help="Folder to keep previews between runs")
+    args = parser.parse_args()
+
+    preview = FarFieldPreview(window=args.window, size=args.size, max_angle=args.max_angle,
+                              two_pi_gray=args.two_pi_gray, cache_dir=args.cache_dir)
+    start = time.perf_counter()
+
+    if os.path.isdir(args.path):
+        previews, coordinates = preview.preview_job(args.path)
+        image = preview.job_mosaic(previews, coordinates)
+        print(f"{len(previews)} tiles previewed in {time.perf_counter() - start:.1f} s")
+    else:
+        with Image.open(args.path) as frame_image:
+            frame = np.asarray(frame_image.convert("L"))
+        image = Image.fromarray(preview.preview_frame(frame))
+        for color, angles in preview.first_orders(frame).items():
+            if angles is None:
+                print(f"{color}:\tevanescent")
+            else:
+                print(f"{color}:\t{angles[0]:.2f}° horizontal, {angles[1]:.2f}° vertical")
+
+    if args.output:
+        image.save(args.output)
+    else:
+        image.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+
+'''
+Append-only journal of the finished tiles of a stitching job (the finished lines of a printing job), job_journal.csv
+in the job folder, so a job that ends early (boundary error, exit, crash, power cut) continues where it stopped:
+
+# absolute stitching, 400 tiles, 20 x 20, offset 0 0
+tile,x,z
+1,4598,-4598
+2,4114,-4598
+
+The first line names the job, a journal of another job (other mode, size, offset or start) is not resumed. Every
+tile is flushed to disk when it is done, a few hundred microseconds against seconds per tile. The journal is
+deleted when the job completes, so a journal in a folder always means an interrupted job.
+'''
+
+JOURNAL_FILENAME = "job_journal.csv"
+HEADER = "tile,x,z"
+
+
+def load_journal(folder):
+    """
+    Job and finished tiles of the journal in a job folder.
+
+    Returns:
+    tuple: Job description (None without a journal) and the finished tile numbers. A last line cut off by a crash is
+    left out.
+    """
+    path = os.path.join(folder, JOURNAL_FILENAME)
+    if not os.path.exists(path):
+        return None, []
+    with open(path) as journal_file:
+        lines = journal_file.read().split('\n')
+    job = lines[0][2:] if lines[0].startswith("# ") else None
+    tiles = []
+    # Only lines ending with a newline are complete
+    for line in lines[2:-1]:
+        fields = line.split(',')
+        if len(fields) == 3 and fields[0].isdigit():
+            tiles.append(int(fields[0]))
+    return job, tiles
+
+
+class JobJournal:
+    """
+    Journal of one job.
+
+    Parameters:
+    folder (str): Job folder.
+    job (str): Description of the job, e.g. "absolute stitching, 400 tiles, 20 x 20, offset 0 0".
+    """
+    def __init__(self, folder, job):
+        self.folder = folder
+        self.path = os.path.join(folder, JOURNAL_FILENAME)
+        self.job = job
+        self.file = None
+
+    def finished(self):
+        """
+        Tiles finished in order from tile 1 by an earlier run of the same job, 0 if there is none.
+        """
+        job, tiles = load_journal(self.folder)
+        if job != self.job:
+            return 0
+        done = set(tiles)
+        count = 0
+        while count + 1 in done:
+            count += 1
+        return count
+
+    def open(self, resume=False):
+        """
+        Start writing, after the tiles already in the journal if resume, else into a new journal.
+        """
+        if resume:
+            self.file = open(self.path, 'a')
+        else:
+            self.file = open(self.path, 'w')
+            self.file.write(f"# {self.job}\n{HEADER}\n")
+            self.flush()
+
+    def done(self, tile, x=None, z=None):
+        """
+        Record a finished tile (line), durable on disk when this returns.
+
+        Parameters:
+        tile (int): Tile number, 1 for the first.
+        x, z (int): Stage position of the tile, the start of the line when printing.
+        """
+        if self.file is None:
+            return
+        self.file.write(f"{tile},{'' if x is None else int(x)},{'' if z is None else int(z)}\n")
+        self.flush()
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def finish(self):
+        """
+        The job is complete, nothing to resume.
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,166 @@
+import csv
+import os
+import numpy as np
+
+"""
+Phase-to-gray stage for SLM output, shared by the DOE and grating generators.
+
+A PhaseLUT holds one gray value per phase level over [-pi, pi). Applying it is a single vectorized gather
+(np.take), so it is cheap enough to run on every frame of a live preview. Calibrated tables are read per wavelength
+from csv files with a "phase,gray" header (phase in radians from 0 to 2*pi), the linear table reproduces the
+current ((phase + pi) / (2 * pi)) * 255 mapping and the y_min/y_max gray ranges of the grating generators.
+
+The DOE generators compute phase and use apply(). The grating generators (subdivision, flying bird) compute their
+sawtooth waveforms in gray values of the uncalibrated SLM and, when given a table, pass them through apply_gray().
+
+Usage:
+    lut = PhaseLUT.for_wavelength(633, calibration_dir)
+    frame = lut.apply(phase)                  # uint8 frame
+    frame = lut.apply(phase, diffuse=True)    # with error diffusion of the quantization error
+    waveform = lut.apply_gray(waveform)       # sawtooth in uncalibrated gray values
+"""
+
+TWO_PI = 2 * np.pi
+
+
+class PhaseLUT:
+    def __init__(self, table, name="custom"):
+        """
+        Parameters:
+        table (numpy.ndarray): Gray value for each of the len(table) phase levels, level i covers the phases from
+            -pi + i * 2 * pi / len(table) on.
+        name (str): Description shown in prints and benchmarks.
+        """
+        self.table = np.clip(np.round(np.asarray(table, dtype=np.float64)), 0, 255).astype(np.uint8)
+        self.levels = len(self.table)
+        self.name = name
+        # Phase represented by each gray value of the table, used for the error diffusion
+        self.level_phase = -np.pi + (np.arange(self.levels) + 0.5) * TWO_PI / self.levels
+        self.scale = np.float32(self.levels / TWO_PI)
+        self.offset = np.float32(np.pi * self.levels / TWO_PI)
+        # Scratch arrays reused between frames of the same shape, allocating them costs more than the gather
+        self.position = None
+        self.index = None
+
+    @classmethod
+    def linear(cls, y_min=0, y_max=255, levels=256):
+        """
+        Uncalibrated table: phase -pi to pi maps linearly onto the gray range y_min to y_max.
+        """
+        table = y_min + np.floor(np.arange(levels) / levels * (y_max - y_min + 1))
+        return cls(np.minimum(table, y_max), name=f"linear {y_min}-{y_max}")
+
+    @classmethod
+    def from_csv(cls, path, levels=256):
+        """
+        Calibrated table from a csv file with the measured gray value for a set of phases (radians, 0 to 2*pi).
+        The calibration phase is the retardation relative to gray 0, the input phase -pi is placed there like in
+        the linear table. The measurements are interpolated onto the phase levels.
+        """
+        phases = []
+        grays = []
+        with open(path, newline='') as csv_file:
+            reader = csv.DictReader(csv_file)
+            for row in reader:
+                phases.append(float(row["phase"]))
+                grays.append(float(row["gray"]))
+
+        if len(phases) < 2:
+            raise ValueError(f"Calibration file {path} needs at least two rows")
+
+        order = np.argsort(phases)
+        # Level phases in the 0 to 2*pi convention of the calibration file
+        level_phase = (np.arange(levels) + 0.5) * TWO_PI / levels
+        table = np.interp(level_phase, np.asarray(phases)[order], np.asarray(grays)[order])
+        return cls(table, name=os.path.basename(path))
+
+    @classmethod
+    def for_wavelength(cls, wavelength, calibration_dir, levels=256):
+        """
+        Calibrated table for a wavelength in nm, read from lut_{wavelength}nm.csv in calibration_dir.
+        """
+        path = os.path.join(calibration_dir, f"lut_{int(round(wavelength))}nm.csv")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No SLM calibration for {wavelength} nm: {path}")
+        return cls.from_csv(path, levels)
+
+    def indices(self, phase):
+        """
+        Phase level of every pixel, not yet wrapped into 0 to levels - 1 (np.take(..., mode="wrap") does that).
+        The returned array is a scratch buffer that is overwritten by the next call.
+        """
+        phase = np.asarray(phase, dtype=np.float32)
+        if self.position is None or self.position.shape != phase.shape:
+            self.position = np.empty(phase.shape, dtype=np.float32)
+            self.index = np.empty(phase.shape, dtype=np.int32)
+
+        np.multiply(phase, self.scale, out=self.position)
+        np.add(self.position, self.offset, out=self.position)
+        np.floor(self.position, out=self.position)
+        self.index[...] = self.position
+        return self.index
+
+    def apply(self, phase, diffuse=False, out=None):
+        """
+        Map a phase array (radians) to gray values.
+
+        Parameters:
+        phase (numpy.ndarray): Phase in radians, any range.
+        diffuse (bool): Spread the quantization error onto the neighbouring pixels, see diffuse_error.
+        out (numpy.ndarray): Optional uint8 array to write the frame into.
+
+        Returns:
+        numpy.ndarray: uint8 frame of the same shape as phase.
+        """
+        if diffuse:
+            index = self.diffuse_error(phase)
+        else:
+            index = self.indices(phase)
+        return np.take(self.table, index, out=out, mode="wrap")
+
+    def apply_gray(self, gray, out=None):
+        """
+        Map gray values of the uncalibrated SLM through the table. Gray g stands for the phase of the linear 0-255
+        table, -pi + (g + 0.5) * 2 * pi / 256, so PhaseLUT.linear() returns the gray values rounded. Unlike a phase,
+        a gray value is not periodic: values beyond 0 or 255 saturate at the first or last level instead of wrapping
+        around, which would turn the top of a sawtooth into a 2*pi jump.
+
+        Parameters:
+        gray (numpy.ndarray): Gray values, e.g. a sawtooth waveform with its y_max.
+        out (numpy.ndarray): Optional uint8 array to write the result into.
+
+        Returns:
+        numpy.ndarray: uint8 array of the same shape as gray.
+        """
+        phase = (np.asarray(gray, dtype=np.float32) + np.float32(0.5)) * np.float32(TWO_PI / 256) - np.float32(np.pi)
+        return np.take(self.table, self.indices(phase), out=out, mode="clip")
+
+    def diffuse_error(self, phase):
+        """
+        Phase levels with error diffusion of the quantization error.
+
+        The frame is swept column by column, every column is quantized at once and its (wrapped) phase error is
+        passed on to the next column: 7/16 straight, 3/16 and 1/16 to the rows above and below, the remaining 5/16
+        straight as well. This is Floyd-Steinberg turned by 90 degrees without the in-column term, which would need
+        a pixel-by-pixel loop.
+        """
+        phase = np.asarray(phase, dtype=np.float32)
+        if phase.ndim != 2:
+            raise ValueError("Error diffusion needs a 2D phase array")
+
+        index = np.empty(phase.shape, dtype=np.intp)
+        carry = np.zeros(phase.shape[0], dtype=np.float32)
+
+        for column in range(phase.shape[1]):
+            wanted = phase[:, column] + carry
+            level = np.floor(wanted * self.scale + self.offset).astype(np.intp)
+            np.mod(level, self.levels, out=level)
+            index[:, column] = level
+
+            # Wrapped difference between wanted and represented phase
+            error = np.mod(wanted - self.level_phase[level] + np.pi, TWO_PI) - np.pi
+            carry = error * (12 / 16)
+            carry[1:] += error[:-1] * (1 / 16)
+            carry[:-1] += error[1:] * (3 / 16)
+
+        return index
@@ -0,0 +1,355 @@
+import argparse
+import csv
+import math
+import os
+import time
+import numpy as np
+from dose_model import exposure_times, load_exposures
+from job_manifest import columns_and_rows, load_manifest
+from SerialMotorControl_Active import MotorController
+from tile_coordinates import tile_coordinates
+from tile_trace import load_trace
+
+'''
+Print-time estimate of stitching and printing jobs from the motion model of MotorController.
+
+Every move is timed from its motion profile (trapezoidal, or S-curve when a jerk is given) with the velocity,
+acceleration and deceleration the driver sets, then rounded up the way wait_for_motion_completion notices the end
+(1 s before the first poll, then every 0.5 s). Each tile adds its own exposure (see dose_model.py),
+the settle sleep before the shutter opens and the overheads in OVERHEADS. The overheads are the serial commands
+around every move and the Tk scheduling between tiles, calibrate() measures them from the tile trace of a finished
+job (see tile_trace.py).
+
+Estimate of a stitch before starting it:
+    python print_time_estimator.py C:/Users/mcgeelab/Desktop/SLMImages/job1 --max-exp 4
+of a print:
+    python print_time_estimator.py --lines 1000 --rows 30 --speed 40
+'''
+
+# Motion parameters MotorController.init_operation sets for stitching and for moving between printed lines, in
+# counts/s, counts/s^2 and counts/s^3 (None for trapezoidal moves)
+STITCH_MOTION = dict(MotorController.STITCH_MOTION, jerk=None)
+# Z velocity of MotorController.printing when returning to the start of the next line
+PRINT_RETURN_VELOCITY = MotorController.PRINT_RETURN_VELOCITY
+
+# Distances of MotorController in counts
+STITCH_PITCH = MotorController.SLM_STITCHING_PIXEL
+PRINT_PITCH = MotorController.SLM_PRINTING_PIXEL
+PRINT_HEIGHT = MotorController.SLM_PRINTING_HEIGHT
+PRINT_OFFSET = MotorController.SLM_PRINTING_OFFSET
+
+# wait_for_motion_completion: sleep before the first status poll and between polls, in seconds
+FIRST_POLL = MotorController.FIRST_POLL
+POLL_INTERVAL = MotorController.POLL_INTERVAL
+
+# Seconds, measured on the simulated bench, calibrate() replaces them with the values of a real job
+OVERHEADS = {
+    "command": 0.235,  # serial commands of one move (target, profile, start, status polls)
+    "settle": 1.25,  # after the move until the shutter opens (after_movement_stitching)
+    "tile": 0.05,  # shutter closed or line done until the next move starts (Tk after() delays)
+}
+
+
+def ramp_time(velocity, acceleration, jerk=None):
+    """
+    Time to accelerate from rest to velocity, constant acceleration or jerk-limited (S-curve).
+    """
+    if jerk is None:
+        return velocity / acceleration
+    if velocity >= acceleration ** 2 / jerk:
+        return velocity / acceleration + acceleration / jerk
+    # Acceleration never reaches its limit
+    return 2 * math.sqrt(velocity / jerk)
+
+
+def move_time(distance, velocity, acceleration, deceleration=None, jerk=None):
+    """
+    Duration of a point-to-point move from rest to rest.
+
+    Parameters:
+    distance (float): Length of the move in counts, the sign is ignored.
+    velocity (float): Maximum velocity in counts/s.
+    acceleration (float): Acceleration in counts/s^2.
+    deceleration (float): Deceleration in counts/s^2, the acceleration if None.
+    jerk (float): Jerk in counts/s^3 for S-curve moves, None for trapezoidal moves.
+
+    Returns:
+    float: Seconds the drive needs for the move.
+    """
+    distance = abs(distance)
+    if distance == 0:
+        return 0.0
+    deceleration = deceleration or acceleration
+
+    def ramps(v):
+        return ramp_time(v, acceleration, jerk), ramp_time(v, deceleration, jerk)
+
+    # Both ramps are symmetric in time, so each covers its final velocity times half its duration
+    t_acceleration, t_deceleration = ramps(velocity)
+    ramp_distance = velocity * (t_acceleration + t_deceleration) / 2
+    if ramp_distance <= distance:
+        return t_acceleration + t_deceleration + (distance - ramp_distance) / velocity
+
+    # Too short to reach the velocity, find the peak velocity whose ramps cover the distance exactly
+    low, high = 0.0, velocity
+    for _ in range(60):
+        peak = (low + high) / 2
+        if peak * sum(ramps(peak)) / 2 < distance:
+            low = peak
+        else:
+            high = peak
+    return sum(ramps(high))
+
+
+def driver_move_time(distance, motion, overheads):
+    """
+    Time MotorController.movement() blocks for a move, from its start to the poll that finds it done.
+    """
+    seconds = move_time(distance, motion["velocity"], motion["acceleration"], motion.get("deceleration"),
+                        motion.get("jerk"))
+    polls = math.ceil(max(0.0, seconds - FIRST_POLL) / POLL_INTERVAL - 1e-9)
+    return FIRST_POLL + polls * POLL_INTERVAL + overheads["command"]
+
+
+def stitch_durations(exp_times, positions_x=None, positions_z=None, mode='absolute', offset_x=0, offset_z=0,
+                     columns=None, rows=None, start_x=None, start_z=None, motion=None, overheads=None, first_tile=1):
+    """
+    Estimated duration of every step of a stitch, as SLMManager.stitching_logic runs them.
+
+    Parameters:
+    exp_times (list): Exposure of every tile in seconds.
+    positions_x, positions_z (list): Absolute positions of the tiles in counts, for absolute stitching.
+    mode (str): 'absolute' or 'relative'.
+    offset_x, offset_z (int): Offset added to the absolute positions.
+    columns, rows (int): Size of the stitch, for relative stitching.
+    start_x, start_z (int): Start of a relative stitch, None to center it like the motor controller does.
+    motion (dict): Velocity, acceleration, deceleration and jerk of the moves, STITCH_MOTION if None.
+    overheads (dict): Overheads in seconds, OVERHEADS if None.
+    first_tile (int): Tile the stitch starts with, later than 1 when it resumes an interrupted stitch. The first step
+    then moves from home to that tile and the tiles before it are left out.
+
+    Returns:
+    numpy.ndarray: Seconds of every tile, the first one with the homing at the start, and of the return home at
+    the end.
+    """
+    motion = motion or STITCH_MOTION
+    overheads = overheads or OVERHEADS
+    exp_times = np.asarray(exp_times, dtype=float)
+    tiles = len(exp_times)
+
+    if mode == 'absolute':
+        x = np.asarray(positions_x, dtype=float) + offset_x
+        z = np.asarray(positions_z, dtype=float) + offset_z
+    elif mode == 'relative':
+        if start_x is None or start_z is None:
+            start_x = STITCH_PITCH / 2 * columns - STITCH_PITCH / 2
+            start_z = -(STITCH_PITCH / 2 * rows - STITCH_PITCH / 2)
+        x, z = tile_coordinates(-(-tiles // max(columns, 1)), columns, STITCH_PITCH, start_x=start_x, start_z=start_z)
+        x, z = x[:tiles], z[:tiles]
+    else:
+        raise ValueError(f"Unknown stitching mode {mode}")
+
+    skipped = first_tile - 1
+    x, z, exp_times = x[skipped:], z[skipped:], exp_times[skipped:]
+    tiles -= skipped
+    # Absolute tiles move X, then Z, from the tile before, the first one from home. The first relative tile moves
+    # to its position on both axes, every further one a pitch on a single axis
+    steps = [np.diff(x, prepend=0.0), np.diff(z, prepend=0.0)]
+    last = (x[-1], z[-1]) if tiles else (0.0, 0.0)
+
+    durations = np.empty(tiles + 1)
+    for index in range(tiles):
+        if mode == 'absolute' or index == 0:
+            moving = driver_move_time(steps[0][index], motion, overheads) + driver_move_time(steps[1][index], motion,
+                                                                                             overheads)
+        else:
+            moving = driver_move_time(steps[0][index] or steps[1][index], motion, overheads)
+        durations[index] = moving + overheads["settle"] + exp_times[index] + overheads["tile"]
+    # Homing at the start (go_to_zero_home from home) and the return home after the last tile
+    durations[0] += 2 * driver_move_time(0, motion, overheads)
+    durations[tiles] = (driver_move_time(last[0], motion, overheads) + driver_move_time(last[1], motion, overheads)
+                        + overheads["tile"])
+    return durations
+
+
+def print_durations(lines, rows, speed, start_x=None, start_z=None, motion=None, overheads=None, first_line=1):
+    """
+    Estimated duration of every step of a print, as SLMManager.printing_logic runs them.
+
+    Parameters:
+    lines (int): Printed lines (columns).
+    rows (int): Length of the lines in SLM rows.
+    speed (float): Printing speed in counts/s.
+    start_x, start_z (int): Start of the print, None to center it like the motor controller does.
+    motion (dict): Acceleration, deceleration and jerk of the moves and the velocity between lines, STITCH_MOTION
+    if None.
+    overheads (dict): Overheads in seconds, OVERHEADS if None.
+    first_line (int): Line the print starts with, later than 1 when it resumes an interrupted print. The move to the
+    start then goes to that line and the lines before it are left out.
+
+    Returns:
+    numpy.ndarray: Seconds of the move to the start, of every line and of the return home at the end.
+    """
+    motion = motion or STITCH_MOTION
+    overheads = overheads or OVERHEADS
+    if start_x is None or start_z is None:
+        start_x = PRINT_PITCH / 2 * lines - PRINT_PITCH / 2
+        start_z = -(PRINT_PITCH / 2 * rows - PRINT_PITCH + PRINT_HEIGHT / 2 + (PRINT_PITCH - PRINT_HEIGHT))
+    length = (rows - 1) * PRINT_PITCH + (PRINT_PITCH - PRINT_HEIGHT) + PRINT_OFFSET
+
+    printing = dict(motion, velocity=speed)
+    returning = dict(motion, velocity=PRINT_RETURN_VELOCITY)
+    line = (driver_move_time(length, printing, overheads) + driver_move_time(PRINT_PITCH, motion, overheads)
+            + driver_move_time(length, returning, overheads) + overheads["tile"])
+
+    skipped = first_line - 1
+    durations = np.full(lines - skipped + 2, line)
+    durations[0] = (2 * driver_move_time(0, motion, overheads)
+                    + driver_move_time(start_x - skipped * PRINT_PITCH, motion, overheads)
+                    + driver_move_time(start_z, motion, overheads) + overheads["tile"])
+    end_x = start_x - lines * PRINT_PITCH
+    durations[-1] = (driver_move_time(end_x, motion, overheads) + driver_move_time(start_z, returning, overheads)
+                     + overheads["tile"])
+    return durations
+
+
+def calibrate(path, motion=None):
+    """
+    Overheads measured in the tile trace of a finished job, for the ones the trace cannot tell the defaults are kept.
+
+    Parameters:
+    path (str): tile_trace.csv of the job.
+    motion (dict): Motion parameters the job ran with, STITCH_MOTION if None.
+
+    Returns:
+    dict: Overheads for stitch_durations and print_durations.
+    """
+    motion = motion or STITCH_MOTION
+    trace = load_trace(path)
+    overheads = dict(OVERHEADS)
+    if len(trace["tile"]) < 2:
+        return overheads
+
+    settle = trace["settle_ms"][~np.isnan(trace["settle_ms"])]
+    if len(settle):
+        overheads["settle"] = float(np.median(settle)) / 1000
+
+    # From the end of a tile, its shutter closing or else its move ending, to the start of the next one
+    ends = np.where(np.isnan(trace["shutter_close_ms"]), trace["move_end_ms"], trace["shutter_close_ms"])
+    gaps = trace["move_start_ms"][1:] - ends[:-1]
+    gaps = gaps[~np.isnan(gaps)]
+    if len(gaps):
+        overheads["tile"] = max(0.0, float(np.median(gaps)) / 1000)
+
+    # Move times beyond the motion model, split over the two moves of an absolute tile
+    moves = (trace["move_end_ms"] - trace["move_start_ms"])[1:] / 1000
+    dx, dz = np.diff(trace["x"]), np.diff(trace["z"])
+    known = ~(np.isnan(moves) | np.isnan(dx) | np.isnan(dz))
+    if known.any():
+        without = dict(overheads, command=0.0)
+        modelled = np.array([driver_move_time(x, motion, without) + driver_move_time(z, motion, without)
+                             for x, z in zip(dx[known], dz[known])])
+        overheads["command"] = max(0.0, float(np.median(moves[known] - modelled)) / 2)
+    return overheads
+
+
+def load_job(folder):
+    """
+    Added RGB values and positions of the tiles of a stitch job, from its manifest or else its dataset.csv.
+
+    Returns:
+    tuple: Added RGB values, X positions and Z positions as lists.
+    """
+    manifest = load_manifest(folder)
+    if manifest is not None:
+        return manifest["added_rgb"].tolist(), manifest["x"].tolist(), manifest["z"].tolist()
+    added_rgb, positions_x, positions_z = [], [], []
+    with open(os.path.join(folder, "dataset.csv"), newline='') as csv_file:
+        reader = csv.reader(csv_file)
+        next(reader)
+        for row in reader:
+            added_rgb.append(float(row[0]))
+            positions_x.append(int(row[1]))
+            positions_z.append(int(row[2]))
+    return added_rgb, positions_x, positions_z
+
+
+def format_eta(seconds):
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class LiveEstimate:
+    """
+    Remaining time of a running job. The steps still to come are scaled by how long the finished ones took against
+    their estimate, so a bench that runs slower or faster than the model is followed within a few tiles.
+
+    Parameters:
+    durations (list): Estimated seconds of every step, from stitch_durations or print_durations.
+    """
+    def __init__(self, durations):
+        self.durations = np.asarray(durations, dtype=float)
+        self.elapsed_estimate = np.cumsum(self.durations)
+        self.total = float(self.elapsed_estimate[-1]) if len(self.durations) else 0.0
+        self.start = time.perf_counter()
+        self.done = 0
+        self.finished_at = self.start
+
+    def step_done(self):
+        self.done = min(self.done + 1, len(self.durations))
+        self.finished_at = time.perf_counter()
+
+    def remaining(self):
+        """
+        Seconds left until the job is done.
+        """
+        if not self.done:
+            return self.total - (time.perf_counter() - self.start)
+        estimated = self.elapsed_estimate[self.done - 1]
+        scale = (self.finished_at - self.start) / estimated if estimated > 0 else 1.0
+        return (self.total - estimated) * scale
+
+    def status(self):
+        return f"about {format_eta(max(0.0, self.remaining()))} left"
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Estimate how long a stitch or print takes on the stages.")
+    parser.add_argument('folder', nargs='?', help="stitch job folder with dataset.csv")
+    parser.add_argument('--max-exp', type=float, default=4, help="maximum exposure time in s (default 4)")
+    parser.add_argument('--mode', default='absolute', help="stitching mode, absolute or relative")
+    parser.add_argument('--lines', type=int, help="estimate a print of this many lines instead")
+    parser.add_argument('--rows', type=int, help="length of the printed lines in SLM rows")
+    parser.add_argument('--speed', type=float, default=40, help="printing speed in counts/s (default 40)")
+    parser.add_argument('--trace', help="tile_trace.csv of an earlier job on the same bench to take the overheads "
+                                        "from")
+    arguments = parser.parse_args(arguments)
+
+    overheads = calibrate(arguments.trace) if arguments.trace else OVERHEADS
+    if arguments.lines is not None:
+        if arguments.rows is None:
+            parser.error("--rows is needed with --lines")
+        durations = print_durations(arguments.lines, arguments.rows, arguments.speed, overheads=overheads)
+        job = f"Print of {arguments.lines} lines at {arguments.speed:g} counts/s"
+    elif arguments.folder:
+        if arguments.mode not in ('absolute', 'relative'):
+            parser.error(f"unknown mode {arguments.mode}, choose absolute or relative")
+        added_rgb, positions_x, positions_z = load_job(arguments.folder)
+        columns, rows = columns_and_rows(positions_x)
+        manifest = load_manifest(arguments.folder)
+        exposures = load_exposures(arguments.folder) if manifest is None else manifest["exposures"]
+        if exposures is None:
+            exposures = np.asarray(added_rgb) / 765
+        exp_times = exposure_times(exposures, arguments.max_exp)
+        durations = stitch_durations(exp_times, positions_x, positions_z, mode=arguments.mode, columns=columns,
+                                     rows=rows, overheads=overheads)
+        job = f"{arguments.mode.capitalize()} stitch of {len(exp_times)} tiles ({exp_times.sum() / 3600:.2f} h exposure)"
+    else:
+        parser.error("give a job folder or --lines")
+
+    print(f"{job}: {format_eta(durations.sum())}")
+    print("Overheads: " + ", ".join(f"{name} {seconds:.3f} s" for name, seconds in overheads.items()))
+
+
+if __name__ == "__main__":
+    main()
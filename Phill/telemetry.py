@@ -0,0 +1,152 @@
+import argparse
+import json
+import socket
+import threading
+import time
+from collections import namedtuple
+
+'''
+Telemetry of a running job for the UI and for external dashboards, without locks in the motion loop.
+
+One thread publishes, everyone else reads: the motion thread of the phase plate, the Tk thread of the printer (its
+motion threads hand their updates over with after()). Every publish() builds a new immutable Telemetry record and
+swaps it in with a single assignment, so a reader always gets one complete record of one moment, never fields of two
+updates mixed, and neither side ever waits for the other:
+
+    telemetry = TelemetryPublisher("phase plate")
+    telemetry.publish(busy=True, step=1, steps=12)       # motion thread
+    record = telemetry.snapshot                          # Tk after() callback, any thread
+
+With a port the records also go out as JSON over UDP on localhost, at most rate per second and from a thread of
+their own, so a dashboard can follow the job without touching the motion thread or the serial lines. Follow a job:
+    python telemetry.py --port 50505
+'''
+
+FIELDS = [
+    "sequence",          # number of the record, counts up with every publish
+    "time",              # time.time() of the publish
+    "job",               # what is running, e.g. "phase plate", "absolute stitching"
+    "busy",              # a command or job step is running
+    "step",              # ring, tile or line in progress, 1 for the first
+    "steps",             # rings, tiles or lines of the job
+    "percentage_done",
+    "positions",         # position per axis as last read or commanded, None if unknown
+    "speeds",            # speed per axis as last read, None if unknown
+    "eta",               # seconds left, None if not estimated
+    "status",            # status line as shown in the UI
+]
+
+Telemetry = namedtuple("Telemetry", FIELDS)
+
+EMPTY = Telemetry(sequence=0, time=None, job="", busy=False, step=None, steps=None, percentage_done=0.0,
+                  positions=None, speeds=None, eta=None, status="")
+
+TELEMETRY_PORT = 50505
+# Records per second sent to the port at most
+TELEMETRY_RATE = 2
+
+
+class TelemetryPublisher:
+    """
+    Latest telemetry of a job, published by one thread and read by any.
+
+    Parameters:
+    job (str): Name of the job in the records.
+    port (int): UDP port on localhost the records are sent to, None to keep them in the process.
+    rate (float): Records per second sent to the port at most.
+    """
+    def __init__(self, job="", port=None, rate=TELEMETRY_RATE):
+        self.snapshot = EMPTY._replace(job=job)
+        self.port = port
+        self.rate = rate
+        self.stopped = threading.Event()
+        self.sender = None
+        if port is not None:
+            self.sender = threading.Thread(target=self.send, daemon=True)
+            self.sender.start()
+
+    def publish(self, **changes):
+        """
+        Replace the record with one that has the changes, e.g. publish(step=3, busy=True). Only the publishing
+        thread may call this, it neither locks nor does any I/O.
+        """
+        snapshot = self.snapshot
+        self.snapshot = snapshot._replace(sequence=snapshot.sequence + 1, time=time.time(), **changes)
+
+    def send(self):
+        """
+        Send every new record to the port, at most rate per second, until close().
+        """
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sent = -1
+        while not self.stopped.wait(1 / self.rate):
+            snapshot = self.snapshot
+            if snapshot.sequence == sent:
+                continue
+            try:
+                sender.sendto(encode(snapshot), ("127.0.0.1", self.port))
+            except OSError:
+                # Nobody listening, the next record is tried again
+                pass
+            sent = snapshot.sequence
+        sender.close()
+
+    def close(self):
+        """
+        Stop sending to the port, on shutdown of the application. Records can still be published and read.
+        """
+        self.stopped.set()
+
+
+def encode(snapshot):
+    return json.dumps(snapshot._asdict()).encode('utf-8')
+
+
+def decode(data):
+    values = json.loads(data.decode('utf-8'))
+    return Telemetry(**{field: values.get(field) for field in FIELDS})
+
+
+def format_record(snapshot):
+    """
+    One line of a record for a terminal.
+    """
+    progress = f"{snapshot.step} / {snapshot.steps}" if snapshot.steps else "---"
+    line = f"{snapshot.job}: {'running' if snapshot.busy else 'not running'}, {progress} ({snapshot.percentage_done:.2f} %)"
+    if snapshot.positions is not None:
+        line += ", position " + " ".join("---" if value is None else f"{value:g}" for value in snapshot.positions)
+    if snapshot.eta is not None:
+        line += f", {snapshot.eta / 60:.1f} min left"
+    if snapshot.status:
+        line += f" - {snapshot.status}"
+    return line
+
+
+def listen(port=TELEMETRY_PORT, callback=print, timeout=None):
+    """
+    Receive the records sent to a port and hand each to callback, until timeout seconds pass without one.
+    """
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", port))
+    receiver.settimeout(timeout)
+    try:
+        while True:
+            try:
+                data, _ = receiver.recvfrom(65536)
+            except socket.timeout:
+                return
+            callback(decode(data))
+    finally:
+        receiver.close()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Print the telemetry a running job sends to a local port.")
+    parser.add_argument('--port', type=int, default=TELEMETRY_PORT, help=f"UDP port (default {TELEMETRY_PORT})")
+    arguments = parser.parse_args(arguments)
+
+    listen(arguments.port, lambda snapshot: print(format_record(snapshot)))
+
+
+if __name__ == "__main__":
+    main()
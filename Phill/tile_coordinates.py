@@ -0,0 +1,83 @@
+import numpy as np
+
+'''
+Stage coordinates of the tiles of a stitch, shared by the pattern generators (dataset.csv, job.npz) and
+MotorController, computed with array arithmetic so a job of a million tiles takes milliseconds.
+
+The grid is centred on the stage origin unless a start is given. The first tile is at the largest X and the smallest Z,
+the tile column index counts towards smaller X, the tile row index towards larger Z, one pitch per step:
+
+serpentine   rows alternate direction, even rows towards smaller X and odd rows back (the order of dataset.csv and of
+             relative stitching)
+raster       every row towards smaller X, the stage returns to the first column between rows
+spiral       from the first tile along the border of the grid, then ring by ring towards the middle
+
+    x, z = tile_coordinates(rows=4, columns=6, pitch_x=484, pitch_z=323)
+'''
+
+ORDERS = ("serpentine", "raster", "spiral")
+
+
+def tile_indices(rows, columns, order="serpentine"):
+    """
+    Grid row and column of every tile in printing order, counted from the first tile.
+
+    Parameters:
+    rows (int): Number of tile rows.
+    columns (int): Number of tile columns.
+    order (str): One of ORDERS.
+
+    Returns:
+    tuple: Row and column index arrays of length rows * columns.
+    """
+    # SLMManager counts the rows of a job with a division
+    rows, columns = int(rows), int(columns)
+    row, column = np.indices((rows, columns)).reshape(2, -1)
+    if order == "serpentine":
+        # Odd rows run back, mirror their columns
+        column = np.where(row % 2 == 1, columns - 1 - column, column)
+    elif order == "spiral":
+        ring = np.minimum.reduce([row, column, rows - 1 - row, columns - 1 - column])
+        # Position along the border of the ring, clockwise from its first tile
+        ring_rows, ring_columns = rows - 2 * ring, columns - 2 * ring
+        r, c = row - ring, column - ring
+        along = np.select(
+            [r == 0, c == ring_columns - 1, r == ring_rows - 1],
+            [c, ring_columns - 1 + r, 2 * (ring_columns - 1) + ring_rows - 1 - c],
+            2 * (ring_columns - 1) + 2 * (ring_rows - 1) - r)
+        step = np.lexsort((along, ring))
+        row, column = row[step], column[step]
+    elif order != "raster":
+        raise ValueError(f"Unknown tile order {order}, choose from {ORDERS}")
+    return row, column
+
+
+def tile_coordinates(rows, columns, pitch_x, pitch_z=None, order="serpentine", start_x=None, start_z=None):
+    """
+    Stage position of every tile in printing order.
+
+    Parameters:
+    rows (int): Number of tile rows.
+    columns (int): Number of tile columns.
+    pitch_x (float): Stage pitch in X in counts.
+    pitch_z (float): Stage pitch in Z in counts, pitch_x if None.
+    order (str): One of ORDERS.
+    start_x, start_z (float): Position of the first tile, centred on the stage origin if None.
+
+    Returns:
+    tuple: X and Z arrays of length rows * columns.
+    """
+    pitch_z = pitch_x if pitch_z is None else pitch_z
+    if start_x is None:
+        start_x = ((columns / 2) - 1) * pitch_x + pitch_x / 2
+    if start_z is None:
+        start_z = -(((rows / 2) - 1) * pitch_z + pitch_z / 2)
+    row, column = tile_indices(rows, columns, order)
+    return start_x - column * pitch_x, start_z + row * pitch_z
+
+
+def coordinate_counts(x, z):
+    """
+    Coordinates as integer counts for dataset.csv and job.npz, truncated towards zero like int().
+    """
+    return np.trunc(x).astype(np.int64), np.trunc(z).astype(np.int64)
@@ -0,0 +1,192 @@
+import argparse
+import csv
+import os
+import time
+import numpy as np
+
+'''
+Per-tile timing of stitching and printing jobs, one row per tile (per line when printing):
+
+tile                  tile number, 1 for the first
+x, z                  commanded position in counts, the start of the line when printing
+move_start_ms         movement thread started, ms since the trace started
+move_end_ms           movement done and callback running
+settle_ms             stage stopped until the shutter opened
+frame_swap_ms         frame-to-screen latency of the frame shown for this tile, empty if the frame did not change
+shutter_open_ms       shutter opened
+shutter_close_ms      shutter closed
+exposure_requested_s  exposure time from dataset.csv
+exposure_measured_s   time between the open and close commands
+serial_bytes          bytes sent and received on the motor and shutter lines for this tile
+
+Every row is flushed to disk when its tile ends, like the job journal, so the trace of a job that stops early
+(boundary error, exit, crash) keeps all finished tiles. That costs a few hundred microseconds against seconds per
+tile.
+
+Summary of finished jobs:
+    python tile_trace.py C:/Users/mcgeelab/Desktop/SLMImages/job1/tile_trace.csv [more traces]
+'''
+
+FIELDS = ["tile", "x", "z", "move_start_ms", "move_end_ms", "settle_ms", "frame_swap_ms", "shutter_open_ms",
+          "shutter_close_ms", "exposure_requested_s", "exposure_measured_s", "serial_bytes"]
+
+PERCENTILES = (50, 95, 99)
+
+
+class TileTrace:
+    """
+    Writes the rows of one job to a csv file, one row as each tile ends.
+
+    Parameters:
+    path (str): csv file the trace is written to.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.origin = time.perf_counter()
+        self.tiles = 0
+        self.tile = None  # row of the tile in progress
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(FIELDS)
+        self.flush()
+
+    def ms(self, t):
+        return None if t is None else round((t - self.origin) * 1000, 3)
+
+    def start_tile(self, tile, x=None, z=None, serial_bytes=0):
+        """
+        Tile whose movement starts now.
+
+        Parameters:
+        serial_bytes (int): Byte count of the serial lines so far, the tile gets the bytes until end_tile.
+        """
+        self.tile = dict.fromkeys(FIELDS)
+        self.tile.update(tile=tile, x=x, z=z, move_start_ms=self.ms(time.perf_counter()), serial_bytes=serial_bytes)
+
+    def move_done(self):
+        if self.tile is not None:
+            self.tile["move_end_ms"] = self.ms(time.perf_counter())
+
+    def exposure(self, opened=None, closed=None, requested=None):
+        """
+        Shutter times of the tile as time.perf_counter() values, None for what did not happen during this tile. Can be
+        called more than once, e.g. when opening and closing, values not given are kept.
+        """
+        if self.tile is None:
+            return
+        if opened is not None:
+            self.tile["shutter_open_ms"] = self.ms(opened)
+            if self.tile["move_end_ms"] is not None:
+                self.tile["settle_ms"] = round(self.tile["shutter_open_ms"] - self.tile["move_end_ms"], 3)
+        if closed is not None:
+            self.tile["shutter_close_ms"] = self.ms(closed)
+        if requested is not None:
+            self.tile["exposure_requested_s"] = requested
+        if self.tile["shutter_open_ms"] is not None and self.tile["shutter_close_ms"] is not None:
+            self.tile["exposure_measured_s"] = round((self.tile["shutter_close_ms"] - self.tile["shutter_open_ms"]) / 1000, 6)
+
+    def end_tile(self, serial_bytes=0, frame_swap=None, x=None, z=None):
+        """
+        Write the row of the tile, on disk when this returns.
+
+        Parameters:
+        serial_bytes (int): Byte count of the serial lines now.
+        frame_swap (float): Frame-to-screen latency in seconds of the frame shown for the tile, None if unchanged.
+        x, z (int): Stage position of the tile if it was not known when the tile started.
+        """
+        if self.tile is None or self.file is None:
+            return
+        self.tile["serial_bytes"] = serial_bytes - self.tile["serial_bytes"]
+        if frame_swap is not None:
+            self.tile["frame_swap_ms"] = round(frame_swap * 1000, 3)
+        if x is not None:
+            self.tile["x"], self.tile["z"] = int(x), int(z)
+        self.writer.writerow(["" if self.tile[field] is None else self.tile[field] for field in FIELDS])
+        self.flush()
+        self.tiles += 1
+        self.tile = None
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            print(f"Tile trace with {self.tiles} tiles saved at {self.path}")
+
+
+def load_trace(path):
+    """
+    Columns of a tile trace as float arrays, NaN for empty fields.
+
+    Returns:
+    dict: Array for every field.
+    """
+    with open(path, newline='') as csv_file:
+        reader = csv.reader(csv_file)
+        header = next(reader)
+        rows = [[float(value) if value != "" else np.nan for value in row] for row in reader]
+    values = np.array(rows, dtype=float).reshape(-1, len(header))
+    return {field: values[:, i] for i, field in enumerate(header)}
+
+
+def statistics(values):
+    """
+    Mean, percentiles and max of the values that are not NaN, None if there are none.
+    """
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    return [values.mean()] + [np.percentile(values, p) for p in PERCENTILES] + [values.max()]
+
+
+def summarize(path):
+    """
+    Throughput and tail latencies of one traced job.
+
+    Returns:
+    str: Report of the job.
+    """
+    trace = load_trace(path)
+    tiles = len(trace["tile"])
+    if not tiles:
+        return f"{path}: no tiles"
+
+    start = np.nanmin(trace["move_start_ms"])
+    end = np.nanmax(np.concatenate([trace["move_end_ms"], trace["shutter_close_ms"]]))
+    duration = (end - start) / 1000
+    lines = [f"{path}: {tiles} tiles in {duration / 3600:.2f} h, {tiles / duration * 3600:.1f} tiles/h, "
+             f"{np.nansum(trace['serial_bytes']) / tiles:.0f} serial bytes per tile"]
+
+    steps = {
+        "cycle": np.diff(trace["move_start_ms"]),
+        "move": trace["move_end_ms"] - trace["move_start_ms"],
+        "settle": trace["settle_ms"],
+        "frame swap": trace["frame_swap_ms"],
+        "exposure": trace["exposure_measured_s"] * 1000,
+        "exposure error": (trace["exposure_measured_s"] - trace["exposure_requested_s"]) * 1000,
+    }
+    header = "mean".rjust(10) + "".join(f"p{p}".rjust(10) for p in PERCENTILES) + "max".rjust(10)
+    lines.append(f"    {'ms':<15}{header}")
+    for step, values in steps.items():
+        values = statistics(values)
+        if values is not None:
+            lines.append(f"    {step:<15}" + "".join(f"{value:10.1f}" for value in values))
+    return '\n'.join(lines)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Summarize the tile traces of stitching and printing jobs.")
+    parser.add_argument('traces', nargs='+', help="tile_trace.csv files or job folders containing one")
+    arguments = parser.parse_args(arguments)
+
+    for path in arguments.traces:
+        if os.path.isdir(path):
+            path = os.path.join(path, "tile_trace.csv")
+        print(summarize(path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,556 @@
+import argparse
+import contextlib
+import csv
+import functools
+import heapq
+import io
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+import numpy as np
+from PIL import Image
+from device_simulator import Bench, VirtualTime, patch_serial
+from device_simulator.bench import DEVICE_TYPES
+
+"""
+End-to-end benchmark of the three lab jobs, replayed headless against the simulated devices (device_simulator).
+
+    python benchmark_jobs.py                       # all jobs, compared with benchmark_baseline.json
+    python benchmark_jobs.py stitch --update-baseline
+
+Jobs:
+    stitch       90 x 90 absolute stitch of Phill/chirped_printer.py: SLMManager.stitching_logic with the frame cache,
+                 the 1.25 s settle and a shutter exposure per tile
+    chirp        5 column chirped print of Phill/chirped_printer.py: SLMManager.printing_logic with the columns
+                 rendered by ChirpColumnSource
+    phase_plate  2.5 mm sine phase plate of Mika/sin_phase_plate: MotionControlThread.print_phase_plate, generating
+                 the SLM images and printing ring after ring
+
+With --latency-profile the devices take the measured firmware time per command instead of the simulator's, the
+baseline is only compared with runs of the same job size and latency profile.
+
+The jobs run the unchanged job code on a virtual clock (device_simulator/virtual_time.py), so the hours of stage
+moves and exposures take minutes, while the computing in between keeps its real duration. The reported times are
+what a wall clock on the bench would show. The Tk windows are replaced by a headless SLM that decodes and converts
+every frame like the real one, the Tk main loop by a small event loop running the after() callbacks.
+
+The wall time of every job is split into phases by timing the driver methods in PHASES. A method's time counts
+for its phase minus the time of timed methods it calls (a shutter exposure is "exposure" while the commands it sends
+are "serial"), what is left is "other". Phases that got slower than the baseline by more than the tolerance are
+reported as regressions, and the exit code is 1.
+"""
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# The Phill modules come from pip install -e . (pyproject.toml), the phase plate scripts in Mika are not installed
+sys.path[:0] = [os.path.join(ROOT, 'Mika', 'sin_phase_plate'), os.path.join(ROOT, 'Mika', 'subdivision')]
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmark_baseline.json')
+
+# A phase regresses when it is slower than the baseline by this fraction and by more than MIN_REGRESSION seconds
+TOLERANCE = 0.1
+MIN_REGRESSION = 2.0
+
+# Ports the Phill drivers open themselves
+STITCH_SHUTTER_PORT = 'COM6'
+MOTOR_PORT = 'COM7'
+
+STITCH_SIZE = 90  # tiles per side
+STITCH_UNIQUE_FRAMES = 16  # frames of the stitch, the tiles reference them by id
+CHIRP_COLUMNS = 5
+CHIRP_ROWS = 10
+CHIRP_PARAMETERS = {'profile': 'linear', 'xmax_i': 20, 'xmax_f': 80, 'ymin': 0, 'ymax': 128}
+PHASE_PLATE_RADIUS = 2.5  # mm
+PHASE_PLATE_FOCAL_LENGTH = 100  # mm
+
+# Real seconds without any event before a job counts as hung
+STALL_TIMEOUT = 60
+
+# (module, class, method) timed as each phase
+PHASES = {
+    'motion': [
+        ('SerialMotorControl_Active', 'MotorController', 'wait_for_motion_completion'),
+        ('SerialMotorControl_Active', 'MotorController', 'wait_until_home_referenced'),
+        ('esp_controller', 'ESPController', 'wait_for_movement'),
+    ],
+    'serial': [
+        ('SerialMotorControl_Active', 'MotorController', 'set_command'),
+        ('SerialMotorControl_Active', 'MotorController', 'get_command'),
+        ('SerialMotorControl_Active', 'MotorController', 'copy_command'),
+        ('SerialMotorControl_Active', 'MotorController', 'reset_command'),
+        ('SerialMotorControl_Active', 'MotorController', 'trajectory_generator_command'),
+        ('chirped_printer', 'Shutter', 'write_command'),
+        ('esp_controller', 'ESPController', 'send_command_no_error_check'),
+        ('shutter_controller', 'ShutterController', 'send_command'),
+        ('laser_controller', 'LaserController', 'send_command'),
+    ],
+    'settle': [
+        ('chirped_printer', 'SLMManager', 'after_movement_stitching'),
+    ],
+    'exposure': [
+        ('chirped_printer', 'Shutter', 'toggle_pause'),
+        ('sine_phase_plate_backend', 'MotionControlThread', 'wait'),
+    ],
+    'frames': [
+        ('chirped_printer', 'SLMWindow', '_update_image'),
+        ('chirped_printer', 'SLMWindow', '_update_frame'),
+        ('chirped_printer', 'SLMWindow', '_flush_image'),
+        ('benchmark_jobs', 'HeadlessDisplay', 'show_image'),
+    ],
+    'generation': [
+        ('chirp_generator', 'ChirpColumnSource', '__init__'),
+        ('chirp_generator', 'ChirpColumnSource', 'render'),
+        ('sine_phase_plate_backend', 'SinePhasePlateGeneration', 'generate_images'),
+    ],
+}
+
+
+class PhaseTimer:
+    def __init__(self, clock=time.perf_counter):
+        """
+        Parameters:
+        clock (callable): Clock of the calling thread, VirtualTime.thread_time so phases on one thread do not count
+        what other threads slept meanwhile.
+        """
+        self.clock = clock
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.local = threading.local()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Count the time of the block for a phase, minus the time of phases started inside it on the same thread.
+        """
+        stack = self.local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        start = self.clock()
+        try:
+            yield
+        finally:
+            elapsed = self.clock() - start
+            inner = stack.pop()
+            self.totals[name] += elapsed - inner
+            self.calls[name] += 1
+            if stack:
+                stack[-1] += elapsed
+
+    def wrap(self, owner, method, name):
+        """
+        Time every call of owner.method as phase name, until the returned function restores it.
+        """
+        original = owner.__dict__[method]
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return original(*args, **kwargs)
+
+        setattr(owner, method, timed)
+        return lambda: setattr(owner, method, original)
+
+
+class EventLoop:
+    def __init__(self):
+        """
+        Stand-in for the Tk main loop: callbacks scheduled with after() from any thread run in order of their due
+        time on the thread in run().
+        """
+        self.incoming = queue.Queue()
+        self.pending = []  # heap of (due, sequence, function, args)
+        self.sequence = 0
+        self.running = False
+
+    def after(self, ms, function, *args):
+        self.incoming.put((time.perf_counter() + ms / 1000, function, args))
+
+    def fail(self, error):
+        # Exceptions of other threads end run() with that exception
+        self.incoming.put((0.0, None, (error,)))
+
+    def quit(self):
+        self.running = False
+
+    def run(self):
+        self.running = True
+        previous_hook = threading.excepthook
+        threading.excepthook = lambda hook_args: self.fail(hook_args.exc_value)
+        try:
+            while self.running:
+                self.receive(block=not self.pending)
+                due, _, function, args = heapq.heappop(self.pending)
+                if function is None:
+                    raise RuntimeError("Job failed in another thread") from args[0]
+                time.sleep(max(0.0, due - time.perf_counter()))
+                function(*args)
+        finally:
+            threading.excepthook = previous_hook
+
+    def receive(self, block):
+        try:
+            while True:
+                due, function, args = self.incoming.get(block=block, timeout=STALL_TIMEOUT if block else None)
+                self.sequence += 1
+                heapq.heappush(self.pending, (due, self.sequence, function, args))
+                block = False
+        except queue.Empty:
+            if block:
+                raise RuntimeError(f"Job stalled, nothing happened for {STALL_TIMEOUT} s")
+
+
+class FramePhoto:
+    """
+    Headless PhotoImage: pasting converts the frame to raw bytes like Tk does.
+    """
+    def __init__(self, mode, size):
+        self.mode = mode
+        self.size = size
+        self.data = None
+
+    def paste(self, image):
+        self.data = image.convert(self.mode).tobytes()
+
+
+class FrameLabel:
+    image = None
+
+    def configure(self, **options):
+        if 'image' in options:
+            self.image = options['image']
+
+    def update_idletasks(self):
+        pass
+
+
+def headless_slm_window(event_loop):
+    """
+    SLMWindow of chirped_printer.py without Tk: same display, frame cache and surface code, frames go into a
+    FramePhoto and after() goes to the event loop.
+    """
+    import chirped_printer
+
+    class HeadlessSurface(chirped_printer.SLMSurface):
+        def allocate(self, mode, size):
+            self.photo = FramePhoto(mode, size)
+            self.mode = mode
+            self.size = size
+            self.label.configure(image=self.photo)
+            self.label.image = self.photo
+            self.reallocations += 1
+
+    window = chirped_printer.SLMWindow.__new__(chirped_printer.SLMWindow)
+    window.image_window = event_loop
+    window.window_slm_label = FrameLabel()
+    window.surface = HeadlessSurface(window.window_slm_label)
+    window.pending_image = None
+    window.pending_scheduled = None
+    window.last_flush = 0
+    window.frame_cache = chirped_printer.FrameCache()
+    window.current_frame_id = None
+    return window
+
+
+class HeadlessDisplay:
+    """
+    ImageDisplay of sine_phase_plate_UI.py without Tk, shows every image right away.
+    """
+    def __init__(self):
+        self.photo = None
+        self.latencies = []
+
+    def show_image(self, image_object, scheduled=None):
+        if self.photo is None or (image_object.mode, image_object.size) != (self.photo.mode, self.photo.size):
+            self.photo = FramePhoto(image_object.mode, image_object.size)
+        self.photo.paste(image_object)
+        if scheduled is not None:
+            self.latencies.append(time.perf_counter() - scheduled)
+
+    def thread_safe_show_image(self, image_object):
+        self.show_image(image_object, time.perf_counter())
+
+    def latency_report(self):
+        if not self.latencies:
+            return "no images shown"
+        return f"{len(self.latencies)} images, mean latency {np.mean(self.latencies) * 1000:.1f} ms"
+
+    def save_trace(self):
+        pass
+
+
+def write_stitch_job(folder, size):
+    """
+    Job folder like the subdivision scripts write it: dataset.csv with added RGB, X, Z and frame id for every tile,
+    added_RGB_values.csv and one pattern_{id}.png per unique frame.
+    """
+    from SerialMotorControl_Active import MotorController
+    from tile_coordinates import coordinate_counts, tile_coordinates
+    positions_x, positions_z = coordinate_counts(*tile_coordinates(size, size, MotorController.SLM_STITCHING_PIXEL))
+    tiles = len(positions_x)
+    # Color sweep over the stitch, tiles of about the same color share a frame
+    added_rgb = np.round(np.linspace(0, 765, tiles) * (0.5 + 0.5 * np.sin(np.arange(tiles) / 7)) ** 2)
+    frame_ids = np.minimum((added_rgb / 765 * STITCH_UNIQUE_FRAMES).astype(int), STITCH_UNIQUE_FRAMES - 1) + 1
+
+    with open(os.path.join(folder, "dataset.csv"), 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["addedRGB", "X", "Z", "frame"])
+        for value, x, z, frame_id in zip(added_rgb, positions_x, positions_z, frame_ids):
+            writer.writerow([value, x, z, frame_id])
+    with open(os.path.join(folder, "added_RGB_values.csv"), 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["addedRGB"])
+        writer.writerows([value] for value in added_rgb)
+
+    x = np.arange(1920)
+    for frame_id in range(1, STITCH_UNIQUE_FRAMES + 1):
+        row = (x % (4 + frame_id) * (255 // (4 + frame_id))).astype(np.uint8)
+        Image.fromarray(np.tile(row, (1152, 1))).save(os.path.join(folder, f"pattern_{frame_id}.png"))
+
+
+def run_stitch(bench, folder, size=STITCH_SIZE):
+    """
+    Absolute stitch the way the Read Stitch and Stitch Absolute buttons run it.
+    """
+    import chirped_printer
+    from SerialMotorControl_Active import MotorController
+    write_stitch_job(folder, size)
+
+    motor_controller = MotorController(MOTOR_PORT)
+    motor_controller.initialize_everything()
+    event_loop = EventLoop()
+    manager = chirped_printer.SLMManager(motor_controller)
+    manager.slm = headless_slm_window(event_loop)
+
+    # open_images without the folder dialog and the settings popup
+    manager.filepath = folder
+    manager.configure_paths(initial_filepath=folder)
+    manager.load_csv_data(path_to_csv=manager.dataset_filepath)
+    manager.imagesSLM = [os.path.join(folder, f"pattern_{frame_id}.png") for frame_id in manager.frame_ids]
+    manager.show_image(0)
+
+    event_loop.after(50, manager.stitching_logic, 'absolute', event_loop.quit, event_loop.quit, event_loop.quit,
+                     event_loop.quit)
+    event_loop.run()
+    return len(manager.imagesSLM)
+
+
+def run_chirp(bench, folder, columns=CHIRP_COLUMNS):
+    """
+    Chirped print the way the Prepare Print and Print buttons run it, with chirp_parameters set.
+    """
+    import chirped_printer
+    from SerialMotorControl_Active import MotorController
+
+    motor_controller = MotorController(MOTOR_PORT)
+    motor_controller.initialize_everything()
+    event_loop = EventLoop()
+    manager = chirped_printer.SLMManager(motor_controller)
+    manager.slm = headless_slm_window(event_loop)
+
+    # prepare_printing without the folder dialog, settings popup and color picker
+    manager.printing_filepath = folder
+    manager.printing_lines = columns
+    manager.printing_rows = CHIRP_ROWS
+    manager.start_pos_X = None
+    manager.start_pos_Z = None
+
+    previous_parameters = chirped_printer.chirp_parameters
+    chirped_printer.chirp_parameters = CHIRP_PARAMETERS
+    try:
+        event_loop.after(50, manager.printing_logic, event_loop.quit, event_loop.quit, event_loop.quit,
+                         event_loop.quit)
+        event_loop.run()
+    finally:
+        chirped_printer.chirp_parameters = previous_parameters
+    return columns
+
+
+def run_phase_plate(bench, folder, radius=PHASE_PLATE_RADIUS):
+    """
+    Phase plate the way the Print button of sine_phase_plate_UI.py runs it, on the calling thread.
+    """
+    import sine_phase_plate_backend as backend
+
+    # Settings reads and writes settings.json in the working directory
+    working_directory = os.getcwd()
+    os.chdir(folder)
+    try:
+        settings = backend.Settings()
+    finally:
+        os.chdir(working_directory)
+    settings.radius = radius
+    settings.focal_length = PHASE_PLATE_FOCAL_LENGTH
+    settings.port_laser = bench.laser.name
+    settings.port_motion_controller = bench.esp.name
+    settings.port_shutter = bench.shutter.name
+
+    monitor = backend.MotionControlThreadMonitor()
+    thread = backend.MotionControlThread(settings, queue.Queue(), queue.Queue(), monitor, HeadlessDisplay())
+    thread.print_phase_plate()
+    thread.instruments.close_connection()
+    monitor.close()
+    return monitor.telemetry.snapshot.steps
+
+
+JOBS = {
+    'stitch': (run_stitch, "Absolute stitch", "tiles"),
+    'chirp': (run_chirp, "Chirped print", "columns"),
+    'phase_plate': (run_phase_plate, "Sine phase plate", "rings"),
+}
+
+
+def time_phases(timer):
+    """
+    Put every method of PHASES under the timer. Returns the function restoring them.
+    """
+    restores = []
+    for name, methods in PHASES.items():
+        for module_name, class_name, method in methods:
+            module = sys.modules[__name__] if module_name == 'benchmark_jobs' else __import__(module_name)
+            restores.append(timer.wrap(getattr(module, class_name), method, name))
+
+    def restore():
+        for undo in reversed(restores):
+            undo()
+
+    return restore
+
+
+def run_job(name, latency_profile=None, **size):
+    """
+    Replay one job on a fresh bench and virtual clock, size goes to the job function (e.g. radius=0.5).
+
+    Parameters:
+    name (str): Job in JOBS.
+    latency_profile (dict): Firmware time per command in seconds by device name, as measured on the bench, e.g.
+    {"copley": 0.004}. The simulator defaults are used for devices not in it.
+
+    Returns:
+    dict: Wall time of the job on the bench, its phases, the real time the replay took and the job size.
+    """
+    job, _, unit = JOBS[name]
+    clock = VirtualTime()
+    timer = PhaseTimer(clock.thread_time)
+    restore = time_phases(timer)
+    real_start = time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory() as folder, clock:
+            bench = Bench(speedup=1.0)
+            for device_name, seconds in (latency_profile or {}).items():
+                bench.devices[device_name].processing_time = seconds
+            ports = dict(bench.devices, **{STITCH_SHUTTER_PORT: bench.shutter, MOTOR_PORT: bench.copley})
+            start = time.perf_counter()
+            # The drivers print every command, keep that out of the report
+            with patch_serial(ports, bench.clock), contextlib.redirect_stdout(io.StringIO()):
+                count = job(bench, folder, **size)
+            wall = time.perf_counter() - start
+            exposure = bench.shutter.exposure_time(bench.now())
+    finally:
+        restore()
+    phases = dict(timer.totals)
+    phases['other'] = max(0.0, wall - sum(phases.values()))
+    return {
+        'wall': wall,
+        'real': time.perf_counter() - real_start,
+        'size': f"{count} {unit}",
+        'latency_profile': latency_profile or {},
+        'shutter_open': exposure,
+        'phases': phases,
+    }
+
+
+def comparable(result, baseline):
+    """
+    Whether a baseline is for the same job size and latency profile as the result.
+    """
+    return (baseline is not None and baseline.get('size') == result['size']
+            and baseline.get('latency_profile', {}) == result['latency_profile'])
+
+
+def compare(result, baseline, tolerance=TOLERANCE):
+    """
+    Phases slower than in the baseline by more than tolerance and MIN_REGRESSION seconds.
+
+    Returns:
+    list: (phase, baseline seconds, current seconds) of the regressed phases, the whole job as phase "wall".
+    """
+    if not comparable(result, baseline):
+        return []
+    current = dict(result['phases'], wall=result['wall'])
+    before = dict(baseline['phases'], wall=baseline['wall'])
+    return [(phase, before.get(phase, 0.0), seconds) for phase, seconds in current.items()
+            if seconds - before.get(phase, 0.0) > max(tolerance * before.get(phase, 0.0), MIN_REGRESSION)]
+
+
+def format_duration(seconds):
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{int(hours)}:{int(minutes):02d}:{seconds:06.3f}"
+
+
+def report(name, result, baseline=None):
+    _, title, _ = JOBS[name]
+    lines = [f"{title} ({result['size']}): {format_duration(result['wall'])} on the bench, "
+             f"replayed in {result['real']:.1f} s, shutter open {format_duration(result['shutter_open'])}"]
+    for phase, seconds in sorted(result['phases'].items(), key=lambda item: -item[1]):
+        line = f"    {phase:<11}{format_duration(seconds):>15}{100 * seconds / result['wall']:7.1f} %"
+        if comparable(result, baseline):
+            line += f"   {seconds - baseline['phases'].get(phase, 0.0):+10.3f} s vs baseline"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Replay the lab jobs on the simulated devices and time them.")
+    parser.add_argument('jobs', nargs='*', help=f"jobs to run out of {', '.join(JOBS)}, all by default")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="json file with the times to compare with")
+    parser.add_argument('--update-baseline', action='store_true', help="store the times of this run as baseline")
+    parser.add_argument('--latency-profile', help="json file with the firmware time per command of every device in "
+                                                     "seconds, e.g. {\"copley\": 0.004, \"sc10\": 0.002}")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="fraction a phase may get slower before it counts as regression")
+    arguments = parser.parse_args(arguments)
+    unknown = [name for name in arguments.jobs if name not in JOBS]
+    if unknown:
+        parser.error(f"unknown job {', '.join(unknown)}, choose from {', '.join(JOBS)}")
+
+    latency_profile = None
+    if arguments.latency_profile:
+        with open(arguments.latency_profile) as profile_file:
+            latency_profile = json.load(profile_file)
+        unknown = [device for device in latency_profile if device not in DEVICE_TYPES]
+        if unknown:
+            parser.error(f"unknown device {', '.join(unknown)} in the latency profile")
+
+    baselines = load_baseline(arguments.baseline)
+    regressions = []
+    for name in arguments.jobs or list(JOBS):
+        result = run_job(name, latency_profile)
+        print(report(name, result, baselines.get(name)))
+        for phase, before, after in compare(result, baselines.get(name), arguments.tolerance):
+            regressions.append(f"{name} {phase}: {format_duration(before)} -> {format_duration(after)}")
+        if arguments.update_baseline:
+            baselines[name] = result
+
+    if arguments.update_baseline:
+        with open(arguments.baseline, 'w') as baseline_file:
+            json.dump(baselines, baseline_file, indent=4)
+        print(f"Baseline saved at {arguments.baseline}")
+    if regressions:
+        print("Regressions:\n    " + "\n    ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
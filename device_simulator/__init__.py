@@ -0,0 +1,30 @@
+from .bench import Bench, open_device, register_device
+from .copley import CopleyDrives
+from .esp302 import ESP302
+from .faults import Fault, FaultPlan
+from .kinematics import Axis, MotionProfile
+from .laser import GenesisLaser
+from .link import SerialLink, SimClock, SimulatedDevice
+from .ports import PtyBridge, SimulatedSerial, patch_serial, serial_class
+from .sc10 import SC10
+from .virtual_time import VirtualTime
+
+'''
+Hardware-in-the-loop simulator for the lab devices, so print, stitch and phase plate jobs can run headless.
+
+Each device emulates the ASCII protocol its driver speaks, with the byte timing of the serial line, closed-form
+motion of the stages and injectable faults (see faults.py). The devices are reached either through pseudo terminals
+(Bench.start(), the drivers stay unchanged) or through pyserial's serial_for_url with sim://<device> URLs after
+register_url_handler(). With Bench(speedup=10) the devices move and talk ten times faster than real time, the
+drivers' own fixed sleeps still take their real time, unless the job runs inside VirtualTime() (see
+virtual_time.py), which replays hours of printing in minutes.
+'''
+
+
+def register_url_handler():
+    """
+    Make serial.serial_for_url open sim://<device> URLs.
+    """
+    import serial
+    if __name__ not in serial.protocol_handler_packages:
+        serial.protocol_handler_packages.append(__name__)
@@ -0,0 +1,127 @@
+import argparse
+import sys
+import time
+from .copley import CopleyDrives
+from .esp302 import ESP302
+from .faults import FaultPlan
+from .laser import GenesisLaser
+from .link import SimClock
+from .ports import PtyBridge, SimulatedSerial
+from .sc10 import SC10
+
+'''
+The simulated lab: ESP302, SC10, laser and Copley drives on one shared clock.
+
+    bench = Bench(speedup=10).start()
+    instruments = InstrumentController(bench.ports['laser'], bench.ports['esp302'], bench.ports['sc10'])
+    ...
+    bench.stop()
+
+or from a shell, to point the UIs at the printed ports:
+
+    python -m device_simulator --speedup 10
+'''
+
+DEVICE_TYPES = {
+    'esp302': ESP302,
+    'sc10': SC10,
+    'laser': GenesisLaser,
+    'copley': CopleyDrives,
+}
+
+# Devices reachable as sim://<name> through serial_for_url, see protocol_sim.py
+registry = {}
+
+
+def register_device(name, device, clock):
+    registry[name] = (device, clock)
+
+
+def open_device(name, speedup=1.0, **settings):
+    """
+    Port object for sim://<name>: the registered device of that name or a new device of that type.
+    """
+    if name in registry:
+        device, clock = registry[name]
+    elif name in DEVICE_TYPES:
+        device, clock = DEVICE_TYPES[name](), SimClock(speedup)
+        register_device(name, device, clock)
+    else:
+        raise ValueError(f"No simulated device '{name}', choose from {', '.join(sorted(DEVICE_TYPES))}")
+    return SimulatedSerial(device, clock, **settings)
+
+
+class Bench:
+    def __init__(self, speedup=1.0, seed=0):
+        """
+        Parameters:
+        speedup (float): Simulated seconds per real second.
+        seed (int): Seed of the random faults.
+        """
+        self.clock = SimClock(speedup)
+        self.esp = ESP302(FaultPlan(seed))
+        self.shutter = SC10(FaultPlan(seed + 1))
+        self.laser = GenesisLaser(FaultPlan(seed + 2))
+        self.copley = CopleyDrives(FaultPlan(seed + 3))
+        self.devices = {device.name: device for device in (self.esp, self.shutter, self.laser, self.copley)}
+        self.bridges = {}
+        self.ports = {}
+        for name, device in self.devices.items():
+            register_device(name, device, self.clock)
+
+    def start(self):
+        """
+        Serve every device on a pseudo terminal, the port names are in self.ports.
+        """
+        for name, device in self.devices.items():
+            self.bridges[name] = PtyBridge(device, self.clock).start()
+            self.ports[name] = self.bridges[name].port
+        return self
+
+    def stop(self):
+        for bridge in self.bridges.values():
+            bridge.stop()
+        self.bridges.clear()
+        self.ports.clear()
+
+    def serial(self, name, **settings):
+        """
+        In-memory port to a device, for code that takes a port object instead of a port name.
+        """
+        return SimulatedSerial(self.devices[name], self.clock, **settings)
+
+    def now(self):
+        return self.clock.now()
+
+    def report(self):
+        """
+        Commands handled, faults fired and exposure of the job so far.
+        """
+        now = self.now()
+        lines = [f"Simulated time: {now:.2f} s (x{self.clock.speedup:g})"]
+        for name, device in self.devices.items():
+            lines.append(f"{name}: {len(device.log)} commands, {len(device.faults.fired)} faults fired")
+        lines.append(f"Shutter open: {self.shutter.exposure_time(now):.3f} s in {len(self.shutter.exposures)} exposures")
+        return '\n'.join(lines)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Serve simulated lab devices on pseudo terminals.")
+    parser.add_argument('--speedup', type=float, default=1.0, help="simulated seconds per real second")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random faults")
+    arguments = parser.parse_args(arguments)
+
+    if sys.platform.startswith('win'):
+        parser.error("Pseudo terminals are not available on Windows, use serial_for_url('sim://<device>')")
+
+    bench = Bench(arguments.speedup, arguments.seed).start()
+    for name, port in bench.ports.items():
+        print(f"{name:<8}{port}")
+    print("Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(bench.report())
+    finally:
+        bench.stop()
@@ -0,0 +1,284 @@
+from .kinematics import Axis, MotionProfile
+from .link import SimulatedDevice
+
+'''
+Copley drives on one serial line, speaking the ASCII protocol of MotorController in
+Phill/SerialMotorControl_Active.py.
+
+Commands are "[node] s r0xNN value", "[node] g r0xNN", "[node] c ...", "[node] t 0|1|2" and "[node] r", each
+terminated by a carriage return. Set, copy and trajectory commands are answered with "ok", reads with "v value",
+bad commands with "e code". The reset "r" is not answered and sets the line back to 9600 baud, a "s r0x90 rate"
+switches the line to the new rate after its "ok". Without a node number the command goes to node 0, the drive on
+the serial port.
+
+Units follow the drive: positions in counts, r0xcb in 0.1 counts/s, r0xcc/r0xcd/r0xc5/r0xcf in 10 counts/s^2.
+'''
+
+BAUD_REGISTER = 0x90
+DESIRED_STATE_REGISTER = 0xab
+MODE_REGISTER = 0x24
+PROFILE_REGISTER = 0xc8
+POSITION_REGISTER = 0xca
+VELOCITY_REGISTER = 0xcb
+ACCELERATION_REGISTER = 0xcc
+DECELERATION_REGISTER = 0xcd
+ABORT_DECELERATION_REGISTER = 0xcf
+HOMING_METHOD_REGISTER = 0xc2
+HOMING_FAST_VELOCITY_REGISTER = 0xc3
+HOMING_ACCEL_DECEL_REGISTER = 0xc5
+HOMING_OFFSET_REGISTER = 0xc6
+TRAJECTORY_REGISTER = 0xc9
+EVENT_REGISTER = 0xa0
+ACTUAL_POSITION_REGISTER = 0x32
+ACTUAL_VELOCITY_REGISTER = 0x18
+
+# Trajectory status bits (r0xc9)
+HOMING_ERROR_BIT = 11
+REFERENCED_BIT = 12
+HOMING_BIT = 13
+ABORTED_BIT = 14
+IN_MOTION_BIT = 15
+
+# Event status bits (r0xa0)
+POSITIVE_LIMIT_BIT = 9
+NEGATIVE_LIMIT_BIT = 10
+SOFTWARE_DISABLED_BIT = 12
+TRACKING_ERROR_BIT = 18
+TRAJECTORY_RUNNING_BIT = 27
+
+# Copley error codes
+UNKNOWN_COMMAND = 3
+NOT_ENOUGH_DATA = 5
+UNKNOWN_PARAMETER = 9
+VALUE_OUT_OF_RANGE = 10
+
+# Homing method using the current position as home
+HOME_HERE = 512
+# Travel of the stages in counts, beyond it the limit switches are active
+TRAVEL = 300000
+
+DEFAULT_REGISTERS = {
+    DESIRED_STATE_REGISTER: 0,
+    # Servo position mode, stored in the drives' flash, so homing works before MotorController.set_mode
+    MODE_REGISTER: 21,
+    PROFILE_REGISTER: 0,
+    POSITION_REGISTER: 0,
+    VELOCITY_REGISTER: 0,
+    ACCELERATION_REGISTER: 0,
+    DECELERATION_REGISTER: 0,
+    0xce: 0,
+    ABORT_DECELERATION_REGISTER: 0,
+    HOMING_METHOD_REGISTER: HOME_HERE,
+    HOMING_FAST_VELOCITY_REGISTER: 20000,
+    0xc4: 10000,
+    HOMING_ACCEL_DECEL_REGISTER: 100000,
+    HOMING_OFFSET_REGISTER: 0,
+}
+
+
+class CopleyNode:
+    def __init__(self, position=0):
+        self.registers = dict(DEFAULT_REGISTERS)
+        self.axis = Axis(position)
+        self.zero = 0.0  # machine position of count 0
+        self.referenced = False
+        self.homing_until = None
+        self.homing_error = False
+        self.aborted = False
+        self.tracking_error = False
+
+    def refresh(self, t):
+        """
+        Finish a homing run that has ended by time t.
+        """
+        if self.homing_until is not None and t >= self.homing_until:
+            # The home switch sits at machine position 0, after homing it reads minus the home offset
+            self.zero = self.registers[HOMING_OFFSET_REGISTER]
+            self.referenced = True
+            self.homing_until = None
+
+    def position(self, t):
+        return self.axis.position(t) - self.zero
+
+    def enabled(self):
+        return self.registers[DESIRED_STATE_REGISTER] != 0 and self.registers[MODE_REGISTER] != 0
+
+    def trajectory_status(self, t):
+        bits = {
+            HOMING_ERROR_BIT: self.homing_error,
+            REFERENCED_BIT: self.referenced,
+            HOMING_BIT: self.homing_until is not None,
+            ABORTED_BIT: self.aborted,
+            IN_MOTION_BIT: self.axis.moving(t),
+        }
+        return sum(1 << bit for bit, active in bits.items() if active)
+
+    def event_status(self, t):
+        position = self.axis.position(t)
+        bits = {
+            POSITIVE_LIMIT_BIT: position > TRAVEL,
+            NEGATIVE_LIMIT_BIT: position < -TRAVEL,
+            SOFTWARE_DISABLED_BIT: self.registers[DESIRED_STATE_REGISTER] == 0,
+            TRACKING_ERROR_BIT: self.tracking_error,
+            TRAJECTORY_RUNNING_BIT: self.axis.moving(t),
+        }
+        return sum(1 << bit for bit, active in bits.items() if active)
+
+
+class CopleyDrives(SimulatedDevice):
+    name = 'copley'
+    default_baudrate = 9600
+
+    def __init__(self, faults=None, nodes=2):
+        """
+        Parameters:
+        faults (FaultPlan): Faults to inject, see faults.py.
+        nodes (int): Number of drives, MotorController uses node 0 for X and node 1 for Z.
+        """
+        super().__init__(faults)
+        self.nodes = [CopleyNode() for _ in range(nodes)]
+
+    def execute(self, command, t):
+        tokens = command.split()
+        if not tokens:
+            return None, t
+        node_number = 0
+        if tokens[0].isdigit():
+            node_number = int(tokens.pop(0))
+        if not tokens or node_number >= len(self.nodes):
+            return f'e {UNKNOWN_COMMAND}\r', t
+
+        node = self.nodes[node_number]
+        node.refresh(t)
+        code = tokens[0].lower()
+
+        if code == 'r':
+            self.reset(t)
+            return None, t
+
+        fault = self.faults.take('error', command, t)
+        if fault and code == 't' and tokens[1:] == ['2']:
+            node.homing_error = True
+            return 'ok\r', t
+        if fault:
+            return f'e {fault.code or UNKNOWN_COMMAND}\r', t
+
+        if code == 's':
+            return self.set_register(node, tokens[1:], t), t
+        if code == 'g':
+            return self.get_register(node, tokens[1:], t), t
+        if code == 'c':
+            return 'ok\r', t
+        if code == 't':
+            return self.trajectory(node, command, tokens[1:], t), t
+        return f'e {UNKNOWN_COMMAND}\r', t
+
+    def reset(self, t):
+        self.baudrate = self.default_baudrate
+        nodes = []
+        for node in self.nodes:
+            # The stage stops where it is and loses its settings, the encoder count restarts at 0
+            fresh = CopleyNode(node.axis.position(t))
+            fresh.zero = node.axis.position(t)
+            nodes.append(fresh)
+        self.nodes = nodes
+
+    def register_number(self, token):
+        token = token.lower()
+        if not token.startswith('r'):
+            raise ValueError(token)
+        return int(token[1:], 0)
+
+    def set_register(self, node, arguments, t):
+        if len(arguments) < 2:
+            return f'e {NOT_ENOUGH_DATA}\r'
+        try:
+            register = self.register_number(arguments[0])
+            values = [int(value) for value in arguments[1:]]
+        except ValueError:
+            return f'e {UNKNOWN_PARAMETER}\r'
+
+        if register == BAUD_REGISTER:
+            if values[0] not in (9600, 19200, 38400, 57600, 115200):
+                return f'e {VALUE_OUT_OF_RANGE}\r'
+            # Answered at the old rate, the drive switches right after
+            self.baudrate = values[0]
+        elif register == DESIRED_STATE_REGISTER and values[0] == 0:
+            node.axis.halt(t)
+        node.registers[register] = values[0] if len(values) == 1 else values
+        return 'ok\r'
+
+    def get_register(self, node, arguments, t):
+        if not arguments:
+            return f'e {NOT_ENOUGH_DATA}\r'
+        try:
+            register = self.register_number(arguments[0])
+        except ValueError:
+            return f'e {UNKNOWN_PARAMETER}\r'
+
+        if register == ACTUAL_POSITION_REGISTER:
+            value = int(round(node.position(t)))
+        elif register == ACTUAL_VELOCITY_REGISTER:
+            value = int(round(node.axis.velocity(t) * 10))
+        elif register == TRAJECTORY_REGISTER:
+            value = node.trajectory_status(t)
+        elif register == EVENT_REGISTER:
+            value = node.event_status(t)
+        elif register == BAUD_REGISTER:
+            value = self.baudrate
+        elif register in node.registers:
+            value = node.registers[register]
+        else:
+            return f'e {UNKNOWN_PARAMETER}\r'
+        if isinstance(value, list):
+            value = ' '.join(str(item) for item in value)
+        return f'v {value}\r'
+
+    def trajectory(self, node, command, arguments, t):
+        if not arguments or arguments[0] not in ('0', '1', '2'):
+            return f'e {VALUE_OUT_OF_RANGE}\r'
+        registers = node.registers
+
+        if arguments[0] == '0':
+            x, v = node.axis.state(t)
+            deceleration = registers[ABORT_DECELERATION_REGISTER] * 10
+            node.axis.start(MotionProfile.stop(t, x, v, deceleration) if deceleration else MotionProfile.hold(t, x))
+            node.aborted = node.axis.moving(t) or v != 0
+            node.homing_until = None
+            return 'ok\r'
+
+        # A disabled drive acknowledges but does not move, r0xa0 tells why
+        if not node.enabled():
+            return 'ok\r'
+        node.aborted = False
+        node.tracking_error = False
+
+        if arguments[0] == '2':
+            node.homing_error = False
+            if registers[HOMING_METHOD_REGISTER] == HOME_HERE:
+                node.zero = node.axis.position(t) + registers[HOMING_OFFSET_REGISTER]
+                node.referenced = True
+                return 'ok\r'
+            profile = node.axis.move(t, 0, registers[HOMING_FAST_VELOCITY_REGISTER] / 10,
+                                     registers[HOMING_ACCEL_DECEL_REGISTER] * 10)
+            node.referenced = False
+            node.homing_until = profile.end
+            return 'ok\r'
+
+        target = registers[POSITION_REGISTER]
+        profile_type = registers[PROFILE_REGISTER]
+        if profile_type not in (0, 1, 256, 257):
+            # Velocity mode is not simulated
+            return f'e {VALUE_OUT_OF_RANGE}\r'
+        if profile_type & 256:
+            target += node.position(t)
+
+        # S-curve moves are run as trapezoids, their duration differs by the jerk-limited corners only
+        profile = node.axis.move(t, target + node.zero, registers[VELOCITY_REGISTER] / 10,
+                                 registers[ACCELERATION_REGISTER] * 10, registers[DECELERATION_REGISTER] * 10)
+        fault = self.faults.take('stall', command, t)
+        if fault and profile.end > t:
+            node.axis.halt(t + fault.fraction * (profile.end - t))
+            node.tracking_error = True
+            node.aborted = True
+        return 'ok\r'
@@ -0,0 +1,268 @@
+import re
+from .kinematics import Axis
+from .link import SimulatedDevice
+
+'''
+Newport ESP302 motion controller as ESPController in Mika/sin_phase_plate/esp_controller.py uses it.
+
+Commands are [axis]MNEMONIC[parameter] terminated by a carriage return, queries are answered with the value and
+"\\r\\r\\n", everything else is executed silently like on the controller, so a driver waiting for a reply to a move
+runs into its read timeout exactly as on the bench. Implemented: MO MF OR PA PR ST AB WS VA VU AC AG TS TP TV TE TB
+and the program mode EP QP EX XX. A program runs on its own timeline, its moves and WS waits are scheduled ahead
+in simulated time while TS/TP keep answering.
+
+Errors go into an error buffer: TE tells the code of the oldest error, TB removes it and tells
+"code, timestamp, message" or "0, 0, NO ERROR DETECTED". Axis errors are coded axis * 100 + error.
+'''
+
+GENERAL_ERRORS = {
+    6: 'COMMAND DOES NOT EXIST',
+    7: 'PARAMETER OUT OF RANGE',
+    9: 'AXIS NUMBER OUT OF RANGE',
+    37: 'AXIS NUMBER MISSING',
+    38: 'COMMAND PARAMETER MISSING',
+}
+AXIS_ERRORS = {
+    4: 'POSITIVE SOFTWARE LIMIT DETECTED',
+    5: 'NEGATIVE SOFTWARE LIMIT DETECTED',
+    8: 'FOLLOWING ERROR',
+    13: 'MOTOR NOT ENABLED',
+}
+REPLY_END = '\r\r\n'
+
+# Stages of the phase plate setup: two 25 mm linear stages and a rotation stage
+AXIS_LIMITS = [(0, 25), (0, 25), (0, 360)]
+MAX_SPEED = [5, 5, 20]  # units/s, told by VU
+DEFAULT_SPEED = [1, 1, 10]  # units/s
+DEFAULT_ACCELERATION = [20, 20, 80]  # units/s^2
+HOMING_SPEED = [2.5, 2.5, 10]  # units/s
+
+COMMAND_PATTERN = re.compile(r'(\d*)([A-Za-z]{2})(.*)')
+
+
+class ESP302(SimulatedDevice):
+    name = 'esp302'
+    default_baudrate = 19200
+
+    def __init__(self, faults=None, positions=(12.5, 12.5, 0)):
+        """
+        Parameters:
+        faults (FaultPlan): Faults to inject, see faults.py.
+        positions (tuple): Position of the three axes at power up, before homing.
+        """
+        super().__init__(faults)
+        self.axes = [Axis(position, minimum, maximum) for position, (minimum, maximum) in zip(positions, AXIS_LIMITS)]
+        self.speed = list(DEFAULT_SPEED)
+        self.acceleration = list(DEFAULT_ACCELERATION)
+        self.deceleration = list(DEFAULT_ACCELERATION)
+        self.motor_on = [False] * 3
+        self.errors = []  # (time, code), oldest first
+        self.programs = {}
+        self.recording = None  # program number between EP and QP
+        self.busy_until = 0.0  # an immediate WS holds back all following commands
+
+    def execute(self, command, t):
+        command = command.strip()
+        if not command:
+            return None, t
+        match = COMMAND_PATTERN.fullmatch(command)
+        if match is None:
+            self.add_error(t, 6)
+            return None, t
+
+        axis = int(match.group(1)) if match.group(1) else None
+        mnemonic = match.group(2).upper()
+        parameter = match.group(3).strip()
+
+        if self.recording is not None and mnemonic != 'QP':
+            self.programs[self.recording].append((command, axis, mnemonic, parameter))
+            return None, t
+
+        t = max(t, self.busy_until)
+        fault = self.faults.take('error', command, t)
+        if fault:
+            self.add_error(t, fault.code or 7)
+            return None, t
+        if mnemonic == 'WS':
+            self.busy_until = self.wait_for_stop(axis, parameter, t)
+            return None, t
+
+        reply = self.run(command, axis, mnemonic, parameter, t)
+        return (None if reply is None else f'{reply}{REPLY_END}'), t
+
+    def run(self, command, axis, mnemonic, parameter, t):
+        """
+        Execute one command at simulated time t and return its reply text, or None.
+        """
+        handler = getattr(self, f'command_{mnemonic}', None)
+        if handler is None:
+            self.add_error(t, 6)
+            return None
+        if axis is not None and not 1 <= axis <= len(self.axes):
+            self.add_error(t, 9)
+            return None
+        return handler(command, axis, parameter, t)
+
+    def add_error(self, t, code):
+        self.errors.append((t, code))
+
+    def error_message(self, code):
+        if code >= 100:
+            return f'AXIS-{code // 100} {AXIS_ERRORS.get(code % 100, "UNKNOWN ERROR")}'
+        return GENERAL_ERRORS.get(code, 'UNKNOWN ERROR')
+
+    def visible_errors(self, t):
+        # Errors of scheduled program steps only show up once their time has come
+        return [error for error in self.errors if error[0] <= t]
+
+    def selected_axes(self, axis):
+        return range(len(self.axes)) if axis is None else [axis - 1]
+
+    def wait_for_stop(self, axis, parameter, t):
+        delay = float(parameter) / 1000 if parameter else 0.0
+        return max(self.axes[index].idle_at(t) for index in self.selected_axes(axis)) + delay
+
+    def number(self, parameter, t):
+        try:
+            return float(parameter)
+        except ValueError:
+            self.add_error(t, 38 if not parameter else 7)
+            return None
+
+    def start_move(self, command, axis, target, t, speed=None):
+        index = axis - 1
+        stage = self.axes[index]
+        if not self.motor_on[index]:
+            self.add_error(t, axis * 100 + 13)
+            return
+        if not stage.within_limits(target):
+            self.add_error(t, axis * 100 + (4 if target > stage.maximum else 5))
+            return
+
+        profile = stage.move(t, target, speed or self.speed[index], self.acceleration[index],
+                             self.deceleration[index])
+        fault = self.faults.take('stall', command, t)
+        if fault and profile.end > t:
+            stall_time = t + fault.fraction * (profile.end - t)
+            stage.halt(stall_time)
+            self.add_error(stall_time, axis * 100 + 8)
+
+    # Motion
+
+    def command_MO(self, command, axis, parameter, t):
+        for index in self.selected_axes(axis):
+            self.motor_on[index] = True
+
+    def command_MF(self, command, axis, parameter, t):
+        for index in self.selected_axes(axis):
+            self.axes[index].halt(t)
+            self.motor_on[index] = False
+
+    def command_OR(self, command, axis, parameter, t):
+        for index in self.selected_axes(axis):
+            self.start_move(command, index + 1, self.axes[index].minimum, t, HOMING_SPEED[index])
+
+    def command_PA(self, command, axis, parameter, t):
+        if axis is None:
+            self.add_error(t, 37)
+            return
+        target = self.number(parameter, t)
+        if target is not None:
+            self.start_move(command, axis, target, t)
+
+    def command_PR(self, command, axis, parameter, t):
+        if axis is None:
+            self.add_error(t, 37)
+            return
+        distance = self.number(parameter, t)
+        if distance is not None:
+            self.start_move(command, axis, self.axes[axis - 1].position(t) + distance, t)
+
+    def command_ST(self, command, axis, parameter, t):
+        for index in self.selected_axes(axis):
+            self.axes[index].stop(t, self.deceleration[index])
+
+    def command_AB(self, command, axis, parameter, t):
+        for index in range(len(self.axes)):
+            self.axes[index].halt(t)
+            self.motor_on[index] = False
+
+    # Settings
+
+    def setting(self, values, maximum, axis, parameter, t):
+        if axis is None:
+            self.add_error(t, 37)
+            return None
+        if parameter == '?':
+            return f'{values[axis - 1]:g}'
+        value = self.number(parameter, t)
+        if value is None:
+            return None
+        if value <= 0 or (maximum is not None and value > maximum[axis - 1]):
+            self.add_error(t, 7)
+        else:
+            values[axis - 1] = value
+        return None
+
+    def command_VA(self, command, axis, parameter, t):
+        return self.setting(self.speed, MAX_SPEED, axis, parameter, t)
+
+    def command_VU(self, command, axis, parameter, t):
+        return self.setting(MAX_SPEED, None, axis, parameter, t)
+
+    def command_AC(self, command, axis, parameter, t):
+        return self.setting(self.acceleration, None, axis, parameter, t)
+
+    def command_AG(self, command, axis, parameter, t):
+        return self.setting(self.deceleration, None, axis, parameter, t)
+
+    # Status
+
+    def command_TS(self, command, axis, parameter, t):
+        status = 0x40
+        for index, stage in enumerate(self.axes):
+            if stage.moving(t):
+                status |= 1 << index
+        return chr(status)
+
+    def command_TP(self, command, axis, parameter, t):
+        return ', '.join(f'{self.axes[index].position(t):.5f}' for index in self.selected_axes(axis))
+
+    def command_TV(self, command, axis, parameter, t):
+        return ', '.join(f'{abs(self.axes[index].velocity(t)):.5f}' for index in self.selected_axes(axis))
+
+    def command_TE(self, command, axis, parameter, t):
+        errors = self.visible_errors(t)
+        return str(errors[0][1]) if errors else '0'
+
+    def command_TB(self, command, axis, parameter, t):
+        errors = self.visible_errors(t)
+        if not errors:
+            return '0, 0, NO ERROR DETECTED'
+        self.errors.remove(errors[0])
+        error_time, code = errors[0]
+        return f'{code}, {int(error_time * 1000)}, {self.error_message(code)}'
+
+    # Program mode
+
+    def command_EP(self, command, axis, parameter, t):
+        number = axis or 1
+        self.programs[number] = []
+        self.recording = number
+
+    def command_QP(self, command, axis, parameter, t):
+        self.recording = None
+
+    def command_XX(self, command, axis, parameter, t):
+        self.programs.pop(axis or 1, None)
+
+    def command_EX(self, command, axis, parameter, t):
+        program = self.programs.get(axis or 1)
+        if program is None:
+            self.add_error(t, 7)
+            return
+        for step_command, step_axis, mnemonic, step_parameter in program:
+            if mnemonic == 'WS':
+                t = self.wait_for_stop(step_axis, step_parameter, t)
+            else:
+                self.run(step_command, step_axis, mnemonic, step_parameter, t)
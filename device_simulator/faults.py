@@ -0,0 +1,87 @@
+import random
+
+'''
+Injectable faults for the simulated devices.
+
+A FaultPlan belongs to one device. Faults are armed with inject() and fire on the commands they match:
+
+    drop     no reply at all (count=None keeps the device silent, like a pulled cable)
+    garble   one byte of the reply is corrupted
+    delay    the reply is late by delay seconds
+    error    the device reports an error for the command (ESP error buffer, Copley "e" reply, SC10 command error,
+             laser null reply), the error code can be given with code
+    stall    a move stops at fraction of its distance (ESP following error, Copley tracking error)
+    stuck    the SC10 shutter ignores "ens"
+
+Usage:
+    bench.esp.faults.inject('stall', match='PA', fraction=0.3)
+    bench.copley.faults.inject('drop', probability=0.01, count=None)
+'''
+
+FAULT_KINDS = ('drop', 'garble', 'delay', 'error', 'stall', 'stuck')
+
+
+class Fault:
+    def __init__(self, kind, match=None, count=1, probability=1.0, after=0.0, delay=0.0, fraction=0.5, code=None):
+        """
+        Parameters:
+        kind (str): One of FAULT_KINDS.
+        match (str): Only commands containing this text trigger the fault, None for every command.
+        count (int): How often the fault fires, None for every time.
+        probability (float): Chance that a matching command triggers the fault.
+        after (float): Simulated time in seconds before which the fault is dormant.
+        """
+        if kind not in FAULT_KINDS:
+            raise ValueError(f"Unknown fault '{kind}', choose from {', '.join(FAULT_KINDS)}")
+        self.kind = kind
+        self.match = match
+        self.count = count
+        self.probability = probability
+        self.after = after
+        self.delay = delay
+        self.fraction = fraction
+        self.code = code
+
+    def matches(self, command, t):
+        return (t >= self.after and (self.count is None or self.count > 0)
+                and (self.match is None or self.match in command))
+
+
+class FaultPlan:
+    def __init__(self, seed=0):
+        self.faults = []
+        self.fired = []  # (time, kind, command) of every fault that fired
+        self.random = random.Random(seed)
+
+    def inject(self, kind, **settings):
+        fault = Fault(kind, **settings)
+        self.faults.append(fault)
+        return fault
+
+    def clear(self, kind=None):
+        self.faults = [fault for fault in self.faults if kind is not None and fault.kind != kind]
+
+    def take(self, kind, command, t):
+        """
+        The armed fault of this kind that fires for command at time t, or None.
+        """
+        for fault in self.faults:
+            if fault.kind != kind or not fault.matches(command, t):
+                continue
+            if fault.probability < 1 and self.random.random() >= fault.probability:
+                continue
+            if fault.count is not None:
+                fault.count -= 1
+            self.fired.append((t, kind, command))
+            return fault
+        return None
+
+    def garble(self, data):
+        """
+        Corrupt one byte of a reply.
+        """
+        if not data:
+            return data
+        data = bytearray(data)
+        data[self.random.randrange(len(data))] = self.random.randrange(128, 256)
+        return bytes(data)
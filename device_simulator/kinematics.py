@@ -0,0 +1,157 @@
+import math
+
+'''
+Motion of one simulated stage axis.
+
+A MotionProfile is a list of constant-acceleration phases starting at a simulated time t0, so position and speed at
+any time are closed-form and the simulator never has to step the motion. An Axis keeps the profiles it was given
+in time order. A move scheduled for later (e.g. by an ESP302 program) therefore leaves the current motion untouched
+until its start time.
+'''
+
+# Profiles kept per axis, older ones can no longer be queried
+PROFILE_HISTORY = 8
+
+
+class MotionProfile:
+    def __init__(self, t0, x0, phases=()):
+        """
+        Parameters:
+        t0 (float): Simulated start time in seconds.
+        x0 (float): Start position.
+        phases (list): (duration, start velocity, acceleration) for each phase, in order.
+        """
+        self.t0 = t0
+        self.x0 = x0
+        self.phases = []
+        t, x = t0, x0
+        for duration, velocity, acceleration in phases:
+            if duration <= 0:
+                continue
+            self.phases.append((t, x, duration, velocity, acceleration))
+            x += velocity * duration + 0.5 * acceleration * duration ** 2
+            t += duration
+        self.end = t
+        self.target = x
+
+    @classmethod
+    def hold(cls, t0, x0):
+        """
+        Axis standing still at x0.
+        """
+        return cls(t0, x0)
+
+    @classmethod
+    def trapezoid(cls, t0, x0, x1, velocity, acceleration, deceleration=None):
+        """
+        Point-to-point move from rest to rest, triangular if the distance is too short to reach velocity.
+        """
+        deceleration = deceleration or acceleration
+        distance = abs(x1 - x0)
+        if distance == 0 or velocity <= 0 or acceleration <= 0:
+            return cls.hold(t0, x0)
+
+        direction = math.copysign(1, x1 - x0)
+        if velocity ** 2 / (2 * acceleration) + velocity ** 2 / (2 * deceleration) > distance:
+            velocity = math.sqrt(2 * distance * acceleration * deceleration / (acceleration + deceleration))
+        t_acceleration = velocity / acceleration
+        t_deceleration = velocity / deceleration
+        t_cruise = (distance - velocity * (t_acceleration + t_deceleration) / 2) / velocity
+
+        profile = cls(t0, x0, [(t_acceleration, 0, direction * acceleration),
+                               (t_cruise, direction * velocity, 0),
+                               (t_deceleration, direction * velocity, -direction * deceleration)])
+        # Land exactly on the target despite rounding
+        profile.target = x1
+        return profile
+
+    @classmethod
+    def stop(cls, t0, x0, v0, deceleration):
+        """
+        Controlled stop from velocity v0.
+        """
+        if v0 == 0 or deceleration <= 0:
+            return cls.hold(t0, x0)
+        return cls(t0, x0, [(abs(v0) / deceleration, v0, -math.copysign(deceleration, v0))])
+
+    def state(self, t):
+        """
+        Position and velocity at simulated time t.
+        """
+        if not self.phases or t <= self.t0:
+            return self.x0, 0.0
+        if t >= self.end:
+            return self.target, 0.0
+        for start, x, duration, velocity, acceleration in self.phases:
+            if t < start + duration:
+                dt = t - start
+                return x + velocity * dt + 0.5 * acceleration * dt ** 2, velocity + acceleration * dt
+        return self.target, 0.0
+
+
+class Axis:
+    def __init__(self, position=0.0, minimum=None, maximum=None):
+        """
+        One stage axis.
+
+        Parameters:
+        position (float): Position at simulated time 0.
+        minimum (float): Lower travel limit, None for no limit.
+        maximum (float): Upper travel limit, None for no limit.
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.profiles = [MotionProfile.hold(float('-inf'), position)]
+
+    def profile_at(self, t):
+        for profile in reversed(self.profiles):
+            if profile.t0 <= t:
+                return profile
+        return self.profiles[0]
+
+    def state(self, t):
+        return self.profile_at(t).state(t)
+
+    def position(self, t):
+        return self.state(t)[0]
+
+    def velocity(self, t):
+        return self.state(t)[1]
+
+    def moving(self, t):
+        profile = self.profile_at(t)
+        return profile.t0 <= t < profile.end
+
+    def idle_at(self, t):
+        """
+        Simulated time at which all motion scheduled so far has finished, at least t.
+        """
+        return max(t, self.profiles[-1].end)
+
+    def within_limits(self, position):
+        return ((self.minimum is None or position >= self.minimum)
+                and (self.maximum is None or position <= self.maximum))
+
+    def start(self, profile):
+        """
+        Run a profile from its t0 on, replacing whatever was scheduled after it.
+        """
+        earlier = [existing for existing in self.profiles if existing.t0 < profile.t0]
+        self.profiles = earlier[-PROFILE_HISTORY:] + [profile]
+        return profile
+
+    def move(self, t, target, velocity, acceleration, deceleration=None):
+        """
+        Move to target starting at time t. A move during a move restarts from the current position.
+        """
+        return self.start(MotionProfile.trapezoid(t, self.position(t), target, velocity, acceleration, deceleration))
+
+    def stop(self, t, deceleration):
+        x, v = self.state(t)
+        return self.start(MotionProfile.stop(t, x, v, deceleration))
+
+    def halt(self, t):
+        """
+        Stop dead, as after an abort or a stalled motor.
+        """
+        return self.start(MotionProfile.hold(t, self.position(t)))
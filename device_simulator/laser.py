@@ -0,0 +1,91 @@
+import math
+from .link import SimulatedDevice
+
+'''
+Laser head as LaserController in Mika/sin_phase_plate/laser_controller.py uses it (Coherent Genesis command set).
+
+Settings like "L=1", "P=30", ">=0" and "E=0" are answered with an empty line "\\r\\n", queries like "?P", "?SP", "?L"
+with their value and "\\r\\n", unknown commands with a null character. The output power follows the set point with a
+first order rise, so a frame printed right after "L=1" sees less power than a later one. The emission history is
+kept for dose checks.
+'''
+
+MAX_POWER = 500  # mW
+RISE_TIME = 0.2  # s, time constant of the power rise
+
+
+class GenesisLaser(SimulatedDevice):
+    name = 'laser'
+    default_baudrate = 19200
+
+    def __init__(self, faults=None):
+        super().__init__(faults)
+        self.emission = False
+        self.set_point = 0.0
+        self.prompt = True
+        self.echo = True
+        self.changes = [(0.0, 0.0, 0.0)]  # (time, output power at that time, target power)
+
+    def execute(self, command, t):
+        command = command.strip()
+        if not command:
+            return '\r\n', t
+        if self.faults.take('error', command, t):
+            return '\x00', t
+
+        if command.startswith('?'):
+            value = self.query(command[1:].upper(), t)
+            return ('\x00', t) if value is None else (f'{value}\r\n', t)
+
+        key, separator, value = command.partition('=')
+        if not separator:
+            return '\x00', t
+        try:
+            number = float(value)
+        except ValueError:
+            return '\x00', t
+
+        key = key.upper()
+        if key == 'L':
+            self.emission = number != 0
+        elif key == 'P':
+            if not 0 <= number <= MAX_POWER:
+                return '\x00', t
+            self.set_point = number
+        elif key == '>':
+            self.prompt = number != 0
+        elif key == 'E':
+            self.echo = number != 0
+        else:
+            return '\x00', t
+        self.changes.append((t, self.power(t), self.set_point if self.emission else 0.0))
+        return '\r\n', t
+
+    def query(self, key, t):
+        if key == 'P':
+            return f'{self.power(t):.3f}'
+        if key == 'SP':
+            return f'{self.set_point:.3f}'
+        if key == 'L':
+            return str(int(self.emission))
+        if key == 'F':
+            return 'SYSTEM OK'
+        return None
+
+    def power(self, t):
+        """
+        Output power in mW at simulated time t.
+        """
+        for start, initial, target in reversed(self.changes):
+            if start <= t:
+                return target + (initial - target) * math.exp(-(t - start) / RISE_TIME)
+        return 0.0
+
+    def energy(self, t0, t1, steps=1000):
+        """
+        Energy in mJ emitted between the simulated times t0 and t1.
+        """
+        if t1 <= t0:
+            return 0.0
+        dt = (t1 - t0) / steps
+        return sum(self.power(t0 + (i + 0.5) * dt) for i in range(steps)) * dt
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import deque
+from .faults import FaultPlan
+
+'''
+Serial line between a driver and a simulated device.
+
+SimClock maps real time onto simulated time, with speedup > 1 the devices move and talk faster than real time.
+SerialLink puts the byte timing of the line around a SimulatedDevice: every character takes 10 bit times at the
+device baud rate in each direction, commands are handled when their terminator has arrived and replies become
+readable once their last byte would have been sent. Bytes written at a baud rate the device is not set to arrive as
+framing errors and are ignored, as they would be on the bench.
+'''
+
+# Start bit, 8 data bits, stop bit
+BITS_PER_CHAR = 10
+# Commands kept in every device log
+LOG_LENGTH = 10000
+
+
+class SimClock:
+    def __init__(self, speedup=1.0):
+        """
+        Parameters:
+        speedup (float): Simulated seconds per real second.
+        """
+        if speedup <= 0:
+            raise ValueError("speedup must be positive")
+        self.speedup = speedup
+        self.origin = time.perf_counter()
+
+    def now(self):
+        return self.sim(time.perf_counter())
+
+    def sim(self, real):
+        """
+        Simulated time of a time.perf_counter() value.
+        """
+        return (real - self.origin) * self.speedup
+
+    def real(self, sim):
+        """
+        time.perf_counter() value of a simulated time.
+        """
+        return self.origin + sim / self.speedup
+
+
+class SimulatedDevice:
+    name = 'device'
+    default_baudrate = 9600
+    terminator = b'\r'
+    # Time the firmware needs per command, in simulated seconds
+    processing_time = 0.001
+
+    def __init__(self, faults=None):
+        self.faults = faults if faults is not None else FaultPlan()
+        self.baudrate = self.default_baudrate
+        self.log = deque(maxlen=LOG_LENGTH)  # (time, command, reply)
+        self.lock = threading.Lock()
+
+    def handle(self, command, t):
+        """
+        Handle one command that arrived at simulated time t.
+
+        Returns:
+        tuple: Reply (str, or None for no reply) and the simulated time it is ready to be sent.
+        """
+        with self.lock:
+            reply, ready = self.execute(command, t)
+            self.log.append((t, command, reply))
+        return reply, ready + self.processing_time
+
+    def execute(self, command, t):
+        raise NotImplementedError
+
+
+class SerialLink:
+    def __init__(self, device, clock=None):
+        self.device = device
+        self.clock = clock if clock is not None else SimClock()
+        self.pending = bytearray()  # received bytes without terminator yet
+        self.outbox = deque()  # (real time the reply is complete, reply bytes)
+        self.host_line_free = 0.0
+        self.device_line_free = 0.0
+        self.framing_errors = 0
+        self.lock = threading.Lock()
+
+    def char_time(self, count):
+        """
+        Real seconds count characters take on the line.
+        """
+        return count * BITS_PER_CHAR / self.device.baudrate / self.clock.speedup
+
+    def write(self, data, baudrate=None):
+        """
+        Bytes written by the driver. baudrate is the rate the driver's port is set to, None if unknown.
+        """
+        with self.lock:
+            start = max(time.perf_counter(), self.host_line_free)
+            self.host_line_free = start + self.char_time(len(data))
+            if baudrate is not None and int(baudrate) != self.device.baudrate:
+                self.framing_errors += 1
+                return
+
+            terminator = self.device.terminator
+            self.pending += data
+            while terminator in self.pending:
+                line, _, rest = bytes(self.pending).partition(terminator)
+                self.pending = bytearray(rest)
+                # Every byte of the line has arrived once the last one has
+                arrived = start + self.char_time(len(data) - len(rest))
+                self.dispatch(line.decode('ascii', errors='replace'), arrived)
+
+    def dispatch(self, command, arrived):
+        faults = self.device.faults
+        t = self.clock.sim(arrived)
+        reply, ready = self.device.handle(command, t)
+        if reply is None or faults.take('drop', command, t):
+            return
+
+        data = reply.encode('latin-1')
+        if faults.take('garble', command, t):
+            data = faults.garble(data)
+        delay = faults.take('delay', command, t)
+        if delay:
+            ready += delay.delay
+
+        start = max(self.clock.real(ready), self.device_line_free)
+        self.device_line_free = start + self.char_time(len(data))
+        self.outbox.append((self.device_line_free, data))
+
+    def next_ready(self):
+        """
+        Real time the next reply is complete, None if nothing is on its way.
+        """
+        with self.lock:
+            return self.outbox[0][0] if self.outbox else None
+
+    def read_ready(self, now=None):
+        """
+        Remove and return the reply bytes that have completely arrived by now.
+        """
+        now = time.perf_counter() if now is None else now
+        data = bytearray()
+        with self.lock:
+            while self.outbox and self.outbox[0][0] <= now:
+                data += self.outbox.popleft()[1]
+        return bytes(data)
+
+    def discard(self):
+        with self.lock:
+            self.outbox.clear()
+            self.pending.clear()
@@ -0,0 +1,216 @@
+import os
+import select
+import threading
+import time
+from contextlib import contextmanager
+from .link import SerialLink
+
+'''
+Ways for the drivers to reach a simulated device.
+
+SimulatedSerial is an in-memory object with the part of the serial.Serial interface the drivers use (write, read,
+read_until, in_waiting, ...), for scripts that can be handed a port object. It needs no pyserial.
+
+serial_class and patch_serial put such objects in place of serial.Serial, for drivers that open a port name like
+"COM6" themselves.
+
+PtyBridge serves a device on a pseudo terminal, so the unchanged drivers open bridge.port (e.g. /dev/pts/4) like any
+other serial port. The baud rate the driver sets on its side is read back from the terminal settings, a driver at
+the wrong rate gets no answers. Pseudo terminals exist on Linux and macOS only.
+'''
+
+
+class SimulatedSerial:
+    def __init__(self, device, clock=None, port=None, baudrate=None, timeout=None, **settings):
+        """
+        Parameters:
+        device (SimulatedDevice): Device at the other end of the line.
+        clock (SimClock): Clock shared with other simulated devices.
+        baudrate (int): Rate of this side of the line, the device's rate if None.
+        timeout (float): Read timeout in seconds, None blocks until the data arrives.
+        settings: Further serial.Serial arguments (parity, stopbits, rtscts, ...), accepted and ignored.
+        """
+        self.link = SerialLink(device, clock)
+        self.port = port or f'sim://{device.name}'
+        self.baudrate = baudrate or device.baudrate
+        self.timeout = timeout
+        self.received = bytearray()
+        self.is_open = True
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def write(self, data):
+        self.link.write(bytes(data), self.baudrate)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def collect(self):
+        self.received += self.link.read_ready()
+
+    @property
+    def in_waiting(self):
+        self.collect()
+        return len(self.received)
+
+    def reset_input_buffer(self):
+        self.link.discard()
+        self.received.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+    def wait(self, deadline):
+        """
+        Sleep until the next reply is complete. False if it would not arrive before the deadline, after sleeping
+        until the deadline like a read timeout.
+        """
+        ready = self.link.next_ready()
+        if deadline is None:
+            # A blocking read with nothing on its way waits like a real port
+            time.sleep(0.01 if ready is None else max(0.0, ready - time.perf_counter()))
+            return True
+        if ready is None or ready > deadline:
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+            return False
+        time.sleep(max(0.0, ready - time.perf_counter()))
+        return True
+
+    def read(self, size=1):
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        self.collect()
+        while len(self.received) < size and self.wait(deadline):
+            self.collect()
+        data = bytes(self.received[:size])
+        del self.received[:size]
+        return data
+
+    def read_until(self, expected=b'\n', size=None):
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        self.collect()
+        while True:
+            end = self.received.find(expected)
+            if end >= 0:
+                count = end + len(expected)
+                break
+            if size is not None and len(self.received) >= size:
+                count = size
+                break
+            if not self.wait(deadline):
+                count = len(self.received)
+                break
+            self.collect()
+        if size is not None:
+            count = min(count, size)
+        data = bytes(self.received[:count])
+        del self.received[:count]
+        return data
+
+
+def serial_class(devices, clock=None):
+    """
+    Stand-in for serial.Serial that opens simulated devices by port name, for drivers that open their ports
+    themselves. Both serial.Serial(port, ...) and serial.Serial() with port set later and open() work.
+
+    Parameters:
+    devices (dict): Simulated device for every port name, e.g. {'COM6': bench.shutter, 'COM7': bench.copley}.
+    clock (SimClock): Clock shared by the devices.
+
+    Returns:
+    type: Class to put in place of serial.Serial.
+    """
+    class Serial(SimulatedSerial):
+        def __init__(self, port=None, baudrate=9600, bytesize=8, parity='N', stopbits=1, timeout=None,
+                     xonxoff=False, rtscts=False, **settings):
+            self.link = None
+            self.port = port
+            self.baudrate = baudrate
+            self.bytesize = bytesize
+            self.parity = parity
+            self.stopbits = stopbits
+            self.timeout = timeout
+            self.xonxoff = xonxoff
+            self.rtscts = rtscts
+            self.received = bytearray()
+            self.is_open = False
+            if port is not None:
+                self.open()
+
+        def open(self):
+            if self.port not in devices:
+                raise OSError(f"could not open port {self.port}: no simulated device on it")
+            self.link = SerialLink(devices[self.port], clock)
+            self.received.clear()
+            self.is_open = True
+
+    return Serial
+
+
+@contextmanager
+def patch_serial(devices, clock=None):
+    """
+    Let serial.Serial open the simulated devices by port name inside the block, see serial_class.
+    """
+    import serial
+    original = serial.Serial
+    serial.Serial = serial_class(devices, clock)
+    try:
+        yield
+    finally:
+        serial.Serial = original
+
+
+class PtyBridge:
+    def __init__(self, device, clock=None):
+        import termios
+        import tty
+        self.link = SerialLink(device, clock)
+        self.master, self.slave = os.openpty()
+        # Raw until the driver opens the port, so nothing is echoed or translated
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.speeds = {getattr(termios, f'B{rate}'): rate for rate in (9600, 19200, 38400, 57600, 115200)
+                       if hasattr(termios, f'B{rate}')}
+        self.running = False
+        self.thread = None
+
+    def host_baudrate(self):
+        """
+        Baud rate the driver has set on its end of the pseudo terminal.
+        """
+        import termios
+        return self.speeds.get(termios.tcgetattr(self.slave)[4])
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        os.close(self.master)
+        os.close(self.slave)
+
+    def serve(self):
+        while self.running:
+            ready = self.link.next_ready()
+            timeout = 0.05 if ready is None else min(0.05, max(0.0, ready - time.perf_counter()))
+            readable, _, _ = select.select([self.master], [], [], timeout)
+            if readable:
+                try:
+                    data = os.read(self.master, 4096)
+                except OSError:
+                    continue
+                self.link.write(data, self.host_baudrate())
+            reply = self.link.read_ready()
+            if reply:
+                os.write(self.master, reply)
@@ -0,0 +1,68 @@
+from urllib.parse import urlparse, parse_qs
+from serial.serialutil import SerialBase, SerialException
+from .bench import open_device
+
+'''
+pyserial URL handler for the simulated devices:
+
+    device_simulator.register_url_handler()
+    port = serial.serial_for_url('sim://esp302?speedup=10', baudrate=19200, timeout=0.5)
+
+sim://<name> opens the device registered under that name (the devices of a running Bench are) or a new one of
+that type: esp302, sc10, laser or copley.
+'''
+
+
+class Serial(SerialBase):
+    def open(self):
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+        if self.is_open:
+            raise SerialException("Port is already open.")
+
+        url = urlparse(self.portstr)
+        if url.scheme != 'sim':
+            raise SerialException(f"Expected a URL of the form sim://<device>, got {self.portstr}")
+        options = parse_qs(url.query)
+        speedup = float(options.get('speedup', ['1'])[0])
+        try:
+            self.simulated = open_device(url.netloc, speedup, baudrate=self._baudrate, timeout=self._timeout)
+        except ValueError as error:
+            raise SerialException(str(error))
+        self.is_open = True
+
+    def _reconfigure_port(self):
+        if self.is_open:
+            self.simulated.baudrate = self._baudrate
+            self.simulated.timeout = self._timeout
+
+    def close(self):
+        self.is_open = False
+
+    @property
+    def in_waiting(self):
+        return self.simulated.in_waiting
+
+    def read(self, size=1):
+        if not self.is_open:
+            raise SerialException("Port not open")
+        self.simulated.timeout = self._timeout
+        return self.simulated.read(size)
+
+    def read_until(self, expected=b'\n', size=None):
+        if not self.is_open:
+            raise SerialException("Port not open")
+        self.simulated.timeout = self._timeout
+        return self.simulated.read_until(expected, size)
+
+    def write(self, data):
+        if not self.is_open:
+            raise SerialException("Port not open")
+        self.simulated.baudrate = self._baudrate
+        return self.simulated.write(data)
+
+    def reset_input_buffer(self):
+        self.simulated.reset_input_buffer()
+
+    def reset_output_buffer(self):
+        pass
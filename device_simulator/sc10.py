@@ -0,0 +1,69 @@
+from .link import SimulatedDevice
+
+'''
+Thorlabs SC10 shutter controller as ShutterController in Mika/sin_phase_plate/shutter_controller.py and Shutter in
+Phill/chirped_printer.py use it.
+
+The controller echoes every command, answers queries on the next line and ends with the prompt ">":
+"ens?\\r1\\r>", "ens\\r>", and "\\rCommand error CMD_NOT_DEFINED\\r>" for an unknown or empty command. "ens" toggles
+the shutter. Every open period is kept in exposures, so a simulated job can be checked for its exposure times.
+'''
+
+# Time the shutter blades need to open or close, in seconds
+ACTUATION_TIME = 0.008
+IDENTITY = 'THORLABS SC10 VERSION 1.07'
+
+
+class SC10(SimulatedDevice):
+    name = 'sc10'
+    default_baudrate = 9600
+
+    def __init__(self, faults=None):
+        super().__init__(faults)
+        self.enabled = False
+        self.mode = 1
+        self.opened_at = None
+        self.exposures = []  # (open time, close time) in simulated seconds
+
+    def execute(self, command, t):
+        command = command.strip()
+        if self.faults.take('error', command, t):
+            return f'{command}\rCommand error CMD_NOT_DEFINED\r>', t
+
+        if command == 'ens?':
+            return f'{command}\r{int(self.enabled)}\r>', t
+        if command == 'ens':
+            if not self.faults.take('stuck', command, t):
+                self.toggle(t)
+            return f'{command}\r>', t
+        if command == 'mode?':
+            return f'{command}\r{self.mode}\r>', t
+        if command.startswith('mode='):
+            try:
+                self.mode = int(command[5:])
+            except ValueError:
+                return f'{command}\rCommand error CMD_ARG_INVALID\r>', t
+            return f'{command}\r>', t
+        if command == 'id?':
+            return f'{command}\r{IDENTITY}\r>', t
+        return f'{command}\rCommand error CMD_NOT_DEFINED\r>', t
+
+    def toggle(self, t):
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.opened_at = t + ACTUATION_TIME
+        else:
+            self.exposures.append((self.opened_at, t + ACTUATION_TIME))
+            self.opened_at = None
+
+    def is_open(self, t):
+        return self.opened_at is not None and t >= self.opened_at
+
+    def exposure_time(self, t=None):
+        """
+        Total time the shutter was open, including a period still open at simulated time t.
+        """
+        total = sum(close - open_ for open_, close in self.exposures)
+        if self.opened_at is not None and t is not None and t > self.opened_at:
+            total += t - self.opened_at
+        return total
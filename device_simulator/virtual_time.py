@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import defaultdict
+
+'''
+Virtual time, so whole jobs replay against the simulated devices in minutes instead of hours.
+
+    with VirtualTime() as clock:
+        ...  # run the job
+    print(clock.slept)
+
+Inside the block time.sleep() returns at once and moves the clock forward instead, time.time(), time.perf_counter()
+and time.monotonic() read real time plus everything slept so far. The drivers' fixed sleeps, stage moves and
+exposures cost nothing, while the computing between them (image generation, decoding, serial handling) keeps its
+real duration, so the clock reads what a wall clock on the bench would have read. The simulated devices run on
+time.perf_counter() and follow along with Bench(speedup=1).
+
+Busy waits like "while time.time() < start + 0.5: pass" never sleep. time.time() read again without anything else
+happening in between moves the clock forward by itself, in steps growing from SPIN_STEP up to MAX_SPIN_STEP.
+
+All threads share the clock and time slept in two threads at once is counted twice, so a job is timed as if its
+threads took turns, which is how the drivers use them (the Tk thread waits while the motion thread moves).
+thread_time() leaves out what other threads slept, for timing work on one thread while others sleep.
+'''
+
+# First step of the clock in a busy wait, in seconds, doubled on every further read up to MAX_SPIN_STEP
+SPIN_STEP = 0.001
+MAX_SPIN_STEP = 0.016
+
+PATCHED = ('sleep', 'time', 'perf_counter', 'monotonic')
+
+
+class VirtualTime:
+    def __init__(self):
+        self.offset = 0.0  # seconds the clock is ahead of real time
+        self.slept = 0.0  # of which slept, the rest is busy waiting
+        self.spin = 0.0  # next step of a busy wait, 0 while nobody is spinning
+        self.advanced = defaultdict(float)  # seconds every thread moved the clock forward, by thread id
+        self.lock = threading.Lock()
+        self.originals = {}
+
+    def __enter__(self):
+        if self.originals:
+            raise RuntimeError("VirtualTime is already active")
+        for name in PATCHED:
+            self.originals[name] = getattr(time, name)
+            setattr(time, name, getattr(self, name))
+        return self
+
+    def __exit__(self, *exc_info):
+        for name, original in self.originals.items():
+            setattr(time, name, original)
+        self.originals = {}
+
+    def sleep(self, seconds):
+        if seconds < 0:
+            raise ValueError("sleep length must be non-negative")
+        with self.lock:
+            self.offset += seconds
+            self.slept += seconds
+            self.advanced[threading.get_ident()] += seconds
+            self.spin = 0.0
+
+    def time(self):
+        with self.lock:
+            if self.spin:
+                self.offset += self.spin
+                self.advanced[threading.get_ident()] += self.spin
+                self.spin = min(2 * self.spin, MAX_SPIN_STEP)
+            else:
+                self.spin = SPIN_STEP
+            return self.originals['time']() + self.offset
+
+    def perf_counter(self):
+        with self.lock:
+            self.spin = 0.0
+            return self.originals['perf_counter']() + self.offset
+
+    def monotonic(self):
+        with self.lock:
+            self.spin = 0.0
+            return self.originals['monotonic']() + self.offset
+
+    def thread_time(self):
+        """
+        Like time.perf_counter(), but only moved forward by what the calling thread slept or busy waited.
+        """
+        with self.lock:
+            return self.originals['perf_counter']() + self.advanced[threading.get_ident()]
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from PIL import Image
+from scipy import signal
+from chirp_generator import ChirpColumnSource, chirp_waveform, linear_profile, write_column_images
+
+
+def original_column_images(xmax_i, xmax_f, num_cols, ymin, ymax, SLM_width, SLM_height):
+    """
+    Column images of chirped-SLMimage.py before chirp_generator.py, left to right.
+    """
+    chirp_width = SLM_width * num_cols
+    y_pp = ymax - ymin
+    xmax_array = np.linspace(xmax_i, xmax_f, chirp_width)
+    phase = 2 * np.pi * np.cumsum(1 / xmax_array)
+    waveform = ymin + y_pp * (1 + signal.sawtooth(phase) / 2)
+
+    images = []
+    image_array = np.zeros((SLM_height, SLM_width), dtype=np.uint8)
+    for n in np.arange(num_cols):
+        for x in np.arange(SLM_width):
+            image_array[:, x] = waveform[x + n * SLM_width]
+        images.append(image_array.copy())
+    return images
+
+
+@pytest.mark.parametrize("xmax_i, xmax_f, ymin, ymax", [(20, 80, 0, 128), (15, 30, 10, 100), (40, 25, 0, 170)])
+def test_default_mapping_reproduces_original_images(tmp_path, xmax_i, xmax_f, ymin, ymax):
+    num_cols, width, height = 3, 240, 4
+    expected = original_column_images(xmax_i, xmax_f, num_cols, ymin, ymax, width, height)
+
+    paths = write_column_images(linear_profile(xmax_i, xmax_f, num_cols * width), num_cols, str(tmp_path),
+                                'chirp.png', ymin, ymax, SLM_height=height)
+
+    for path, image in zip(paths, expected):
+        np.testing.assert_array_equal(np.asarray(Image.open(path)), image)
+
+
+def test_range_mapping_spans_ymin_to_ymax():
+    waveform = chirp_waveform(linear_profile(20, 80, 5000), ymin=10, ymax=100, mapping='range')
+
+    assert waveform.min() == 10
+    assert waveform.max() == 100
+
+
+def test_column_source_matches_images(tmp_path):
+    xmax_array = linear_profile(20, 80, 4 * 240)
+    paths = write_column_images(xmax_array, 4, str(tmp_path), 'chirp.png', SLM_height=4)
+    source = ChirpColumnSource(xmax_array, 4, SLM_height=4)
+
+    # Line 1 is the rightmost column, the last image written
+    for line in range(1, 5):
+        np.testing.assert_array_equal(np.asarray(source.frame(line)), np.asarray(Image.open(paths[4 - line])))
+
+
+def test_unknown_mapping():
+    with pytest.raises(ValueError):
+        chirp_waveform(linear_profile(20, 80, 100), mapping='centered')
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from doe_pipeline import print_order, tiles_from_phase_map
+from tile_coordinates import tile_coordinates
+
+GRIDS = [(1, 1), (1, 3), (2, 2), (2, 3), (3, 2), (3, 4), (4, 5)]
+
+
+def pixel_list_order(rows, columns):
+    """
+    Order of rgb_array_to_pixel_list in the subdivision generators, one tile per pixel.
+    """
+    order = []
+    for i, row in enumerate(range(rows - 1, -1, -1)):
+        if i % 2 == 0:
+            order.extend((row, column) for column in range(columns - 1, -1, -1))
+        else:
+            order.extend((row, column) for column in range(columns))
+    return order
+
+
+@pytest.mark.parametrize("rows, columns", GRIDS)
+def test_print_order_matches_subdivision_generators(rows, columns):
+    assert print_order(rows, columns) == pixel_list_order(rows, columns)
+
+
+@pytest.mark.parametrize("rows, columns", GRIDS)
+def test_tiles_land_on_their_stage_position(rows, columns):
+    # Image columns to the right sit at larger X, image rows further down at smaller Z
+    x, z = tile_coordinates(rows, columns, 484, 290)
+    row, column = np.array(print_order(rows, columns)).T
+
+    np.testing.assert_array_equal(x, x.min() + column * 484)
+    np.testing.assert_array_equal(z, z.min() + (rows - 1 - row) * 290)
+
+
+def test_first_tile_is_bottom_right_for_even_rows():
+    phase_map = np.arange(4 * 6).reshape(4, 6)
+    first_row, first_column, frame = next(tiles_from_phase_map(phase_map, rows=2, columns=3))
+
+    assert (first_row, first_column) == (1, 2)
+    assert set(np.unique(frame).tolist()) == set(phase_map[2:4, 4:6].ravel().tolist())
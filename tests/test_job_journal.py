@@ -0,0 +1,124 @@
+import types
+import numpy as np
+import chirped_printer
+from chirped_printer import SLMManager
+from job_journal import JobJournal, load_journal
+from print_time_estimator import LiveEstimate, print_durations, stitch_durations
+from tile_trace import TileTrace, load_trace
+
+JOB = "printing, 6 lines of 290 rows, speed 300, start 2000 -1000"
+
+
+class RecordingWindow:
+    def __init__(self):
+        self.calls = []
+
+    def after(self, ms, function):
+        self.calls.append(function)
+
+
+class FakeShutter:
+    def __init__(self, port):
+        pass
+
+    def toggle(self):
+        pass
+
+    def close_connection(self):
+        pass
+
+
+class RecordingSLM:
+    def __init__(self):
+        self.image_window = RecordingWindow()
+        self.surface = types.SimpleNamespace(last_latency=None)
+
+
+def resumed_manager(folder, lines_done, lines):
+    """
+    SLMManager in the middle of printing_logic resuming a journal with lines_done lines, just after the move to the
+    start, without motors, shutter or SLM.
+    """
+    journal = JobJournal(folder, JOB)
+    journal.open()
+    for line in range(1, lines_done + 1):
+        journal.done(line, 2000 - (line - 1) * 480, -1000)
+    journal.close()
+
+    manager = object.__new__(SLMManager)
+    manager.journal = JobJournal(folder, JOB)
+    manager.journal.open(resume=True)
+    manager.stage_positions = (np.arange(lines) * -480 + 2000, np.full(lines, -1000))
+    manager.current_mode = 'printing'
+    manager.printing_lines = lines
+    manager.firstLine = manager.journal.finished() + 1
+    manager.currentLine = manager.firstLine
+    manager.tile_trace = None
+    manager.estimate = LiveEstimate(print_durations(lines, 290, 300, 2000, -1000, first_line=manager.firstLine))
+    manager.slm = RecordingSLM()
+    manager.motor_controller = types.SimpleNamespace(serial_bytes=0)
+    return manager
+
+
+def test_resume_move_is_not_journaled_again(tmp_path):
+    manager = resumed_manager(str(tmp_path), 3, 6)
+    assert manager.firstLine == 4
+
+    # The move to the start of line 4 comes back as line 3
+    manager.after_movement_printing()
+    assert load_journal(str(tmp_path)) == (JOB, [1, 2, 3])
+
+    manager.currentLine = 5
+    manager.after_movement_printing()
+    assert load_journal(str(tmp_path)) == (JOB, [1, 2, 3, 4])
+
+
+def test_resume_estimate_has_one_step_per_callback(tmp_path, monkeypatch):
+    monkeypatch.setattr(chirped_printer, "Shutter", FakeShutter)
+    manager = resumed_manager(str(tmp_path), 3, 6)
+
+    # Move to the start, lines 4 to 6 and the return home
+    for manager.currentLine in range(4, 9):
+        manager.after_movement_printing()
+
+    assert load_journal(str(tmp_path)) == (JOB, [1, 2, 3, 4, 5, 6])
+    assert len(manager.slm.image_window.calls) == len(print_durations(6, 290, 300, 2000, -1000, first_line=4))
+    assert manager.estimate.done == len(manager.estimate.durations)
+
+
+def test_resume_estimate_starts_with_the_move_to_the_first_line():
+    full = print_durations(6, 290, 300, 2000, -1000)
+    resumed = print_durations(6, 290, 300, 2000, -1000, first_line=4)
+
+    np.testing.assert_allclose(resumed[1:], full[4:])
+    assert resumed[0] != full[3]
+
+
+def test_resumed_stitch_estimate_starts_with_the_move_to_the_first_tile():
+    for mode in ('absolute', 'relative'):
+        arguments = dict(exp_times=np.full(12, 2.0), positions_x=np.arange(12) * -480, positions_z=np.full(12, 960),
+                         mode=mode, columns=4, rows=3)
+        full = stitch_durations(**arguments)
+        resumed = stitch_durations(**arguments, first_tile=6)
+
+        assert len(resumed) == len(full) - 5
+        np.testing.assert_allclose(resumed[1:], full[6:])
+        assert resumed[0] > full[5]
+
+
+def test_trace_rows_are_on_disk_with_their_line_start(tmp_path):
+    manager = resumed_manager(str(tmp_path), 3, 6)
+    path = str(tmp_path / "tile_trace.csv")
+    manager.tile_trace = TileTrace(path)
+
+    manager.currentLine = 5
+    manager.start_tile_trace(4)
+    manager.after_movement_printing()
+
+    # Written before the trace is closed, as if the job stopped here
+    trace = load_trace(path)
+    assert list(trace["tile"]) == [4]
+    assert (trace["x"][0], trace["z"][0]) == (2000 - 3 * 480, -1000)
+
+    manager.stop_tile_trace()
+    assert manager.tile_trace is None
@@ -0,0 +1,22 @@
+import numpy as np
+from phase_lut import PhaseLUT
+
+
+def test_linear_table_returns_gray_values():
+    gray = np.arange(256)
+
+    np.testing.assert_array_equal(PhaseLUT.linear().apply_gray(gray), gray)
+
+
+def test_gray_beyond_range_saturates():
+    # A sawtooth with y_max 255 plus a rounding step must stay white, not wrap to black
+    gray = np.array([-3, 0, 254.4, 255, 255.7, 256, 300])
+
+    np.testing.assert_array_equal(PhaseLUT.linear().apply_gray(gray), [0, 0, 254, 255, 255, 255, 255])
+
+
+def test_phase_wraps():
+    lut = PhaseLUT.linear()
+    phase = np.linspace(-np.pi, np.pi, 64, endpoint=False) + 0.01
+
+    np.testing.assert_array_equal(lut.apply(phase + 2 * np.pi), lut.apply(phase))
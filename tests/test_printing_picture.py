@@ -0,0 +1,58 @@
+import numpy as np
+from chirped_printer import ColorPicker, PrintingPicture
+
+
+class RecordingSLM:
+    def __init__(self):
+        self.images = []
+
+    def display_image(self, image):
+        self.images.append(image)
+
+
+class FixedEntry:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class RecordingPhoto:
+    def paste(self, image):
+        self.image = image
+
+
+def picker(slm, slm_in_use=None):
+    color_picker = ColorPicker(pattern_source=PrintingPicture(slm=slm), slm_in_use=slm_in_use)
+    color_picker.hex_entry = FixedEntry("#3080c0")
+    color_picker.xmax_entry = FixedEntry("24")
+    color_picker.pattern_photo = RecordingPhoto()
+    return color_picker
+
+
+def test_preview_shows_the_saved_pattern_on_the_slm():
+    slm = RecordingSLM()
+    picker(slm).render_pattern_preview()
+
+    expected = PrintingPicture().make_SLM_pattern(0x30, 0x80, 0xc0, 24)
+    assert len(slm.images) == 1
+    np.testing.assert_array_equal(np.asarray(slm.images[0]), np.asarray(expected))
+
+
+def test_preview_stays_off_the_slm_during_a_job():
+    slm = RecordingSLM()
+    color_picker = picker(slm, slm_in_use=lambda: True)
+    color_picker.render_pattern_preview()
+
+    assert slm.images == []
+    assert color_picker.pattern_photo.image.size == (480, 288)
+
+
+def test_every_pattern_has_its_own_array():
+    picture = PrintingPicture()
+    first = picture.make_SLM_pattern(255, 0, 0, 20)
+    before = np.asarray(first).copy()
+    picture.make_SLM_pattern(0, 0, 255, 40)
+
+    np.testing.assert_array_equal(np.asarray(first), before)
@@ -0,0 +1,34 @@
+import threading
+from telemetry import TelemetryPublisher
+
+PUBLISHES = 20000
+
+
+def test_readers_get_whole_records():
+    telemetry = TelemetryPublisher("test")
+    mixed = []
+
+    def read():
+        while telemetry.snapshot.sequence < PUBLISHES:
+            snapshot = telemetry.snapshot
+            if snapshot.step != snapshot.steps:
+                mixed.append(snapshot)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for count in range(1, PUBLISHES + 1):
+        telemetry.publish(step=count, steps=count)
+    reader.join()
+
+    assert mixed == []
+    assert telemetry.snapshot.sequence == PUBLISHES
+
+
+def test_close_stops_the_sender():
+    telemetry = TelemetryPublisher("test", port=50599, rate=100)
+    telemetry.close()
+    telemetry.sender.join(timeout=1)
+
+    assert not telemetry.sender.is_alive()
+    telemetry.publish(step=1)
+    assert telemetry.snapshot.step == 1
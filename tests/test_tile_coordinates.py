@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from tile_coordinates import coordinate_counts, tile_coordinates, tile_indices
+
+GRIDS = [(1, 1), (1, 5), (4, 1), (3, 3), (3, 4), (4, 3), (4, 6), (5, 7)]
+
+
+def calculate_coordinates(rows, columns, slm_x, slm_y, order="serpentine"):
+    """
+    The loop the generators used before tile_coordinates.py (the raster order returns to the first column instead
+    of running back).
+    """
+    points = []
+    start_x = ((columns / 2) - 1) * slm_x + slm_x / 2
+    start_y = -(((rows / 2) - 1) * slm_y + slm_y / 2)
+    first_x = start_x
+
+    for row in range(rows):
+        for col in range(columns):
+            points.append((start_x, start_y))
+
+            if col < columns - 1:
+                if order == "raster" or row % 2 == 0:
+                    start_x -= slm_x
+                else:
+                    start_x += slm_x
+
+        if order == "raster":
+            start_x = first_x
+        start_y += slm_y
+
+    return points
+
+
+def relative_stitch_positions(rows, columns, pitch, start_x, start_z):
+    """
+    Positions MotorController.stitching_relative moved through before tile_coordinates.py, one relative move per tile.
+    """
+    x, z = start_x, start_z
+    positions = [(x, z)]
+    for index in range(1, rows * columns):
+        current_row = index // columns
+        if current_row != (index - 1) // columns:
+            z += pitch
+        elif current_row % 2 == 1:
+            x += pitch
+        else:
+            x -= pitch
+        positions.append((x, z))
+    return positions
+
+
+@pytest.mark.parametrize("order", ["serpentine", "raster"])
+@pytest.mark.parametrize("rows, columns", GRIDS)
+def test_same_order_as_calculate_coordinates(rows, columns, order):
+    x, z = tile_coordinates(rows, columns, 484, 323, order=order)
+    expected = np.array(calculate_coordinates(rows, columns, 484, 323, order))
+
+    np.testing.assert_array_equal(x, expected[:, 0])
+    np.testing.assert_array_equal(z, expected[:, 1])
+
+
+@pytest.mark.parametrize("rows, columns", GRIDS)
+def test_csv_counts_match_int(rows, columns):
+    x, z = coordinate_counts(*tile_coordinates(rows, columns, 484, 323))
+    expected = [(int(point_x), int(point_z)) for point_x, point_z in calculate_coordinates(rows, columns, 484, 323)]
+
+    assert list(zip(x.tolist(), z.tolist())) == expected
+
+
+@pytest.mark.parametrize("rows, columns", GRIDS)
+def test_same_order_as_relative_stitching(rows, columns):
+    x, z = tile_coordinates(rows, columns, 484, start_x=1000, start_z=-2000)
+
+    assert list(zip(x.tolist(), z.tolist())) == relative_stitch_positions(rows, columns, 484, 1000, -2000)
+
+
+@pytest.mark.parametrize("rows, columns", GRIDS)
+def test_spiral_visits_every_tile_once_by_neighbours(rows, columns):
+    row, column = tile_indices(rows, columns, "spiral")
+
+    assert len(set(zip(row.tolist(), column.tolist()))) == rows * columns
+    assert (row[0], column[0]) == (0, 0)
+    assert np.all(np.abs(np.diff(row)) + np.abs(np.diff(column)) == 1)
+
+
+def test_unknown_order():
+    with pytest.raises(ValueError):
+        tile_indices(2, 2, "zigzag")